@@ -0,0 +1,3 @@
+"""
+本地替身服务与基准测试工具，用于在不依赖外部服务的情况下测试和压测各处理阶段
+"""
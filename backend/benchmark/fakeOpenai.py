@@ -0,0 +1,169 @@
+"""
+OpenAI 兼容接口本地替身
+
+实现 /v1/chat/completions：根据系统提示词区分番剧名称解析与文件名解析，
+按规则从输入中提取结果并按设定的延迟返回，用于测试和基准测试。
+
+    python -m benchmark.fakeOpenai --port 8083 --latency 0.2
+"""
+
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from module.parser.openai import parseNameSystemPrompt
+
+logger = logging.getLogger(__name__)
+
+EPISODE_PATTERN = re.compile(r'\s-\s(\d{1,3})(?:v\d)?\b|\[(\d{1,3})(?:v\d)?\]|[Ee][Pp]?(\d{1,3})\b')
+SEASON_PATTERN = re.compile(r'[Ss](\d{1,2})[Ee]\d|Season\s*(\d{1,2})|第(\d{1,2})季')
+NAME_PREFIX_PATTERN = re.compile(r'^(?:Mikan Project\s*-\s*|\[[^\]]*\]\s*)')
+
+
+class fakeOpenaiServer:
+    """
+    OpenAI 兼容接口替身
+
+    Args:
+        host: 监听地址
+        port: 监听端口，0 表示随机端口
+        latency: 每个请求的响应延迟（秒）
+        jitter: 延迟的随机浮动比例，例如 0.2 表示 ±20%
+        invalid_rate: 返回非 JSON 内容的比例，用于模拟模型输出异常
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 invalid_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.invalid_rate = invalid_rate
+        # 请求计数，按调用类型（name / file）统计
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """openai.base_url 的取值"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # ---------- 应答 ----------
+
+    @staticmethod
+    def parse_name(text: str) -> str:
+        name = NAME_PREFIX_PATTERN.sub("", text.strip())
+        return re.split(r'\s+(?:第.+季|S\d+|Season\s*\d+)', name)[0].strip()
+
+    @staticmethod
+    def parse_file(text: str) -> Dict:
+        episode = EPISODE_PATTERN.search(text)
+        season = SEASON_PATTERN.search(text)
+        upper = text.upper()
+        return {
+            "hasCHS": any(k in upper for k in ("CHS", "简", "GB")),
+            "hasCHT": any(k in upper for k in ("CHT", "繁", "BIG5")),
+            "subtitle_type": "HRD" if "内嵌" in text else "SFT",
+            "season": int(next(g for g in season.groups() if g)) if season else 1,
+            "episode": int(next(g for g in episode.groups() if g)) if episode else None,
+        }
+
+    def complete(self, request: Dict) -> str:
+        """根据请求的消息生成回复内容"""
+        messages = request.get("messages") or []
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        prompt = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        call = "name" if system == parseNameSystemPrompt else "file"
+        with self._lock:
+            self.requests[call] = self.requests.get(call, 0) + 1
+            invalid = self.invalid_rate and self._random.random() < self.invalid_rate
+            delay = self.latency * (1 + self._random.uniform(-self.jitter, self.jitter)) if self.latency else 0
+        if delay:
+            time.sleep(delay)
+        if invalid:
+            return "```json\n{}\n```"
+        if call == "name":
+            return self.parse_name(prompt)
+        return json.dumps(self.parse_file(prompt), ensure_ascii=False)
+
+    def _make_handler(self):
+        server = self
+
+        class handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._reply(400, {"error": {"message": "invalid JSON body", "type": "invalid_request_error"}})
+                    return
+                if urlparse(self.path).path.rstrip("/") != "/v1/chat/completions":
+                    self._reply(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+                    return
+                content = server.complete(request)
+                self._reply(200, {
+                    "id": f"chatcmpl-bench-{time.time_ns()}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model") or "bench",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+            def _reply(self, status: int, body: Dict):
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return handler
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description="OpenAI 兼容接口本地替身")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8083)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="每个请求的响应延迟（秒）")
+    args = arg_parser.parse_args()
+
+    fake = fakeOpenaiServer(args.host, args.port, latency=args.latency).start()
+    logger.info(f"Fake OpenAI listening on {fake.url}")
+    try:
+        fake._thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,327 @@
+"""
+qBittorrent Web API 本地替身
+
+实现 HClO Anime 用到的 Web API 子集（登录、添加、查询、增量同步、重命名、移动、删除），
+种子按设定的下载时长模拟进度，用于测试和基准测试。
+
+    python -m benchmark.fakeQbittorrent --port 8081
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import secrets
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from module.downloader import extract_infohash, parse_torrent
+from module.downloader.torrentCache import BencodeError
+
+logger = logging.getLogger(__name__)
+
+
+class fakeQbittorrentServer:
+    """
+    qBittorrent Web API 替身
+
+    Args:
+        host: 监听地址
+        port: 监听端口，0 表示随机端口
+        username / password: 登录凭据
+        download_seconds: 每个种子从添加到完成的模拟耗时
+        latency: 每个请求额外增加的延迟（秒）
+    """
+
+    version = "v4.6.7"
+    web_api_version = "2.9.3"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, username: str = "admin", password: str = "adminadmin",
+                 download_seconds: float = 5.0, latency: float = 0.0):
+        self.username = username
+        self.password = password
+        self.download_seconds = download_seconds
+        self.latency = latency
+
+        self.torrents: Dict[str, Dict] = {}
+        self.sessions = set()
+        # 请求计数，按接口名统计
+        self.requests: Dict[str, int] = {}
+        # 设为 True 时所有请求直接断开，用于模拟服务不可用
+        self.offline = False
+        # 重复添加已存在种子的次数，用于检查多个工作进程是否重复提交
+        self.duplicate_adds = 0
+
+        self._lock = threading.Lock()
+        self._rev = itertools.count(1)
+        self._current_rev = 0
+        self._removed: List[tuple] = []
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-qbittorrent", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def expire_sessions(self):
+        """使所有会话失效，下次请求返回 403"""
+        with self._lock:
+            self.sessions.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # ---------- 种子状态 ----------
+
+    def _bump(self, torrent: Dict):
+        self._current_rev = next(self._rev)
+        torrent["_rev"] = self._current_rev
+
+    def _refresh(self):
+        """根据添加时间推进模拟下载进度"""
+        now = time.time()
+        for torrent in self.torrents.values():
+            if torrent["state"] in ("error", "pausedDL", "uploading"):
+                continue
+            elapsed = now - torrent["added_on"]
+            progress = 1.0 if self.download_seconds <= 0 else min(1.0, elapsed / self.download_seconds)
+            state = "uploading" if progress >= 1.0 else "downloading"
+            if progress != torrent["progress"] or state != torrent["state"]:
+                torrent["progress"] = round(progress, 4)
+                torrent["state"] = state
+                torrent["amount_left"] = int(torrent["size"] * (1 - progress))
+                torrent["completion_on"] = int(now) if progress >= 1.0 else -1
+                self._bump(torrent)
+
+    def _add(self, torrent_hash: str, name: str, form: Dict[str, str]):
+        if torrent_hash in self.torrents:
+            self.duplicate_adds += 1
+            return
+        size = 300 * 1024 * 1024
+        torrent = {
+            "hash": torrent_hash,
+            "name": form.get("rename") or name,
+            "save_path": form.get("savepath") or "/downloads",
+            "content_path": "",
+            "category": form.get("category") or "",
+            "tags": form.get("tags") or "",
+            "state": "metaDL",
+            "progress": 0.0,
+            "size": size,
+            "amount_left": size,
+            "added_on": int(time.time()),
+            "completion_on": -1,
+            "files": [
+                {"name": f"{name}.mkv", "size": size - 1024},
+                {"name": f"{name}.ass", "size": 1024},
+            ],
+        }
+        self.torrents[torrent_hash] = torrent
+        self._bump(torrent)
+
+    @staticmethod
+    def _public(torrent: Dict) -> Dict:
+        return {k: v for k, v in torrent.items() if not k.startswith("_") and k != "files"}
+
+    # ---------- API ----------
+
+    def handle(self, method: str, form: Dict[str, str], files: List[bytes]):
+        """处理 /api/v2/<method>，返回 (状态码, 响应体)"""
+        with self._lock:
+            self._refresh()
+            if method == "app/version":
+                return 200, self.version
+            if method == "app/webapiVersion":
+                return 200, self.web_api_version
+            if method == "torrents/add":
+                urls = [u.strip() for u in (form.get("urls") or "").splitlines() if u.strip()]
+                for url in urls:
+                    torrent_hash = extract_infohash(url) or hashlib.sha1(url.encode()).hexdigest()
+                    name = parse_qs(urlparse(url).query).get("dn", [url.rsplit("/", 1)[-1]])[0]
+                    self._add(torrent_hash, name, form)
+                for content in files:
+                    try:
+                        meta = parse_torrent(content)
+                        self._add(meta["infohash"], meta["name"], form)
+                    except BencodeError:
+                        self._add(hashlib.sha1(content).hexdigest(), "torrent", form)
+                return 200, "Ok." if urls or files else "Fails."
+            if method == "torrents/info":
+                hashes = set(filter(None, (form.get("hashes") or "").lower().split("|")))
+                torrents = [self._public(t) for h, t in self.torrents.items()
+                            if (not hashes or h in hashes)
+                            and ("category" not in form or t["category"] == form["category"])
+                            and ("tag" not in form or form["tag"] in t["tags"].split(","))]
+                return 200, torrents
+            if method == "sync/maindata":
+                return 200, self._maindata(int(form.get("rid") or 0))
+            if method == "torrents/files":
+                torrent = self.torrents.get((form.get("hash") or "").lower())
+                if not torrent:
+                    return 404, "Not Found"
+                return 200, [dict(f, index=i, progress=torrent["progress"]) for i, f in enumerate(torrent["files"])]
+            if method == "torrents/rename":
+                torrent = self.torrents.get((form.get("hash") or "").lower())
+                if not torrent:
+                    return 404, "Not Found"
+                torrent["name"] = form.get("name", torrent["name"])
+                self._bump(torrent)
+                return 200, ""
+            if method == "torrents/renameFile":
+                torrent = self.torrents.get((form.get("hash") or "").lower())
+                if not torrent:
+                    return 404, "Not Found"
+                for f in torrent["files"]:
+                    if f["name"] == form.get("oldPath"):
+                        f["name"] = form.get("newPath")
+                        return 200, ""
+                return 409, "Conflict"
+            if method == "torrents/setLocation":
+                for torrent_hash in (form.get("hashes") or "").lower().split("|"):
+                    torrent = self.torrents.get(torrent_hash)
+                    if torrent:
+                        torrent["save_path"] = form.get("location")
+                        self._bump(torrent)
+                return 200, ""
+            if method == "torrents/delete":
+                for torrent_hash in (form.get("hashes") or "").lower().split("|"):
+                    if self.torrents.pop(torrent_hash, None) is not None:
+                        self._current_rev = next(self._rev)
+                        self._removed.append((self._current_rev, torrent_hash))
+                return 200, ""
+            return 404, "Not Found"
+
+    def _maindata(self, rid: int) -> Dict:
+        full = rid <= 0 or rid > self._current_rev
+        data = {"rid": self._current_rev, "full_update": full}
+        if full:
+            data["torrents"] = {h: self._public(t) for h, t in self.torrents.items()}
+        else:
+            data["torrents"] = {h: self._public(t) for h, t in self.torrents.items() if t["_rev"] > rid}
+            removed = [h for rev, h in self._removed if rev > rid]
+            if removed:
+                data["torrents_removed"] = removed
+        return data
+
+    def _make_handler(self):
+        server = self
+
+        class handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_GET(self):
+                self._dispatch()
+
+            def do_POST(self):
+                self._dispatch()
+
+            def _dispatch(self):
+                if server.offline:
+                    self.close_connection = True
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                parsed = urlparse(self.path)
+                method = parsed.path.replace("/api/v2/", "", 1)
+                server.requests[method] = server.requests.get(method, 0) + 1
+                form, files = self._read_form(parsed.query)
+
+                if method == "auth/login":
+                    if form.get("username") == server.username and form.get("password") == server.password:
+                        sid = secrets.token_hex(16)
+                        with server._lock:
+                            server.sessions.add(sid)
+                        self._reply(200, "Ok.", cookie=sid)
+                    else:
+                        self._reply(200, "Fails.")
+                    return
+                if method == "auth/logout":
+                    self._reply(200, "")
+                    return
+                if self._session() not in server.sessions:
+                    self._reply(403, "Forbidden")
+                    return
+                status, body = server.handle(method, form, files)
+                self._reply(status, body)
+
+            def _session(self) -> Optional[str]:
+                for part in (self.headers.get("Cookie") or "").split(";"):
+                    key, _, value = part.strip().partition("=")
+                    if key == "SID":
+                        return value
+                return None
+
+            def _read_form(self, query: str):
+                form = {k: v[-1] for k, v in parse_qs(query).items()}
+                files = []
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                content_type = self.headers.get("Content-Type") or ""
+                if content_type.startswith("multipart/form-data"):
+                    message = BytesParser(policy=default_policy).parsebytes(
+                        b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+                    for part in message.iter_parts():
+                        name = part.get_param("name", header="content-disposition")
+                        payload = part.get_payload(decode=True) or b""
+                        if part.get_filename():
+                            files.append(payload)
+                        else:
+                            form[name] = payload.decode("utf-8")
+                elif body:
+                    form.update({k: v[-1] for k, v in parse_qs(body.decode("utf-8")).items()})
+                return form, files
+
+            def _reply(self, status: int, body, cookie: Optional[str] = None):
+                if isinstance(body, (dict, list)):
+                    payload = json.dumps(body).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    payload = str(body).encode("utf-8")
+                    content_type = "text/plain; charset=UTF-8"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                if cookie:
+                    self.send_header("Set-Cookie", f"SID={cookie}; HttpOnly; path=/")
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return handler
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description="qBittorrent Web API 本地替身")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8081)
+    arg_parser.add_argument("--download-seconds", type=float, default=5.0)
+    args = arg_parser.parse_args()
+
+    fake = fakeQbittorrentServer(args.host, args.port, download_seconds=args.download_seconds).start()
+    logger.info(f"Fake qBittorrent listening on {fake.url}")
+    try:
+        fake._thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,228 @@
+"""
+Mikan 风格 RSS 源本地替身
+
+生成指定数量的番剧订阅，每个订阅包含若干集，advance() 按设定的更新量为每个订阅追加新剧集，
+同时提供条目对应的 .torrent 文件下载，用于测试和基准测试。
+
+    python -m benchmark.fakeRss --port 8082 --feeds 20 --episodes 12
+"""
+
+import argparse
+import hashlib
+import logging
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+logger = logging.getLogger(__name__)
+
+
+def bencode(value) -> bytes:
+    """将 int / bytes / str / list / dict 编码为 bencode"""
+    if isinstance(value, int):
+        return b"i%de" % value
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, bytes):
+        return b"%d:%s" % (len(value), value)
+    if isinstance(value, list):
+        return b"l" + b"".join(bencode(item) for item in value) + b"e"
+    if isinstance(value, dict):
+        items = sorted((k.encode("utf-8") if isinstance(k, str) else k, v) for k, v in value.items())
+        return b"d" + b"".join(bencode(k) + bencode(v) for k, v in items) + b"e"
+    raise TypeError(f"cannot bencode {type(value).__name__}")
+
+
+class fakeRssServer:
+    """
+    RSS 源替身
+
+    Args:
+        host: 监听地址
+        port: 监听端口，0 表示随机端口
+        feeds: 订阅数量
+        episodes: 每个订阅的初始剧集数
+        churn: 每次 advance() 为每个订阅追加的剧集数
+        releases: 每集的发布数（不同字幕组）
+        torrent_files: 为 True 时条目附带 .torrent 下载地址，否则使用 magnet 链接
+        latency: 每个请求额外增加的延迟（秒）
+    """
+
+    groups = ["BenchSub", "LoliHouse", "Lilith-Raws", "SweetSub", "ANi"]
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, feeds: int = 20, episodes: int = 12,
+                 churn: int = 1, releases: int = 1, torrent_files: bool = True, latency: float = 0.0):
+        self.feeds = feeds
+        self.churn = churn
+        self.releases = max(1, min(releases, len(self.groups)))
+        self.torrent_files = torrent_files
+        self.latency = latency
+
+        # 每个订阅当前的剧集数
+        self.episode_counts = [episodes] * feeds
+        # 请求计数，按路径统计
+        self.requests: Dict[str, int] = {}
+        # 响应字节数
+        self.bytes_sent = 0
+
+        self._lock = threading.Lock()
+        # infohash -> .torrent 内容
+        self._torrents: Dict[str, bytes] = {}
+        # (订阅, 集数, 发布序号) -> 条目，剧集生成后不再变化
+        self._items: Dict[tuple, Dict] = {}
+        self._published_at = time.time() - 86400
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def feed_url(self, feed: int) -> str:
+        return f"{self.url}/RSS/Bangumi?bangumiId={feed}&subgroupid=1"
+
+    def feed_urls(self) -> List[str]:
+        return [self.feed_url(feed) for feed in range(self.feeds)]
+
+    @property
+    def total_items(self) -> int:
+        """所有订阅当前的条目总数"""
+        return sum(self.episode_counts) * self.releases
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-rss", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def advance(self, churn: Optional[int] = None) -> int:
+        """为每个订阅追加新剧集，返回新增的条目数"""
+        churn = self.churn if churn is None else churn
+        with self._lock:
+            self.episode_counts = [count + churn for count in self.episode_counts]
+        return churn * self.feeds * self.releases
+
+    # ---------- 内容 ----------
+
+    def _item(self, feed: int, episode: int, release: int) -> Dict:
+        key = (feed, episode, release)
+        item = self._items.get(key)
+        if item is not None:
+            return item
+        group = self.groups[release]
+        title = f"[{group}] Bench Bangumi {feed} - {episode:02d} [WebRip 1080p HEVC-10bit AAC][CHS]"
+        info = {
+            "name": f"{title}.mkv",
+            "length": 300 * 1024 * 1024,
+            "piece length": 4 * 1024 * 1024,
+            "pieces": hashlib.sha1(title.encode("utf-8")).digest(),
+        }
+        infohash = hashlib.sha1(bencode(info)).hexdigest()
+        if self.torrent_files:
+            self._torrents[infohash] = bencode({"announce": f"{self.url}/announce", "info": info})
+            link = f"{self.url}/Download/{infohash}.torrent"
+        else:
+            link = f"magnet:?xt=urn:btih:{infohash}&dn={feed}-{episode}"
+        item = {
+            "title": title,
+            "link": link,
+            "page": f"{self.url}/Home/Episode/{infohash}",
+            "pubdate": formatdate(self._published_at + episode * 3600 + release * 60, usegmt=True),
+        }
+        self._items[key] = item
+        return item
+
+    def render_feed(self, feed: int) -> Optional[bytes]:
+        """订阅的 RSS 内容，最新的剧集在前；订阅不存在时返回 None"""
+        if not 0 <= feed < self.feeds:
+            return None
+        with self._lock:
+            count = self.episode_counts[feed]
+            items = [self._item(feed, episode, release)
+                     for episode in range(count, 0, -1) for release in range(self.releases)]
+        parts = [
+            '<?xml version="1.0" encoding="utf-8"?>',
+            '<rss version="2.0"><channel>',
+            f"<title>Mikan Project - Bench Bangumi {feed}</title>",
+            f"<link>{self.url}/Home/Bangumi/{feed}</link>",
+            f"<description>Mikan Project - Bench Bangumi {feed}</description>",
+        ]
+        for item in items:
+            parts.append(
+                f"<item><guid isPermaLink=\"false\">{escape(item['title'])}</guid>"
+                f"<link>{escape(item['page'])}</link>"
+                f"<title>{escape(item['title'])}</title>"
+                f"<pubDate>{item['pubdate']}</pubDate>"
+                f"<enclosure type=\"application/x-bittorrent\" length=\"314572800\" url=\"{escape(item['link'])}\" />"
+                f"</item>")
+        parts.append("</channel></rss>")
+        return "".join(parts).encode("utf-8")
+
+    def _make_handler(self):
+        server = self
+
+        class handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                parsed = urlparse(self.path)
+                server.requests[parsed.path] = server.requests.get(parsed.path, 0) + 1
+                body, content_type = None, "application/xml; charset=utf-8"
+                if parsed.path == "/RSS/Bangumi":
+                    try:
+                        body = server.render_feed(int(parse_qs(parsed.query).get("bangumiId", ["-1"])[0]))
+                    except ValueError:
+                        body = None
+                elif parsed.path.startswith("/Download/") and parsed.path.endswith(".torrent"):
+                    body = server._torrents.get(parsed.path[len("/Download/"):-len(".torrent")])
+                    content_type = "application/x-bittorrent"
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                server.bytes_sent += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return handler
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description="RSS 源本地替身")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8082)
+    arg_parser.add_argument("--feeds", type=int, default=20)
+    arg_parser.add_argument("--episodes", type=int, default=12)
+    arg_parser.add_argument("--releases", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    fake = fakeRssServer(args.host, args.port, args.feeds, args.episodes, releases=args.releases).start()
+    logger.info(f"Fake RSS listening on {fake.url}, first feed: {fake.feed_url(0)}")
+    try:
+        fake._thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
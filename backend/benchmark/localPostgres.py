@@ -0,0 +1,106 @@
+"""
+本地临时 PostgreSQL 实例
+
+在临时目录中 initdb 并启动一个只监听 127.0.0.1 的实例，退出时停止并删除数据目录，
+用于基准测试（需要本机安装 PostgreSQL 服务端程序）。
+
+    with localPostgres() as pg:
+        RSSDatabaseManager(**pg.params)
+"""
+
+import glob
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from typing import Dict, Optional
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+
+def _find_binary(name: str) -> Optional[str]:
+    path = shutil.which(name)
+    if path:
+        return path
+    # Debian/Ubuntu 将服务端程序安装在版本目录下
+    candidates = sorted(glob.glob(f"/usr/lib/postgresql/*/bin/{name}"), reverse=True)
+    return candidates[0] if candidates else None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class localPostgres:
+    """
+    临时 PostgreSQL 实例
+
+    Args:
+        port: 监听端口，0 表示随机端口
+        dbname: 创建的数据库名
+    """
+
+    def __init__(self, port: int = 0, dbname: str = "hclo_bench"):
+        self.initdb = _find_binary("initdb")
+        self.pg_ctl = _find_binary("pg_ctl")
+        if not self.initdb or not self.pg_ctl:
+            raise RuntimeError("PostgreSQL server binaries (initdb, pg_ctl) not found, "
+                               "install PostgreSQL or pass an existing database")
+        self.port = port or _free_port()
+        self.dbname = dbname
+        self.user = "postgres"
+        self.data_dir: Optional[str] = None
+
+    @property
+    def params(self) -> Dict:
+        """RSSDatabaseManager 的连接参数"""
+        return {"host": "127.0.0.1", "port": self.port, "dbname": self.dbname,
+                "user": self.user, "password": ""}
+
+    def start(self) -> "localPostgres":
+        self.data_dir = tempfile.mkdtemp(prefix="hclo-pg-")
+        subprocess.run([self.initdb, "-D", self.data_dir, "-U", self.user, "-A", "trust", "--no-sync"],
+                       check=True, stdout=subprocess.DEVNULL)
+        options = f"-p {self.port} -k {self.data_dir} -c listen_addresses=127.0.0.1 -c fsync=off"
+        subprocess.run([self.pg_ctl, "-D", self.data_dir, "-o", options, "-l",
+                        os.path.join(self.data_dir, "server.log"), "-w", "start"],
+                       check=True, stdout=subprocess.DEVNULL)
+        self._create_database()
+        logger.info(f"Local PostgreSQL listening on 127.0.0.1:{self.port}")
+        return self
+
+    def _create_database(self, timeout: float = 10.0):
+        deadline = time.time() + timeout
+        while True:
+            try:
+                conn = psycopg2.connect(host="127.0.0.1", port=self.port, dbname="postgres", user=self.user)
+                break
+            except psycopg2.OperationalError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.2)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f'CREATE DATABASE "{self.dbname}";')
+        conn.close()
+
+    def stop(self):
+        if not self.data_dir:
+            return
+        subprocess.run([self.pg_ctl, "-D", self.data_dir, "-m", "fast", "-w", "stop"],
+                       check=False, stdout=subprocess.DEVNULL)
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+        self.data_dir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,289 @@
+"""
+端到端流水线基准测试
+
+启动 RSS、OpenAI 兼容接口与 qBittorrent 的本地替身以及临时 PostgreSQL，
+通过 rssManager 添加订阅，再用 parseManager / downloadManager 执行若干完整轮次
+（拉取 RSS → 写入剧集并预取种子 → 解析文件名 → 对账 → 入队 → 提交），每轮之间 RSS 替身追加新剧集。
+报告剧集吞吐、每轮耗时分位数、每个剧集的数据库往返次数与内存峰值，结果以 JSON 保存以便比较。
+
+    python -m benchmark.pipeline --feeds 20 --episodes 12 --cycles 10 --output bench.json
+    python -m benchmark.pipeline --output new.json --baseline bench.json
+    python -m benchmark.pipeline --db-host 127.0.0.1 --db-port 5432 --db-name bench --db-user postgres
+
+未指定 --db-host 时使用 localPostgres 启动临时实例。替身服务与被测代码运行在同一进程中，
+内存峰值包含替身服务的占用。
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import math
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from psycopg2.extensions import cursor as pg_cursor
+
+from module.databse import RSSDatabaseManager
+from module.downloader import QbDownloader
+from module.manager import rssManager, parseManager, downloadManager
+from module.metrics import ENTRIES_INGESTED, EPISODES_PARSED, DB_QUERY_SECONDS
+from module.parser import openaiParser
+from module.settings import configManager
+from .fakeOpenai import fakeOpenaiServer
+from .fakeQbittorrent import fakeQbittorrentServer
+from .fakeRss import fakeRssServer
+from .localPostgres import localPostgres
+from .scaling import _reset
+
+logger = logging.getLogger(__name__)
+
+# 与基线比较的指标：(路径, 越大越好)
+COMPARED_METRICS = [
+    (("summary", "episodes_per_second"), True),
+    (("summary", "parsed_per_second"), True),
+    (("summary", "cycle_seconds", "p50"), False),
+    (("summary", "cycle_seconds", "p95"), False),
+    (("summary", "db_round_trips_per_episode"), False),
+    (("summary", "peak_traced_mb"), False),
+]
+
+
+class countingCursor(pg_cursor):
+    """统计 execute / executemany 次数的游标，每次调用对应一次数据库往返"""
+
+    executions = 0
+    _lock = threading.Lock()
+
+    def execute(self, query, vars=None):
+        with countingCursor._lock:
+            countingCursor.executions += 1
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        with countingCursor._lock:
+            countingCursor.executions += 1
+        return super().executemany(query, vars_list)
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """最近秩法分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def _distribution(values: List[float]) -> Dict:
+    return {"p50": percentile(values, 50), "p95": percentile(values, 95), "p99": percentile(values, 99),
+            "max": max(values) if values else None, "mean": sum(values) / len(values) if values else None}
+
+
+def _db_calls() -> Dict[str, int]:
+    return {key[0]: count for key, count in DB_QUERY_SECONDS.counts().items()}
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _write_config(path: Path, db_params: Dict, rss: fakeRssServer, llm: fakeOpenaiServer,
+                  qb: fakeQbittorrentServer) -> configManager:
+    """在临时目录中生成指向替身服务的配置"""
+    config = configManager(path)
+    config.set_many({
+        "database.host": db_params["host"],
+        "database.port": db_params["port"],
+        "database.database": db_params["dbname"],
+        "database.user": db_params["user"],
+        "database.password": db_params["password"],
+        "openai.base_url": llm.url,
+        "openai.model_name": "bench",
+        "openai.api_key": "bench",
+        "qbittorrent.host": qb.url,
+        "qbittorrent.user": qb.username,
+        "qbittorrent.password": qb.password,
+        "qbittorrent.path_prefix": "/downloads",
+        "downloader.torrent_cache": str(path.parent / "torrents"),
+        # 不等待同一集的其他发布，入队后立即提交
+        "downloader.grace_minutes": 0,
+        "downloader.batch_limit": 100000,
+    })
+    return config
+
+
+def _download_cycle(download_manager: downloadManager) -> int:
+    """与下载调度器一轮相同的步骤（对账、入队、认领、按路径分组提交），同步执行"""
+    download_manager.reconcile()
+    download_manager.enqueue_ready_episodes()
+    jobs = download_manager.next_jobs(download_manager.config.get("downloader.batch_limit", 200))
+    submitted = 0
+    for group in download_manager.group_jobs(jobs).values():
+        submitted += len(download_manager.submit_batch(group))
+    return submitted
+
+
+def run(db_params: Dict, feeds: int, episodes: int, churn: int, releases: int, cycles: int,
+        llm_latency: float, qb_latency: float, rss_latency: float, download_seconds: float,
+        trace_memory: bool = True) -> Dict:
+    _reset(db_params)
+    work_dir = Path(tempfile.mkdtemp(prefix="hclo-bench-"))
+    try:
+        with fakeRssServer(feeds=feeds, episodes=episodes, churn=churn, releases=releases,
+                           latency=rss_latency) as rss, \
+                fakeOpenaiServer(latency=llm_latency) as llm, \
+                fakeQbittorrentServer(download_seconds=download_seconds, latency=qb_latency) as qb:
+            config = _write_config(work_dir / "config.yaml", db_params, rss, llm, qb)
+            db = RSSDatabaseManager.from_config(config)
+            db.conn.cursor_factory = countingCursor
+            rss_manager = rssManager(config, db)
+            parse_manager = parseManager(config, db, openaiParser.from_config(config))
+            download_manager = downloadManager(config, db, QbDownloader.from_config(config))
+            for link in rss.feed_urls():
+                rss_manager.add_rss(link)
+
+            if trace_memory:
+                tracemalloc.start()
+            results = []
+            for cycle in range(cycles):
+                if cycle:
+                    rss.advance()
+                ingested, parsed = ENTRIES_INGESTED.value(), EPISODES_PARSED.value()
+                round_trips = countingCursor.executions
+                start_time = time.perf_counter()
+                parse_manager.run_cycle()
+                parse_seconds = time.perf_counter() - start_time
+                submitted = _download_cycle(download_manager)
+                total_seconds = time.perf_counter() - start_time
+                result = {
+                    "cycle": cycle,
+                    "seconds": total_seconds,
+                    "parse_seconds": parse_seconds,
+                    "download_seconds": total_seconds - parse_seconds,
+                    "ingested": int(ENTRIES_INGESTED.value() - ingested),
+                    "parsed": int(EPISODES_PARSED.value() - parsed),
+                    "submitted": submitted,
+                    "db_round_trips": countingCursor.executions - round_trips,
+                }
+                logger.info(f"Cycle {cycle}: {total_seconds:.2f}s, ingested {result['ingested']}, "
+                            f"parsed {result['parsed']}, submitted {submitted}")
+                results.append(result)
+            peak_traced = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+
+            db_calls = _db_calls()
+            requests = {"rss": dict(rss.requests), "openai": dict(llm.requests), "qbittorrent": dict(qb.requests)}
+            duplicate_adds = qb.duplicate_adds
+            torrents = len(qb.torrents)
+            db.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    total_seconds = sum(r["seconds"] for r in results)
+    submitted = sum(r["submitted"] for r in results)
+    parsed = sum(r["parsed"] for r in results)
+    round_trips = sum(r["db_round_trips"] for r in results)
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "params": {"feeds": feeds, "episodes": episodes, "churn": churn, "releases": releases, "cycles": cycles,
+                   "llm_latency": llm_latency, "qb_latency": qb_latency, "rss_latency": rss_latency,
+                   "download_seconds": download_seconds},
+        "summary": {
+            "seconds": total_seconds,
+            "expected_episodes": rss.total_items,
+            "ingested": sum(r["ingested"] for r in results),
+            "parsed": parsed,
+            "submitted": submitted,
+            "torrents": torrents,
+            "duplicate_adds": duplicate_adds,
+            "episodes_per_second": submitted / total_seconds if total_seconds else None,
+            "parsed_per_second": parsed / total_seconds if total_seconds else None,
+            "cycle_seconds": _distribution([r["seconds"] for r in results]),
+            "parse_seconds": _distribution([r["parse_seconds"] for r in results]),
+            "download_seconds": _distribution([r["download_seconds"] for r in results]),
+            "db_round_trips": round_trips,
+            "db_round_trips_per_episode": round_trips / submitted if submitted else None,
+            "peak_traced_mb": peak_traced / 2 ** 20 if peak_traced is not None else None,
+            # Linux 下 ru_maxrss 单位为 KB
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+        "db_calls": dict(sorted(db_calls.items(), key=lambda item: -item[1])),
+        "requests": requests,
+        "cycles": results,
+    }
+
+
+def compare(result: Dict, baseline: Dict) -> List[Dict]:
+    """与基线结果比较主要指标，change 为相对变化（正数表示变好）"""
+    rows = []
+    for path, higher_is_better in COMPARED_METRICS:
+        current, previous = result, baseline
+        for key in path:
+            current = (current or {}).get(key)
+            previous = (previous or {}).get(key)
+        change = None
+        if current is not None and previous:
+            change = (current - previous) / previous
+            if not higher_is_better:
+                change = -change
+        rows.append({"metric": ".".join(path[1:]), "baseline": previous, "current": current, "change": change})
+    return rows
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description="端到端流水线基准测试")
+    arg_parser.add_argument("--feeds", type=int, default=20, help="订阅数量")
+    arg_parser.add_argument("--episodes", type=int, default=12, help="每个订阅的初始剧集数")
+    arg_parser.add_argument("--churn", type=int, default=1, help="每轮为每个订阅追加的剧集数")
+    arg_parser.add_argument("--releases", type=int, default=1, help="每集的发布数（不同字幕组）")
+    arg_parser.add_argument("--cycles", type=int, default=10)
+    arg_parser.add_argument("--llm-latency", type=float, default=0.05, help="OpenAI 替身每个请求的延迟（秒）")
+    arg_parser.add_argument("--qb-latency", type=float, default=0.005, help="qBittorrent 替身每个请求的延迟（秒）")
+    arg_parser.add_argument("--rss-latency", type=float, default=0.01, help="RSS 替身每个请求的延迟（秒）")
+    arg_parser.add_argument("--download-seconds", type=float, default=1.0, help="qBittorrent 替身中每个种子的模拟下载时长")
+    arg_parser.add_argument("--no-tracemalloc", action="store_true", help="不统计 Python 堆内存峰值（tracemalloc 会拖慢运行）")
+    arg_parser.add_argument("--db-host")
+    arg_parser.add_argument("--db-port", type=int, default=5432)
+    arg_parser.add_argument("--db-name", default="hclo_bench")
+    arg_parser.add_argument("--db-user", default="postgres")
+    arg_parser.add_argument("--db-password", default="")
+    arg_parser.add_argument("--output", help="将结果写入 JSON 文件")
+    arg_parser.add_argument("--baseline", help="与之前保存的 JSON 结果比较")
+    args = arg_parser.parse_args()
+
+    bench_args = (args.feeds, args.episodes, args.churn, args.releases, args.cycles, args.llm_latency,
+                  args.qb_latency, args.rss_latency, args.download_seconds, not args.no_tracemalloc)
+    if args.db_host:
+        output = run({"host": args.db_host, "port": args.db_port, "dbname": args.db_name,
+                      "user": args.db_user, "password": args.db_password}, *bench_args)
+    else:
+        with localPostgres(dbname=args.db_name) as pg:
+            output = run(pg.params, *bench_args)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            output["comparison"] = compare(output, json.load(f))
+
+    print(json.dumps({k: v for k, v in output.items() if k != "cycles"}, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
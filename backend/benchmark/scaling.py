@@ -0,0 +1,212 @@
+"""
+多进程扩展性基准测试
+
+对 1..N 个工作进程分别测量：
+- 解析阶段：各进程通过 claim_unparsed_episodes（SKIP LOCKED 租约）分摊待解析剧集，用固定延迟模拟 LLM 调用
+- 下载阶段：各进程通过 claim_downloads 分摊下载队列，批量提交到 qBittorrent 替身
+并检查每个剧集只被解析/提交一次。
+
+    python -m benchmark.scaling --processes 1 2 4 --bangumi 20 --episodes 50
+    python -m benchmark.scaling --db-host 127.0.0.1 --db-port 5432 --db-name bench --db-user postgres
+
+未指定 --db-host 时使用 localPostgres 启动临时实例。
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import psycopg2
+
+from module.databse import RSSDatabaseManager
+from module.downloader import QbDownloader
+from .fakeQbittorrent import fakeQbittorrentServer
+from .localPostgres import localPostgres
+
+logger = logging.getLogger(__name__)
+
+
+def _reset(params: Dict):
+    """删除基准测试数据库中的所有表"""
+    conn = psycopg2.connect(**params)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public';")
+        for (table,) in cur.fetchall():
+            cur.execute(f'DROP TABLE IF EXISTS "{table}" CASCADE;')
+    conn.close()
+
+
+def _infohash(bangumi: int, episode: int) -> str:
+    return hashlib.sha1(f"{bangumi}-{episode}".encode()).hexdigest()
+
+
+def _seed(params: Dict, bangumi_count: int, episode_count: int) -> List[str]:
+    """创建番剧与待解析剧集，返回 bangumi_id 列表"""
+    db = RSSDatabaseManager(**params)
+    bangumi_ids = []
+    for b in range(bangumi_count):
+        link = f"https://example.invalid/RSS/Bangumi?bangumiId={b}"
+        db.add_rss_source(link)
+        bangumi_id = db.update_bangumi_info(link, f"Bench Bangumi {b}")
+        bangumi_ids.append(bangumi_id)
+        for e in range(1, episode_count + 1):
+            db.add_episode(bangumi_id, f"magnet:?xt=urn:btih:{_infohash(b, e)}&dn=bench-{b}-{e}",
+                           f"[Bench] Bench Bangumi {b} - {e:02d} [1080p].mkv")
+    db.close()
+    return bangumi_ids
+
+
+def _enqueue(params: Dict, bangumi_ids: List[str]) -> int:
+    """将已解析的剧集写入下载队列"""
+    db = RSSDatabaseManager(**params)
+    jobs = []
+    for bangumi_id in bangumi_ids:
+        for episode in db.get_undownloaded_episodes(bangumi_id):
+            jobs.append({
+                "bangumi_id": bangumi_id,
+                "link": episode["link"],
+                "infohash": episode["link"].split("btih:")[1].split("&")[0],
+                "save_path": f"/downloads/{bangumi_id}/Season 1",
+                "display_name": f"{bangumi_id} E{episode['episode']:02d}",
+                "priority": episode["episode"],
+            })
+    inserted = db.enqueue_downloads(jobs)
+    db.close()
+    return inserted
+
+
+def _parse_worker(params: Dict, bangumi_ids: List[str], batch: int, latency: float, ready, go, results):
+    db = RSSDatabaseManager(**params)
+    ready.wait()
+    go.wait()
+    parsed = 0
+    while True:
+        claimed_any = False
+        for bangumi_id in bangumi_ids:
+            episodes = db.claim_unparsed_episodes(bangumi_id, batch)
+            claimed_any = claimed_any or bool(episodes)
+            for episode in episodes:
+                time.sleep(latency)
+                number = int(episode["filename"].rsplit(" - ", 1)[1].split(" ")[0])
+                db.update_episode(bangumi_id, episode["link"], "SFT", True, False, 1, number)
+                db.mark_as_parsed(bangumi_id, episode["link"])
+                parsed += 1
+        if not claimed_any:
+            break
+    results.put(parsed)
+    db.close()
+
+
+def _download_worker(params: Dict, qb_url: str, batch: int, ready, go, results):
+    db = RSSDatabaseManager(**params)
+    qb = QbDownloader(qb_url, "admin", "adminadmin")
+    qb.auth()
+    ready.wait()
+    go.wait()
+    submitted = 0
+    while True:
+        jobs = db.claim_downloads(batch)
+        if not jobs:
+            break
+        groups = defaultdict(list)
+        for job in jobs:
+            groups[job["save_path"]].append(job)
+        for save_path, group in groups.items():
+            confirmed = qb.add_torrents_batch([job["link"] for job in group], save_path,
+                                              expected_hashes=[job["infohash"] for job in group], confirm_retry=1)
+            accepted = [job for job in group if job["infohash"] in confirmed]
+            by_bangumi = defaultdict(list)
+            for job in accepted:
+                by_bangumi[job["bangumi_id"]].append(job["link"])
+            for bangumi_id, links in by_bangumi.items():
+                db.mark_as_downloaded_batch(bangumi_id, links)
+            db.remove_from_download_queue([job["link"] for job in accepted])
+            db.release_download_leases([job["link"] for job in group if job not in accepted])
+            submitted += len(accepted)
+    results.put(submitted)
+    db.close()
+
+
+def _run_phase(context, target, processes: int, args: tuple) -> Dict:
+    ready = context.Barrier(processes + 1)
+    go = context.Event()
+    results = context.Queue()
+    workers = [context.Process(target=target, args=args + (ready, go, results)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    ready.wait()
+    start_time = time.perf_counter()
+    go.set()
+    counts = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - start_time
+    for worker in workers:
+        worker.join()
+    return {"seconds": elapsed, "items": sum(counts), "per_process": counts,
+            "items_per_second": sum(counts) / elapsed if elapsed else None}
+
+
+def run(params: Dict, processes_list: List[int], bangumi_count: int, episode_count: int,
+        batch: int, parse_latency: float, qb_latency: float) -> List[Dict]:
+    context = multiprocessing.get_context("spawn")
+    total = bangumi_count * episode_count
+    results = []
+    for processes in processes_list:
+        _reset(params)
+        bangumi_ids = _seed(params, bangumi_count, episode_count)
+        parse = _run_phase(context, _parse_worker, processes, (params, bangumi_ids, batch, parse_latency))
+        enqueued = _enqueue(params, bangumi_ids)
+        with fakeQbittorrentServer(download_seconds=3600, latency=qb_latency) as qb:
+            download = _run_phase(context, _download_worker, processes, (params, qb.url, batch))
+            duplicates = qb.duplicate_adds
+            torrents = len(qb.torrents)
+        result = {
+            "processes": processes,
+            "episodes": total,
+            "parse": parse,
+            "download": download,
+            "enqueued": enqueued,
+            "torrents": torrents,
+            "duplicate_adds": duplicates,
+            "exactly_once": parse["items"] == total and download["items"] == total and torrents == total,
+        }
+        logger.info(f"{processes} processes: parse {parse['items_per_second']:.1f}/s, "
+                    f"download {download['items_per_second']:.1f}/s, exactly once: {result['exactly_once']}")
+        results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description="多进程扩展性基准测试")
+    arg_parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    arg_parser.add_argument("--bangumi", type=int, default=20)
+    arg_parser.add_argument("--episodes", type=int, default=50)
+    arg_parser.add_argument("--batch", type=int, default=20)
+    arg_parser.add_argument("--parse-latency", type=float, default=0.02, help="模拟每次 LLM 解析的耗时（秒）")
+    arg_parser.add_argument("--qb-latency", type=float, default=0.005, help="qBittorrent 替身每个请求的延迟（秒）")
+    arg_parser.add_argument("--db-host")
+    arg_parser.add_argument("--db-port", type=int, default=5432)
+    arg_parser.add_argument("--db-name", default="hclo_bench")
+    arg_parser.add_argument("--db-user", default="postgres")
+    arg_parser.add_argument("--db-password", default="")
+    arg_parser.add_argument("--output", help="将结果写入 JSON 文件")
+    args = arg_parser.parse_args()
+
+    bench_args = (args.processes, args.bangumi, args.episodes, args.batch, args.parse_latency, args.qb_latency)
+    if args.db_host:
+        output = run({"host": args.db_host, "port": args.db_port, "dbname": args.db_name,
+                      "user": args.db_user, "password": args.db_password}, *bench_args)
+    else:
+        with localPostgres(dbname=args.db_name) as pg:
+            output = run(pg.params, *bench_args)
+
+    print(json.dumps(output, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
@@ -1,15 +1,38 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from module.api import api_router
+from module.api.services import build_container
+from module.metrics import LOG_FORMAT, install_log_context
 import logging
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
+install_log_context()
 logging.basicConfig(
-    level=logging.INFO
+    level=logging.INFO,
+    format=LOG_FORMAT
 )
 
+def _autostart(services):
+    """服务预热完成后启动 runtime.autostart 中的阶段"""
+    autostart = services.get("config").get("runtime.autostart", []) or []
+    if autostart:
+        services.get("worker_runtime").start(autostart)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 只注册服务，数据库、下载器等在后台并行预热，不阻塞服务启动
+    app.state.services = build_container()
+    app.state.services.warm_up(on_done=_autostart)
+    yield
+    app.state.services.close()
+
+
 app = FastAPI(
-    title="HClO Anime API"
+    title="HClO Anime API",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -18,9 +41,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# 大列表响应压缩
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 app.include_router(api_router)
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("main:app", host="127.0.0.1", port=8000)
\ No newline at end of file
+    import argparse
+    from module.manager.workerPool import workerPool
+    arg_parser = argparse.ArgumentParser(description="HClO Anime API")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8000)
+    arg_parser.add_argument("--workers", type=int, default=0,
+                            help="额外启动的解析/下载工作进程数量，与 API 进程通过数据库租约分摊任务")
+    args = arg_parser.parse_args()
+    pool = workerPool(args.workers)
+    pool.start()
+    try:
+        uvicorn.run("main:app", host=args.host, port=args.port)
+    finally:
+        pool.stop()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from . import editConfig, rss, parser, downloader
+from . import editConfig, rss, parser, downloader, workers, system, events, metrics, debug
 from fastapi import APIRouter
 
 # 创建一个主路由，用于挂载所有子路由
@@ -9,3 +9,8 @@ api_router.include_router(editConfig.router)
 api_router.include_router(rss.router)
 api_router.include_router(parser.router)
 api_router.include_router(downloader.router)
+api_router.include_router(workers.router)
+api_router.include_router(system.router)
+api_router.include_router(events.router)
+api_router.include_router(metrics.router)
+api_router.include_router(debug.router)
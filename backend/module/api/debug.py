@@ -0,0 +1,65 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from module.metrics import (TRACER, ProfilerBusyError, sample_stacks, format_collapsed, format_top, profile_process,
+                            format_pstats, dump_pstats)
+
+router = APIRouter(
+    prefix="/debug",
+    tags=["debug"],
+    responses={404: {"description": "Not found"}},
+)
+
+# 单次性能分析的最长时间（秒）
+MAX_PROFILE_SECONDS = 120
+
+
+@router.get("/profile")
+def profile(seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+            mode: str = Query("sample", pattern="^(sample|cprofile)$"),
+            format: str = Query("collapsed", pattern="^(collapsed|top|text|pstats)$"),
+            interval: float = Query(0.005, ge=0.001, le=1),
+            thread: Optional[str] = Query(None, description="只采样名称以此开头的线程，如 parse-scheduler、download-"),
+            sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls|ncalls)$"),
+            limit: int = Query(50, ge=1, le=1000)):
+    """
+    在运行中的服务上进行限时性能分析（阻塞到分析结束）
+    - mode=sample：按 interval 采样其他线程的调用栈，format=collapsed 返回折叠栈（可用于火焰图），format=top 返回按函数汇总
+    - mode=cprofile：对整个进程运行 cProfile，format=text 返回 pstats 报告，format=pstats 返回可用 pstats/snakeviz 打开的二进制文件
+    """
+    try:
+        if mode == "sample":
+            if format not in ("collapsed", "top"):
+                raise HTTPException(status_code=400, detail="采样模式只支持 collapsed / top 格式")
+            samples = sample_stacks(seconds, interval, thread)
+            return PlainTextResponse(format_collapsed(samples) if format == "collapsed" else format_top(samples, limit))
+        if format not in ("text", "pstats"):
+            raise HTTPException(status_code=400, detail="cProfile 模式只支持 text / pstats 格式")
+        stats = profile_process(seconds)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=f"已有正在进行的性能分析: {e}")
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    if format == "pstats":
+        return Response(dump_pstats(stats), media_type="application/octet-stream",
+                        headers={"Content-Disposition": 'attachment; filename="profile.pstats"'})
+    return PlainTextResponse(format_pstats(stats, sort, limit))
+
+
+@router.get("/traces")
+def list_traces(limit: int = Query(50, ge=1, le=1000), name: Optional[str] = None):
+    """
+    最近完成的追踪（按 tracing.sample_rate 采样），最新的在前
+    """
+    return {"sample_rate": TRACER.sample_rate, "traces": TRACER.recent(limit, name)}
+
+
+@router.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    """
+    追踪的完整阶段明细
+    """
+    trace = TRACER.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="追踪不存在或已过期")
+    return trace
@@ -1,8 +1,7 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from module.manager import downloadManager
-import threading
-
-download_manager = downloadManager()
+from fastapi import APIRouter, Depends, HTTPException
+from module.downloader import QbDownloader
+from module.manager import downloadDispatcher, workerRuntime
+from .services import service
 
 router = APIRouter(
     prefix="/downloader",
@@ -10,47 +9,49 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# 全局状态：控制是否已有下载任务在运行
-_is_downloading = False
-_downloading_lock = threading.Lock()
-
-
-def _run_downloading():
-    global _is_downloading
-    with _downloading_lock:
-        if _is_downloading:
-            return
-        _is_downloading = True
-
-    try:
-        download_manager.main()
-    finally:
-        with _downloading_lock:
-            _is_downloading = False
-
 
 @router.post("/main")
-def start_downloading(background_tasks: BackgroundTasks):
+def start_downloading(worker_runtime: workerRuntime = Depends(service("worker_runtime"))):
     """
-    启动下载任务（确保同一时间只有一个任务运行）
+    启动下载调度器（确保同一时间只有一个调度器运行，由后台工作运行时监督）
     """
-    global _is_downloading
-
-    with _downloading_lock:
-        if _is_downloading:
-            raise HTTPException(
-                status_code=429,
-                detail="Download task already in progress. Please wait."
-            )
-
-    background_tasks.add_task(_run_downloading)
+    if not worker_runtime.start_stage("downloader"):
+        raise HTTPException(
+            status_code=429,
+            detail="Download task already in progress. Please wait."
+        )
     return {
         "message": "Start downloading",
     }
 
 
+@router.post("/stop")
+def stop_downloading(worker_runtime: workerRuntime = Depends(service("worker_runtime"))):
+    """停止下载调度器，停止后不会被自动重启"""
+    worker_runtime.stop_stage("downloader")
+    return {"message": "Stopped downloading"}
+
+
+@router.post("/pause")
+def pause_downloading(download_dispatcher: downloadDispatcher = Depends(service("download_dispatcher"))):
+    """暂停下载调度器"""
+    download_dispatcher.pause()
+    return {"message": "Paused downloading"}
+
+
+@router.post("/resume")
+def resume_downloading(download_dispatcher: downloadDispatcher = Depends(service("download_dispatcher"))):
+    """恢复下载调度器"""
+    download_dispatcher.resume()
+    return {"message": "Resumed downloading"}
+
+
 @router.get("/status")
-def downloading_status():
-    """Return whether downloading is currently in progress."""
-    with _downloading_lock:
-        return {"is_downloading": _is_downloading}
\ No newline at end of file
+def downloading_status(download_dispatcher: downloadDispatcher = Depends(service("download_dispatcher")),
+                       qb_downloader: QbDownloader = Depends(service("qbittorrent"))):
+    """Return whether downloading is currently in progress, with dispatcher statistics."""
+    return {
+        "is_downloading": download_dispatcher.is_running,
+        **download_dispatcher.status(),
+        "qbittorrent": qb_downloader.health(),
+    }
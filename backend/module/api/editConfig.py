@@ -1,9 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from typing import Any
-from module.settings import configManager
-
-config = configManager('config/config.yaml')
+from typing import Any, Dict, List, Optional
+from module.settings import configManager, ConfigConflictError
+from .services import service
 
 router = APIRouter(
     prefix="/settings",
@@ -15,13 +14,43 @@ class SetConfigRequest(BaseModel):
     configName: str
     configValue: Any  # 接受任意类型：str, bool, list 等
 
+class BatchGetRequest(BaseModel):
+    keys: List[str]
+
+class BatchSetRequest(BaseModel):
+    values: Dict[str, Any]
+    version: Optional[int] = None  # 读取时的版本号，配置已被他人修改时返回 409
+
 @router.get("/get")
-def getConfig(configName: str):
+def getConfig(configName: str, config: configManager = Depends(service("config"))):
     return config.get(configName)
 
 @router.post("/set")
-def setConfig(request: SetConfigRequest):  # ← 从 JSON body 读取
+def setConfig(request: SetConfigRequest, config: configManager = Depends(service("config"))):  # ← 从 JSON body 读取
+    # 各组件共享同一配置快照，修改后只有订阅了相应配置段的组件会重建
     config.set(request.configName, request.configValue)
     config.save()
-    config.reload()
-    return {"success": True}
\ No newline at end of file
+    return {"success": True, "version": config.version}
+
+@router.get("/all")
+def getAllConfig(config: configManager = Depends(service("config"))):
+    """获取完整配置及其版本号"""
+    snapshot = config.snapshot()
+    return {"version": snapshot.version, "config": snapshot.as_dict()}
+
+@router.post("/batch/get")
+def batchGetConfig(request: BatchGetRequest, config: configManager = Depends(service("config"))):
+    """从同一配置快照中读取多个配置项"""
+    values, version = config.get_many(request.keys)
+    return {"version": version, "values": values}
+
+@router.post("/batch/set")
+def batchSetConfig(request: BatchSetRequest, config: configManager = Depends(service("config"))):
+    """一次修改多个配置项并原子写入配置文件（只产生一个新版本）"""
+    try:
+        changed = config.set_many(request.values, expected_version=request.version)
+    except ConfigConflictError as e:
+        raise HTTPException(status_code=409, detail=f"配置已被修改，请重新加载: {e}")
+    if changed:
+        config.save()
+    return {"success": True, "version": config.version, "changed": changed}
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import time
+from typing import Optional
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+from module.manager import pipeline_events
+from module.manager.eventBus import coalesce
+from .services import ServiceUnavailableError
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+    responses={404: {"description": "Not found"}},
+)
+
+# 每次推送最多包含的（合并后）事件数量
+MAX_BATCH = 200
+
+
+def _sse(event: str, data, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _runtime_status(services) -> Optional[dict]:
+    """后台阶段状态（服务尚未构建完成时返回 None，不在事件循环中等待构建）"""
+    if not services.is_ready("worker_runtime"):
+        return None
+    try:
+        return services.get("worker_runtime").status()
+    except ServiceUnavailableError:
+        return None
+
+
+def _interval(services, key: str, default: float) -> float:
+    try:
+        return float(services.get("config").get(key, default))
+    except Exception:
+        return default
+
+
+@router.get("/stream")
+async def event_stream(request: Request, last_event_id: Optional[str] = Header(None)):
+    """
+    流水线进度事件流（Server-Sent Events）
+
+    - status: 各后台阶段的状态，连接时、阶段变化时及每个心跳间隔推送一次
+    - feed_fetched / episode_parsed / torrent_submitted / submit_failed / cycle_done: 流水线进度
+    - stage / error: 阶段启停与错误
+    - overflow: 客户端落后太多，部分事件已被丢弃
+
+    同类事件在每个推送间隔内合并为一条（count 为合并的数量），
+    读取较慢的客户端会收到合并后更大的批次，不会阻塞发布者。
+    断线重连时浏览器带上 Last-Event-ID，从断点继续推送。
+    """
+    services = request.app.state.services
+    flush_interval = _interval(services, "events.flush_interval", 1.0)
+    heartbeat_interval = _interval(services, "events.heartbeat_interval", 15.0)
+    try:
+        cursor = int(last_event_id) if last_event_id else pipeline_events.last_id
+    except ValueError:
+        cursor = pipeline_events.last_id
+
+    async def generate():
+        nonlocal cursor
+        # 浏览器断线后的重连间隔（毫秒）
+        yield "retry: 3000\n\n"
+        yield _sse("status", _runtime_status(services), cursor)
+        last_status = time.monotonic()
+        while not await request.is_disconnected():
+            await asyncio.sleep(flush_interval)
+            events, dropped = pipeline_events.since(cursor)
+            send_status = time.monotonic() - last_status >= heartbeat_interval
+            if dropped:
+                yield _sse("overflow", {"dropped": dropped})
+            if events:
+                cursor = events[-1]["id"]
+                batch = coalesce(events)
+                if len(batch) > MAX_BATCH:
+                    yield _sse("overflow", {"dropped": len(batch) - MAX_BATCH})
+                    batch = batch[-MAX_BATCH:]
+                yield _sse("pipeline", batch, cursor)
+                send_status = send_status or any(event["type"] in ("stage", "error", "cycle_done")
+                                                 for event in batch)
+            if send_status:
+                yield _sse("status", _runtime_status(services), cursor)
+                last_status = time.monotonic()
+
+    return StreamingResponse(generate(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from module.metrics import REGISTRY
+
+router = APIRouter(
+    tags=["metrics"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/metrics")
+def metrics():
+    """
+    以 Prometheus 文本格式导出本进程的指标
+    """
+    return Response(REGISTRY.render(), media_type=REGISTRY.CONTENT_TYPE)
@@ -1,8 +1,6 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
-from module.manager import parseManager
-import threading
-
-parse_manager = parseManager()
+from fastapi import APIRouter, Depends, HTTPException
+from module.manager import parseManager, parseScheduler, workerRuntime
+from .services import service
 
 router = APIRouter(
     prefix="/parser",
@@ -10,40 +8,29 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# 全局锁和运行状态
-_parsing_lock = threading.Lock()
-_is_parsing = False
-
-
-def _run_parsing():
-    global _is_parsing
-    with _parsing_lock:
-        if _is_parsing:
-            # 已经在运行，直接返回（不会发生，因为调用前已检查）
-            return
-        _is_parsing = True
-
-    try:
-        parse_manager.main()  # 执行耗时解析
-    finally:
-        with _parsing_lock:
-            _is_parsing = False
-
 
 @router.post("/main")
-def add_rss(background_tasks: BackgroundTasks):
-    global _is_parsing
-
-    with _parsing_lock:
-        if _is_parsing:
-            raise HTTPException(status_code=429, detail="Parsing already in progress")
-
-    background_tasks.add_task(_run_parsing)
+def add_rss(worker_runtime: workerRuntime = Depends(service("worker_runtime"))):
+    """
+    启动解析调度器（由后台工作运行时监督）
+    """
+    if not worker_runtime.start_stage("parser"):
+        raise HTTPException(status_code=429, detail="Parsing already in progress")
     return {"message": "Started parsing"}
 
 
 @router.get("/status")
-def parsing_status():
-    """Return whether parsing is currently in progress."""
-    with _parsing_lock:
-        return {"is_parsing": _is_parsing}
\ No newline at end of file
+def parsing_status(parse_scheduler: parseScheduler = Depends(service("parse_scheduler"))):
+    """Return whether parsing is currently in progress, with scheduler statistics."""
+    return {"is_parsing": parse_scheduler.is_running, **parse_scheduler.status()}
+
+
+@router.get("/backlog")
+def parsing_backlog(parse_manager: parseManager = Depends(service("parse_manager"))):
+    """
+    每个番剧的待解析剧集数量（unparsed）、可认领数量、最新发布时间，以及因单轮上限留到下一轮的数量，积压最多的在前
+    """
+    try:
+        return parse_manager.backlog()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取解析积压失败: {str(e)}")
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from module.manager import rssManager
-
-rss_manager = rssManager()
+import base64
+import hashlib
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel
+from module.manager import rssManager, bulkImporter
+from module.rss import parse_opml
+from module.databse import FEED_STATS_SORTS
+from .services import service, ServiceUnavailableError
 
 router = APIRouter(
     prefix="/rss",
@@ -11,31 +17,156 @@ router = APIRouter(
 
 
 @router.post("/add")
-def add_rss(rss_link: str, background_tasks: BackgroundTasks):
+def add_rss(rss_link: str, request: Request,
+            rss_manager: rssManager = Depends(service("rss_manager"))):
     """
-    异步添加 RSS 源（立即返回，后台处理）
+    异步添加 RSS 源（立即返回，后台立即拉取、解析并写入下载队列）
     """
     rss_manager.add_rss(rss_link)
+    try:
+        job = request.app.state.services.get("onboarding_queue").submit(rss_link)
+    except ServiceUnavailableError:
+        # 快速通道不可用时由下一轮定时解析处理
+        return {"message": "RSS 源已添加，将在下一轮解析时处理", "rss_link": rss_link, "status": "pending"}
     return {
         "message": "RSS 源已加入处理队列",
         "rss_link": rss_link,
-        "status": "processing"
+        "status": "processing",
+        "job": job,
     }
 
+
+@router.get("/onboarding")
+def onboarding_status(request: Request):
+    """
+    新订阅快速通道中排队、处理中与最近完成的任务及各阶段耗时
+    """
+    try:
+        return request.app.state.services.get("onboarding_queue").status()
+    except ServiceUnavailableError as e:
+        raise HTTPException(status_code=503, detail=f"服务暂不可用: {e}")
+
+
+@router.get("/stats")
+def feed_stats(hours: float = Query(24, gt=0, le=24 * 365),
+               sort: str = "cost",
+               order: str = Query("desc", pattern="^(asc|desc)$"),
+               limit: int = Query(50, ge=1, le=500),
+               rss_manager: rssManager = Depends(service("rss_manager"))):
+    """
+    每个订阅最近 hours 小时的拉取、解析与提交统计，用于找出最耗时/最浪费的订阅
+
+    - sort: cost（拉取 + LLM 耗时）、fetch_seconds、bytes、llm_calls、llm_seconds、parse_failures、
+      fetch_errors、waste（每个新剧集的流量）、submit_delay（发布到提交的平均延迟）
+    """
+    if sort not in FEED_STATS_SORTS:
+        raise HTTPException(status_code=400, detail=f"不支持的排序方式: {sort}")
+    try:
+        items = rss_manager.feed_stats(hours, sort, order == "desc", limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取订阅统计失败: {str(e)}")
+    return {"hours": hours, "sort": sort, "order": order, "items": items}
+
+
+def _encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": last_id}).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["after"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 是否匹配 etag：逐个比较逗号分隔的实体标签（弱比较，忽略 W/ 前缀），* 匹配任意"""
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for value in if_none_match.split(","):
+        value = value.strip()
+        if value == "*" or (value[2:] if value.startswith("W/") else value) == opaque:
+            return True
+    return False
+
+
 @router.get("/list")
-def list_rss():
+def list_rss(request: Request, response: Response,
+             cursor: Optional[str] = None,
+             limit: int = Query(50, ge=1, le=200),
+             q: Optional[str] = None,
+             pending_only: bool = False,
+             rss_manager: rssManager = Depends(service("rss_manager"))):
     """
-    获取所有已添加的 Bangumi 列表
+    分页获取已添加的 Bangumi 列表及每个番剧的剧集统计（总数、已解析、已下载、待下载）
+
+    - cursor: 上一页返回的 next_cursor，为空表示第一页
+    - q: 按番剧名或链接搜索
+    - pending_only: 只返回有待下载剧集的番剧
+    - 响应带 ETag（目录版本号 + 查询参数），目录未变化时对 If-None-Match 返回 304
     """
+    after_id = _decode_cursor(cursor)
     try:
-        bangumi_list = rss_manager.list_rss()
-        return bangumi_list
+        version = rss_manager.catalogue_version()
+        etag = None
+        if version is not None:
+            digest = hashlib.sha1(f"{after_id}|{limit}|{q or ''}|{pending_only}".encode()).hexdigest()[:16]
+            etag = f'W/"{version}-{digest}"'
+            if _etag_matches(request.headers.get("if-none-match", ""), etag):
+                return Response(status_code=304, headers={"ETag": etag})
+        rows = rss_manager.list_rss_page(after_id, limit + 1, q, pending_only)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取 RSS 列表失败: {str(e)}")
 
+    items = rows[:limit]
+    if etag:
+        response.headers["ETag"] = etag
+    return {
+        "items": items,
+        "next_cursor": _encode_cursor(items[-1]["id"]) if len(rows) > limit else None,
+        "version": version,
+    }
+
+
+class ImportRequest(BaseModel):
+    links: List[str] = []
+    opml: Optional[str] = None  # OPML 文件内容
+
+
+@router.post("/import")
+def import_rss(body: ImportRequest, request: Request,
+               importer: bulkImporter = Depends(service("bulk_importer"))):
+    """
+    批量导入订阅（OPML 和/或链接列表）：并发校验 RSS、解析番剧名称并写入首批剧集，
+    返回每个链接的导入结果
+    """
+    links = list(body.links)
+    if body.opml:
+        try:
+            links.extend(feed["link"] for feed in parse_opml(body.opml))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if not links:
+        raise HTTPException(status_code=400, detail="没有需要导入的链接")
+    try:
+        report = importer.run(links)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"导入失败: {str(e)}")
+    services = request.app.state.services
+    if report["summary"].get("added") and services.is_ready("worker_runtime"):
+        # 立即解析新导入的剧集，无需等待下一轮
+        services.get("worker_runtime").trigger("parser")
+    return report
+
 
 @router.delete("/remove")
-def remove_rss(rss_link: str):
+def remove_rss(rss_link: str, rss_manager: rssManager = Depends(service("rss_manager"))):
     """
     删除指定的 RSS 源
     """
@@ -43,4 +174,91 @@ def remove_rss(rss_link: str):
         rss_manager.remove_rss(rss_link)
         return {"message": "RSS 源删除成功", "rss_link": rss_link}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"删除 RSS 源失败: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"删除 RSS 源失败: {str(e)}")
+
+
+@router.post("/aggregate/add")
+def add_aggregate(rss_link: str, rss_manager: rssManager = Depends(service("rss_manager"))):
+    """
+    添加聚合 RSS 源（如 Mikan MyBangumi），每轮只拉取一次并分发到各订阅
+    """
+    rss_manager.add_aggregate(rss_link)
+    return {"message": "聚合 RSS 源已添加", "rss_link": rss_link}
+
+
+@router.get("/aggregate/list")
+def list_aggregate(rss_manager: rssManager = Depends(service("rss_manager"))):
+    """
+    获取所有聚合 RSS 源及其覆盖的订阅数量
+    """
+    try:
+        return rss_manager.list_aggregate()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取聚合 RSS 列表失败: {str(e)}")
+
+
+@router.delete("/aggregate/remove")
+def remove_aggregate(rss_link: str, rss_manager: rssManager = Depends(service("rss_manager"))):
+    """
+    删除聚合 RSS 源，其覆盖的订阅恢复单独轮询
+    """
+    try:
+        rss_manager.remove_aggregate(rss_link)
+        return {"message": "聚合 RSS 源删除成功", "rss_link": rss_link}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"删除聚合 RSS 源失败: {str(e)}")
+
+
+@router.get("/aliases")
+def list_aliases(bangumi_id: Optional[str] = None, rss_manager: rssManager = Depends(service("rss_manager"))):
+    """
+    番剧名称别名：解析出这些名称的新订阅会归入对应的已有番剧（source 为 auto 表示自动合并时记录）
+    """
+    aliases = rss_manager.list_aliases(bangumi_id)
+    if aliases is None:
+        raise HTTPException(status_code=500, detail="获取别名失败")
+    return aliases
+
+
+@router.post("/aliases")
+def add_alias(alias: str, bangumi_id: str, rss_manager: rssManager = Depends(service("rss_manager"))):
+    """
+    手动添加别名，例如将 `SPY×FAMILY` 指向 `间谍过家家` 的 bangumi_id
+    """
+    key = rss_manager.add_alias(alias, bangumi_id)
+    if not key:
+        raise HTTPException(status_code=400, detail="添加别名失败，请确认别名非空且番剧存在")
+    return {"message": "别名已添加", "alias": alias, "alias_key": key, "bangumi_id": bangumi_id}
+
+
+@router.delete("/aliases")
+def remove_alias(alias: str, rss_manager: rssManager = Depends(service("rss_manager"))):
+    """
+    删除别名（不影响已归入的订阅）
+    """
+    if not rss_manager.remove_alias(alias):
+        raise HTTPException(status_code=404, detail="别名不存在")
+    return {"message": "别名已删除", "alias": alias}
+
+
+@router.get("/duplicates")
+def duplicate_bangumi(threshold: Optional[float] = Query(None, gt=0, le=1),
+                      rss_manager: rssManager = Depends(service("rss_manager"))):
+    """
+    疑似被拆分为多个番剧的重复项（名称相似或属于同一 Mikan 番剧），确认后可通过 /rss/merge 合并
+    """
+    try:
+        return rss_manager.duplicate_candidates(threshold)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查找重复番剧失败: {str(e)}")
+
+
+@router.post("/merge")
+def merge_bangumi(source_id: str, target_id: str, rss_manager: rssManager = Depends(service("rss_manager"))):
+    """
+    将重复的番剧合并到目标番剧：剧集、订阅、下载队列并入目标，原名称记为别名，原子表删除
+    """
+    merged = rss_manager.merge_bangumi(source_id, target_id)
+    if merged is None:
+        raise HTTPException(status_code=400, detail="合并番剧失败，请确认两个番剧均存在且不相同")
+    return {"message": "番剧已合并", "source_id": source_id, "target_id": target_id, "episodes": merged}
@@ -0,0 +1,237 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+from fastapi import HTTPException, Request
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceUnavailableError(RuntimeError):
+    """服务构建失败（例如依赖的数据库不可达），下次获取时会重新尝试构建"""
+
+
+class serviceContainer:
+    """
+    API 共享服务容器（在 FastAPI lifespan 中创建）
+    - 各服务按名称注册工厂函数与依赖，首次获取时才构建，同一服务只构建一次
+    - 构建失败不会被缓存，依赖恢复后下次获取即可成功
+    - warm_up 在后台线程池中并行预热无依赖关系的服务，不阻塞接受请求
+    - 记录每个服务的构建耗时与错误
+    """
+
+    def __init__(self, retry_interval: float = 5.0):
+        """
+        Args:
+            retry_interval: 构建失败后在该时间（秒）内直接返回失败，避免每个请求都等待连接超时
+        """
+        self.retry_interval = float(retry_interval)
+        self._factories: Dict[str, Callable[["serviceContainer"], Any]] = {}
+        self._dependencies: Dict[str, Sequence[str]] = {}
+        self._closers: Dict[str, Callable[[Any], None]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._timings: Dict[str, Dict] = {}
+        self._created_at = time.time()
+
+    def register(self, name: str, factory: Callable[["serviceContainer"], Any],
+                 depends_on: Sequence[str] = (), close: Optional[Callable[[Any], None]] = None):
+        """
+        注册服务
+
+        Args:
+            name: 服务名称
+            factory: 工厂函数，参数为容器本身，通过 container.get() 获取依赖
+            depends_on: 依赖的服务名称，预热时先构建依赖
+            close: 关闭服务时调用
+        """
+        self._factories[name] = factory
+        self._dependencies[name] = tuple(depends_on)
+        self._locks[name] = threading.Lock()
+        if close:
+            self._closers[name] = close
+
+    def get(self, name: str) -> Any:
+        """获取服务，尚未构建时构建（线程安全）"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(name)
+        with self._locks[name]:
+            if name in self._instances:
+                return self._instances[name]
+            timing = self._timings.get(name)
+            if timing and timing["error"] and time.time() - timing["at"] < self.retry_interval:
+                raise ServiceUnavailableError(f"{name}: {timing['error']}")
+            start_time = time.perf_counter()
+            try:
+                instance = self._factories[name](self)
+            except Exception as e:
+                self._timings[name] = {"ready": False, "seconds": time.perf_counter() - start_time,
+                                       "error": str(e), "at": time.time()}
+                logger.error(f"Failed to create service {name}: {e}")
+                raise ServiceUnavailableError(f"{name}: {e}") from e
+            elapsed = time.perf_counter() - start_time
+            self._instances[name] = instance
+            self._timings[name] = {"ready": True, "seconds": elapsed, "error": None, "at": time.time()}
+            logger.info(f"Service {name} ready in {elapsed:.3f} seconds")
+            return instance
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._instances
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, max_workers: int = 4,
+                on_done: Optional[Callable[["serviceContainer"], None]] = None) -> threading.Thread:
+        """
+        在后台线程中并行预热服务：按依赖层级分批，同一批内的服务并行构建
+
+        Returns:
+            threading.Thread: 预热线程
+        """
+        names = list(names or self._factories)
+
+        def level(name: str, seen=()) -> int:
+            deps = [d for d in self._dependencies.get(name, ()) if d not in seen]
+            return 1 + max((level(d, seen + (name,)) for d in deps), default=-1)
+
+        def run():
+            start_time = time.perf_counter()
+            batches: Dict[int, list] = {}
+            for name in names:
+                batches.setdefault(level(name), []).append(name)
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warm-up") as executor:
+                for depth in sorted(batches):
+                    for future in [executor.submit(self._try_get, name) for name in batches[depth]]:
+                        future.result()
+            logger.info(f"Service warm-up finished in {time.perf_counter() - start_time:.3f} seconds")
+            if on_done:
+                try:
+                    on_done(self)
+                except Exception as e:
+                    logger.error(f"Service warm-up callback failed: {e}")
+
+        thread = threading.Thread(target=run, name="service-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def _try_get(self, name: str):
+        try:
+            self.get(name)
+        except ServiceUnavailableError:
+            pass
+
+    def startup_report(self) -> Dict:
+        """每个服务的构建状态与耗时"""
+        return {
+            "uptime_seconds": time.time() - self._created_at,
+            "services": {
+                name: self._timings.get(name, {"ready": False, "seconds": None, "error": None, "at": None})
+                for name in self._factories
+            },
+        }
+
+    def close(self):
+        """按注册的逆序关闭已构建的服务"""
+        for name in reversed(list(self._factories)):
+            instance = self._instances.pop(name, None)
+            closer = self._closers.get(name)
+            if instance is not None and closer:
+                try:
+                    closer(instance)
+                except Exception as e:
+                    logger.error(f"Failed to close service {name}: {e}")
+
+
+def build_container() -> serviceContainer:
+    """注册 API 使用的全部服务（只注册，不构建）"""
+    from module.settings import configManager
+    from module.databse import RSSDatabaseManager
+    from module.downloader import QbDownloader
+    from module.parser import openaiParser
+    from module.metrics import TRACER
+    from module.manager import (rssManager, parseManager, parseScheduler, downloadManager,
+                                downloadDispatcher, workerRuntime, bulkImporter, onboardingQueue)
+
+    def database(c):
+        db = RSSDatabaseManager.from_config(c.get("config"))
+        if not db.connected:
+            raise ConnectionError("cannot connect to database")
+        return db
+
+    def parse_manager(c):
+        manager = parseManager(c.get("config"), c.get("database"), c.get("openai"))
+        # 解析完成后唤醒下载调度器
+        manager.on_cycle_done = lambda: c.get("download_dispatcher").wake()
+        return manager
+
+    def worker_runtime(c):
+        runtime = workerRuntime.from_config({
+            "parser": c.get("parse_scheduler"),
+            "downloader": c.get("download_dispatcher"),
+        }, c.get("config"))
+        # 构建后立即启动监督线程，阶段由 API 或 runtime.autostart 启动
+        runtime.start()
+        return runtime
+
+    def onboarding_queue(c):
+        dispatcher = c.get("download_dispatcher")
+
+        def on_ready():
+            # 新订阅的剧集解析完成后立即写入下载队列，由下载调度器提交
+            c.get("download_manager").enqueue_ready_episodes()
+            dispatcher.wake()
+
+        onboarding = onboardingQueue.from_config(c.get("parse_manager"), c.get("config"), on_ready)
+        onboarding.start()
+        return onboarding
+
+    container = serviceContainer()
+    def config(c):
+        shared = configManager.shared("config/config.yaml")
+        # 其他进程（工作进程或手动编辑）修改配置文件后自动重新加载
+        shared.start_watching(shared.get("runtime.config_watch_interval", 2))
+        TRACER.bind_config(shared)
+        return shared
+
+    container.register("config", config, close=lambda shared: shared.stop_watching())
+    container.register("database", database, depends_on=("config",), close=lambda db: db.close())
+    container.register("qbittorrent", lambda c: QbDownloader.from_config(c.get("config")), depends_on=("config",))
+    container.register("openai", lambda c: openaiParser.from_config(c.get("config")), depends_on=("config",))
+    container.register("rss_manager", lambda c: rssManager(c.get("config"), c.get("database")),
+                       depends_on=("config", "database"))
+    container.register("bulk_importer",
+                       lambda c: bulkImporter.from_config(c.get("database"), c.get("openai"), c.get("config")),
+                       depends_on=("config", "database", "openai"))
+    container.register("download_manager",
+                       lambda c: downloadManager(c.get("config"), c.get("database"), c.get("qbittorrent")),
+                       depends_on=("config", "database", "qbittorrent"))
+    container.register("download_dispatcher",
+                       lambda c: downloadDispatcher.from_config(c.get("download_manager"), c.get("config")),
+                       depends_on=("download_manager",))
+    container.register("parse_manager", parse_manager, depends_on=("config", "database", "openai"))
+    container.register("parse_scheduler", lambda c: parseScheduler(c.get("parse_manager")),
+                       depends_on=("parse_manager",))
+    container.register("onboarding_queue", onboarding_queue,
+                       depends_on=("parse_manager", "download_manager", "download_dispatcher"),
+                       close=lambda onboarding: onboarding.stop(10))
+    container.register("worker_runtime", worker_runtime,
+                       depends_on=("parse_scheduler", "download_dispatcher"),
+                       close=lambda runtime: runtime.shutdown())
+    return container
+
+
+def service(name: str):
+    """
+    FastAPI 依赖：从容器中获取服务，服务不可用时返回 503
+
+        def handler(manager=Depends(service("rss_manager"))): ...
+    """
+    def dependency(request: Request):
+        try:
+            return request.app.state.services.get(name)
+        except ServiceUnavailableError as e:
+            raise HTTPException(status_code=503, detail=f"服务暂不可用: {e}")
+    dependency.__name__ = f"get_{name}"
+    return dependency
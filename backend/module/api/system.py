@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Request
+
+router = APIRouter(
+    prefix="/system",
+    tags=["system"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/startup")
+def startup_report(request: Request):
+    """
+    获取各服务的构建状态与耗时（服务在启动后于后台并行预热）
+    """
+    return request.app.state.services.startup_report()
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException
+from module.manager import workerRuntime
+from .services import service
+
+router = APIRouter(
+    prefix="/workers",
+    tags=["workers"],
+    responses={404: {"description": "Not found"}},
+)
+
+_ACTIONS = {
+    "start": workerRuntime.start_stage,
+    "stop": workerRuntime.stop_stage,
+    "pause": workerRuntime.pause_stage,
+    "resume": workerRuntime.resume_stage,
+    "trigger": workerRuntime.trigger,
+}
+
+
+@router.get("/status")
+def workers_status(worker_runtime: workerRuntime = Depends(service("worker_runtime"))):
+    """
+    获取每个后台阶段的健康状态、最近一轮耗时与积压数量
+    """
+    return worker_runtime.status()
+
+
+@router.post("/{name}/{action}")
+def control_worker(name: str, action: str, worker_runtime: workerRuntime = Depends(service("worker_runtime"))):
+    """
+    控制后台阶段：start / stop / pause / resume / trigger
+    """
+    if name not in worker_runtime.stages:
+        raise HTTPException(status_code=404, detail=f"未知的后台阶段: {name}")
+    if action not in _ACTIONS:
+        raise HTTPException(status_code=404, detail=f"未知的操作: {action}")
+    result = _ACTIONS[action](worker_runtime, name)
+    if result is False:
+        raise HTTPException(status_code=409,
+                            detail="阶段已在运行" if action == "start" else "阶段未运行")
+    return {"message": f"{action} {name}", "status": worker_runtime.status()[name]}
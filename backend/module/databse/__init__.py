@@ -1 +1,2 @@
-from .postgresManager import RSSDatabaseManager
\ No newline at end of file
+from .postgresManager import RSSDatabaseManager, FEED_STATS_COLUMNS, FEED_STATS_SUM_COLUMNS, \
+    FEED_STATS_MAX_COLUMNS, FEED_STATS_SORTS
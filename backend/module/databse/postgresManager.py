@@ -1,23 +1,118 @@
 import hashlib
+import os
+import socket
 import psycopg2
+from psycopg2.extras import execute_values
 import logging
+import threading
 from psycopg2 import sql
-from typing import Optional, List, Dict, Tuple
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, Optional, List, Dict, Tuple
+from module.metrics import DB_QUERY_SECONDS, instrument_methods, TRACER, trace_methods
+from module.parser import nameIndex, normalize_name
+from module.rss import mikan_ids
 
 logger = logging.getLogger(__name__)
 
+# 主表变更通知频道，多进程间通过 LISTEN/NOTIFY 使番剧目录缓存失效
+CATALOGUE_CHANNEL = "rss_catalogue"
+
+# feed_stats 中累加的列、取最大值的列（last_status 取最新的非空值）
+FEED_STATS_SUM_COLUMNS = ("fetches", "fetch_errors", "fetch_seconds", "bytes", "entries", "new_entries",
+                          "llm_calls", "llm_seconds", "parse_failures", "submitted", "submit_delay_seconds")
+FEED_STATS_MAX_COLUMNS = ("max_fetch_seconds", "max_submit_delay_seconds")
+FEED_STATS_COLUMNS = FEED_STATS_SUM_COLUMNS + FEED_STATS_MAX_COLUMNS + ("last_status",)
+
+# 订阅统计的排序方式
+FEED_STATS_SORTS = {
+    "cost": "sum(fetch_seconds) + sum(llm_seconds)",
+    "fetch_seconds": "sum(fetch_seconds)",
+    "bytes": "sum(bytes)",
+    "llm_calls": "sum(llm_calls)",
+    "llm_seconds": "sum(llm_seconds)",
+    "parse_failures": "sum(parse_failures)",
+    "fetch_errors": "sum(fetch_errors)",
+    # 每个新剧集消耗的流量，越大越浪费
+    "waste": "sum(bytes)::float8 / GREATEST(sum(new_entries), 1)",
+    "submit_delay": "sum(submit_delay_seconds) / NULLIF(sum(submitted), 0)",
+}
+
+@trace_methods(TRACER, "db", exclude=("singleton_job", "close"))
+@instrument_methods(DB_QUERY_SECONDS, exclude=("singleton_job", "close"))
 class RSSDatabaseManager:
-    def __init__(self, host, port, dbname, user, password):
+    def __init__(self, host, port, dbname, user, password, connect_timeout: int = 10):
         self.conn_params = {
             'host': host,
             'port': port,
             'dbname': dbname,
             'user': user,
-            'password': password
+            'password': password,
+            # 数据库不可达时尽快失败，避免启动长时间阻塞
+            'connect_timeout': connect_timeout
         }
         self.conn = None
+        # rss_main 的进程内读穿缓存，写操作或收到通知时失效
+        self._bangumi_cache: Optional[List[Dict]] = None
+        self._catalogue_version = 0
+        self._cache_lock = threading.Lock()
+        # 本实例已确认结构的番剧子表，避免每次写入都执行 DDL
+        self._ensured_tables = set()
+        # 番剧名称规范化索引，目录变更后重建；相似度低于阈值的名称视为新番剧
+        self.alias_similarity = 0.6
+        self._name_index: Optional[nameIndex] = None
+        self._name_index_version = None
+        # 多进程/多节点共享同一数据库时，用于标识租约持有者
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # 单例任务：advisory lock 为会话级且可重入，同一进程内的线程还需按任务名互斥，
+        # 并各自在专用连接上持有锁（按任务名复用连接）
+        self._job_locks: Dict[str, threading.Lock] = {}
+        self._job_locks_lock = threading.Lock()
+        self._job_conns: Dict[str, Tuple[Dict, object]] = {}
         self._connect()
         self._create_tables()
+        self._listen_catalogue()
+        self._migrate_bangumi_tables()
+
+    @classmethod
+    def from_config(cls, config):
+        """根据配置中的 database.* 创建数据库管理器，database.* 变更后自动重新连接"""
+        db = cls(**cls._params_from_config(config))
+        db.alias_similarity = config.get("parser.alias_similarity", 0.6)
+        config.subscribe(db.apply_config, prefixes=("database", "parser"))
+        return db
+
+    @staticmethod
+    def _params_from_config(config) -> Dict:
+        return {"host": config.get("database.host"),
+                "port": config.get("database.port"),
+                "dbname": config.get("database.database"),
+                "user": config.get("database.user"),
+                "password": config.get("database.password"),
+                "connect_timeout": config.get("database.connect_timeout", 10)}
+
+    def apply_config(self, config, changed=()):
+        """配置订阅回调：连接参数变化时建立新连接，再关闭旧连接"""
+        self.alias_similarity = config.get("parser.alias_similarity", 0.6)
+        params = self._params_from_config(config)
+        if params == self.conn_params:
+            return
+        logger.info("Database settings changed, reconnecting.")
+        old_conn = self.conn
+        self.conn_params = params
+        self._ensured_tables = set()
+        self._connect()
+        if old_conn is not None and old_conn is not self.conn:
+            old_conn.close()
+        if self.connected:
+            self._create_tables()
+            self._listen_catalogue()
+            self._migrate_bangumi_tables()
+        self._invalidate_catalogue(notify=False)
+
+    @property
+    def connected(self) -> bool:
+        return self.conn is not None and not self.conn.closed
 
     def _connect(self):
         try:
@@ -27,6 +122,20 @@ class RSSDatabaseManager:
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
 
+    @contextmanager
+    def _transaction(self) -> Iterator:
+        """
+        在独立的短连接上执行一个事务并产出游标，成功时提交、异常时回滚
+        共享连接为自动提交且被多个线程同时使用，不能在其上手动 BEGIN/COMMIT
+        """
+        conn = psycopg2.connect(**self.conn_params)
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    yield cur
+        finally:
+            conn.close()
+
     def _create_tables(self):
         """创建主表 rss_main（如果不存在）"""
         try:
@@ -39,17 +148,462 @@ class RSSDatabaseManager:
                         bangumi_name TEXT DEFAULT NULL
                     );
                 """)
+                # 持久化下载队列：priority 越大越优先（取发布时间），同番剧内按优先级、番剧间轮转
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS download_queue (
+                        id BIGSERIAL PRIMARY KEY,
+                        bangumi_id TEXT NOT NULL,
+                        link TEXT NOT NULL UNIQUE,
+                        infohash TEXT DEFAULT NULL,
+                        save_path TEXT NOT NULL,
+                        category TEXT DEFAULT NULL,
+                        display_name TEXT DEFAULT NULL,
+                        priority DOUBLE PRECISION NOT NULL DEFAULT 0,
+                        enqueued_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    );
+                """)
+                # feed_link 为剧集来源的订阅，多个订阅合并到同一番剧后按来源记录提交统计
+                cur.execute("ALTER TABLE download_queue ADD COLUMN IF NOT EXISTS feed_link TEXT DEFAULT NULL;")
+                # 多个工作进程通过租约认领队列中的任务，租约过期后可被其他进程重新认领
+                cur.execute("""
+                    ALTER TABLE download_queue
+                        ADD COLUMN IF NOT EXISTS leased_by TEXT DEFAULT NULL,
+                        ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ DEFAULT NULL;
+                """)
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS download_queue_bangumi_priority
+                    ON download_queue (bangumi_id, priority DESC, id);
+                """)
+                # 同一集（番剧、季、集）的多个发布中选定的版本，link 为空表示仍在等待窗口内
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS release_picks (
+                        bangumi_id TEXT NOT NULL,
+                        season INTEGER NOT NULL,
+                        episode INTEGER NOT NULL,
+                        link TEXT DEFAULT NULL,
+                        score DOUBLE PRECISION DEFAULT NULL,
+                        first_seen TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        PRIMARY KEY (bangumi_id, season, episode)
+                    );
+                """)
+                # source 为覆盖该订阅的聚合 RSS（如 Mikan MyBangumi），非空时不再单独轮询该订阅
+                cur.execute("ALTER TABLE rss_main ADD COLUMN IF NOT EXISTS source TEXT DEFAULT NULL;")
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS aggregate_feeds (
+                        link TEXT PRIMARY KEY,
+                        added_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        last_fetched TIMESTAMPTZ DEFAULT NULL
+                    );
+                """)
+                # 聚合 RSS 条目的路由键（Mikan bangumiId / 字幕组 / 学习到的标题）到订阅链接的映射
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS feed_routes (
+                        route_key TEXT PRIMARY KEY,
+                        link TEXT NOT NULL REFERENCES rss_main (link) ON DELETE CASCADE
+                    );
+                """)
+                # 每个番剧的剧集统计，由番剧子表上的语句级触发器增量维护，列表接口无需每次计数
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS bangumi_stats (
+                        bangumi_id TEXT PRIMARY KEY,
+                        total BIGINT NOT NULL DEFAULT 0,
+                        parsed BIGINT NOT NULL DEFAULT 0,
+                        downloaded BIGINT NOT NULL DEFAULT 0,
+                        pending BIGINT NOT NULL DEFAULT 0,
+                        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    );
+                """)
+                # 订阅统计滚动表：按小时累计，超过一定天数后合并为按天（resolution 为桶长度，单位秒）
+                cur.execute(f"""
+                    CREATE TABLE IF NOT EXISTS feed_stats (
+                        link TEXT NOT NULL,
+                        resolution INTEGER NOT NULL,
+                        bucket TIMESTAMPTZ NOT NULL,
+                        {", ".join(f"{column} DOUBLE PRECISION NOT NULL DEFAULT 0"
+                                   for column in FEED_STATS_SUM_COLUMNS + FEED_STATS_MAX_COLUMNS)},
+                        last_status INTEGER DEFAULT NULL,
+                        PRIMARY KEY (link, resolution, bucket)
+                    );
+                """)
+                cur.execute("CREATE INDEX IF NOT EXISTS feed_stats_bucket ON feed_stats (bucket);")
+                # 番剧名称别名：归一化后的名称（比较键）到已有番剧的映射，source 为 auto（自动合并）或 manual
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS bangumi_aliases (
+                        alias_key TEXT PRIMARY KEY,
+                        alias TEXT NOT NULL,
+                        bangumi_id TEXT NOT NULL,
+                        source TEXT NOT NULL DEFAULT 'auto',
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    );
+                """)
+                cur.execute("CREATE INDEX IF NOT EXISTS bangumi_aliases_bangumi ON bangumi_aliases (bangumi_id);")
+                # 目录版本号：番剧目录或统计变化时递增（序列不受事务约束，多进程间无锁竞争），用作 ETag
+                cur.execute("CREATE SEQUENCE IF NOT EXISTS catalogue_version;")
+                cur.execute("""
+                    CREATE OR REPLACE FUNCTION rss_episode_stats() RETURNS trigger AS $$
+                    DECLARE
+                        d_total BIGINT := 0;
+                        d_parsed BIGINT := 0;
+                        d_downloaded BIGINT := 0;
+                        d_pending BIGINT := 0;
+                        n_total BIGINT;
+                        n_parsed BIGINT;
+                        n_downloaded BIGINT;
+                        n_pending BIGINT;
+                    BEGIN
+                        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                            SELECT count(*),
+                                   count(*) FILTER (WHERE parsed),
+                                   count(*) FILTER (WHERE downloaded),
+                                   count(*) FILTER (WHERE NOT COALESCE(downloaded, FALSE) AND NOT COALESCE(skipped, FALSE))
+                            INTO n_total, n_parsed, n_downloaded, n_pending FROM new_rows;
+                            d_total := d_total + n_total;
+                            d_parsed := d_parsed + n_parsed;
+                            d_downloaded := d_downloaded + n_downloaded;
+                            d_pending := d_pending + n_pending;
+                        END IF;
+                        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                            SELECT count(*),
+                                   count(*) FILTER (WHERE parsed),
+                                   count(*) FILTER (WHERE downloaded),
+                                   count(*) FILTER (WHERE NOT COALESCE(downloaded, FALSE) AND NOT COALESCE(skipped, FALSE))
+                            INTO n_total, n_parsed, n_downloaded, n_pending FROM old_rows;
+                            d_total := d_total - n_total;
+                            d_parsed := d_parsed - n_parsed;
+                            d_downloaded := d_downloaded - n_downloaded;
+                            d_pending := d_pending - n_pending;
+                        END IF;
+                        IF d_total = 0 AND d_parsed = 0 AND d_downloaded = 0 AND d_pending = 0 THEN
+                            RETURN NULL;
+                        END IF;
+                        INSERT INTO bangumi_stats AS s (bangumi_id, total, parsed, downloaded, pending)
+                        VALUES (TG_ARGV[0], d_total, d_parsed, d_downloaded, d_pending)
+                        ON CONFLICT (bangumi_id) DO UPDATE
+                        SET total = s.total + EXCLUDED.total,
+                            parsed = s.parsed + EXCLUDED.parsed,
+                            downloaded = s.downloaded + EXCLUDED.downloaded,
+                            pending = s.pending + EXCLUDED.pending,
+                            updated_at = now();
+                        PERFORM nextval('catalogue_version');
+                        RETURN NULL;
+                    END;
+                    $$ LANGUAGE plpgsql;
+                """)
             logger.debug("Ensured main table 'rss_main' exists.")
         except Exception as e:
             logger.error(f"Error creating main table: {e}")
 
+    def _ensure_stats_triggers(self, table_name: str, bangumi_id: str):
+        """
+        为番剧子表创建统计触发器，首次创建时在同一事务内锁表并回填统计，
+        避免回填与触发器增量重复计数
+        """
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT count(*) FROM pg_trigger
+                WHERE tgrelid = to_regclass(quote_ident(%s)) AND tgname LIKE 'rss_stats_%%';
+            """, (table_name,))
+            if cur.fetchone()[0] == 3:
+                return
+        table = sql.Identifier(table_name)
+        # 锁表、创建触发器与回填需在同一事务内完成
+        # 子表名超过 63 字节时会被截断，bangumi_id 通过触发器参数传入而非从表名推出
+        with self._transaction() as cur:
+            cur.execute(sql.SQL("LOCK TABLE {} IN SHARE ROW EXCLUSIVE MODE;").format(table))
+            for name, event, referencing in (
+                ("rss_stats_insert", "INSERT", "NEW TABLE AS new_rows"),
+                ("rss_stats_update", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+                ("rss_stats_delete", "DELETE", "OLD TABLE AS old_rows"),
+            ):
+                cur.execute(sql.SQL("DROP TRIGGER IF EXISTS {} ON {};").format(sql.Identifier(name), table))
+                cur.execute(sql.SQL("""
+                    CREATE TRIGGER {} AFTER {} ON {} REFERENCING {}
+                    FOR EACH STATEMENT EXECUTE FUNCTION rss_episode_stats({});
+                """).format(sql.Identifier(name), sql.SQL(event), table, sql.SQL(referencing),
+                             sql.Literal(bangumi_id)))
+            cur.execute(sql.SQL("""
+                INSERT INTO bangumi_stats (bangumi_id, total, parsed, downloaded, pending)
+                SELECT %s, count(*),
+                       count(*) FILTER (WHERE parsed),
+                       count(*) FILTER (WHERE downloaded),
+                       count(*) FILTER (WHERE NOT COALESCE(downloaded, FALSE) AND NOT COALESCE(skipped, FALSE))
+                FROM {}
+                ON CONFLICT (bangumi_id) DO UPDATE
+                SET total = EXCLUDED.total, parsed = EXCLUDED.parsed, downloaded = EXCLUDED.downloaded,
+                    pending = EXCLUDED.pending, updated_at = now();
+            """).format(table), (bangumi_id,))
+            cur.execute("SELECT nextval('catalogue_version');")
+
+    def _migrate_bangumi_tables(self):
+        """启动时确保所有已存在的番剧子表结构为最新"""
+        for bangumi in self.get_all_bangumi() or []:
+            if bangumi["bangumi_id"]:
+                self._ensure_bangumi_table(bangumi["bangumi_id"])
+
+    def _listen_catalogue(self):
+        """订阅主表变更通知，其他进程修改 rss_main 时本进程缓存随之失效"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("LISTEN {};").format(sql.Identifier(CATALOGUE_CHANNEL)))
+            logger.debug(f"Listening on channel '{CATALOGUE_CHANNEL}'.")
+        except Exception as e:
+            logger.error(f"Failed to listen on catalogue channel: {e}")
+
+    def _invalidate_catalogue(self, notify: bool = True):
+        """使番剧目录缓存失效，并通知其他进程"""
+        with self._cache_lock:
+            self._bangumi_cache = None
+            self._catalogue_version += 1
+        if not notify:
+            return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT pg_notify(%s, ''), nextval('catalogue_version');", (CATALOGUE_CHANNEL,))
+        except Exception as e:
+            logger.error(f"Failed to notify catalogue change: {e}")
+
+    def _drain_notifications(self):
+        """非阻塞地读取已到达的通知（不产生数据库往返），有变更则使缓存失效"""
+        try:
+            self.conn.poll()
+        except Exception as e:
+            logger.error(f"Failed to poll catalogue notifications: {e}")
+            self._invalidate_catalogue(notify=False)
+            return
+        if self.conn.notifies:
+            self.conn.notifies.clear()
+            self._invalidate_catalogue(notify=False)
+
+    @property
+    def catalogue_version(self) -> int:
+        """番剧目录版本号，每次目录变更后递增"""
+        self._drain_notifications()
+        return self._catalogue_version
+
     def _generate_bangumi_id(self, bangumi_name: str) -> str:
         """根据番剧名生成 bangumi_id（SHA256 hex）"""
         return hashlib.sha256(bangumi_name.encode('utf-8')).hexdigest()
 
+    def _get_name_index(self) -> nameIndex:
+        """番剧名称规范化索引（别名表 + 已有番剧名称），目录版本变化后重建"""
+        bangumi_list = self.get_all_bangumi() or []
+        version = self.catalogue_version
+        if self._name_index is not None and self._name_index_version == version \
+                and self._name_index.threshold == self.alias_similarity:
+            return self._name_index
+        # 手动与已记录的别名优先于番剧名称本身
+        aliases = self.get_bangumi_aliases()
+        for bangumi in bangumi_list:
+            if bangumi["bangumi_id"] and bangumi["bangumi_name"]:
+                aliases.setdefault(normalize_name(bangumi["bangumi_name"]), bangumi["bangumi_id"])
+        self._name_index = nameIndex(aliases, self.alias_similarity)
+        self._name_index_version = version
+        return self._name_index
+
+    def resolve_bangumi(self, link: str, bangumi_name: str) -> Tuple[str, str]:
+        """
+        将解析出的番剧名称映射到已有番剧，避免同一番剧因名称差异（繁简、大小写、标点、LLM 措辞）
+        被拆分为多个 bangumi_id、子表与下载目录
+
+        已确定番剧的订阅直接返回原番剧；否则依次尝试：同一 Mikan 番剧（不同字幕组）的已有订阅、
+        别名表与名称的精确匹配、三元组相似度匹配；均未命中时按名称生成新的 bangumi_id
+
+        Returns:
+            tuple: (bangumi_id, 应使用的番剧名称)
+        """
+        bangumi_list = [bangumi for bangumi in self.get_all_bangumi() or [] if bangumi["bangumi_id"]]
+        current = next((bangumi for bangumi in bangumi_list if bangumi["link"] == link), None)
+        if current:
+            # 已确定番剧的订阅保持不变，不受之后解析出的名称差异影响
+            return current["bangumi_id"], current["bangumi_name"]
+        if not bangumi_name:
+            # 名称解析失败（LLM 不可用）时不生成新番剧，等待下一轮重新解析
+            return None, None
+        names = {bangumi["bangumi_id"]: bangumi["bangumi_name"] for bangumi in bangumi_list}
+        mikan_id, _ = mikan_ids(link)
+        if mikan_id:
+            for bangumi in bangumi_list:
+                if mikan_ids(bangumi["link"])[0] == mikan_id:
+                    logger.info(f"Merged {bangumi_name} into {bangumi['bangumi_name']} by Mikan bangumiId {mikan_id}")
+                    self._learn_alias(bangumi_name, bangumi["bangumi_id"])
+                    return bangumi["bangumi_id"], bangumi["bangumi_name"]
+        index = self._get_name_index()
+        match = index.lookup(bangumi_name)
+        if match and match[0] in names:
+            bangumi_id, key, score = match
+            if score < 1 or names[bangumi_id] != bangumi_name:
+                logger.info(f"Merged {bangumi_name} into {names[bangumi_id]} (matched {key}, similarity {score:.2f})")
+                self._learn_alias(bangumi_name, bangumi_id)
+            return bangumi_id, names[bangumi_id]
+        bangumi_id = self._generate_bangumi_id(bangumi_name)
+        # 同一轮中随后出现的相近名称可直接命中
+        index.add(normalize_name(bangumi_name), bangumi_id)
+        return bangumi_id, bangumi_name
+
+    def _learn_alias(self, alias: str, bangumi_id: str):
+        """记录自动合并的名称，已有的别名不覆盖"""
+        key = normalize_name(alias)
+        if not key:
+            return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO bangumi_aliases (alias_key, alias, bangumi_id, source)
+                    VALUES (%s, %s, %s, 'auto')
+                    ON CONFLICT (alias_key) DO NOTHING;
+                """, (key, alias, bangumi_id))
+            if self._name_index is not None:
+                self._name_index.add(key, bangumi_id)
+        except Exception as e:
+            logger.error(f"Failed to record alias {alias} of bangumi {bangumi_id}: {e}")
+
+    def get_bangumi_aliases(self) -> Dict[str, str]:
+        """返回别名比较键 -> bangumi_id"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT alias_key, bangumi_id FROM bangumi_aliases;")
+                return dict(cur.fetchall())
+        except Exception as e:
+            logger.error(f"Error fetching bangumi aliases: {e}")
+            return {}
+
+    def list_bangumi_aliases(self, bangumi_id: Optional[str] = None) -> Optional[List[Dict]]:
+        """列出别名及其对应的番剧名称，查询失败时返回 None"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT a.alias, a.alias_key, a.bangumi_id, a.source, a.created_at,
+                           (SELECT m.bangumi_name FROM rss_main m WHERE m.bangumi_id = a.bangumi_id LIMIT 1)
+                               AS bangumi_name
+                    FROM bangumi_aliases a
+                    WHERE %s::text IS NULL OR a.bangumi_id = %s
+                    ORDER BY a.bangumi_id, a.created_at;
+                """, (bangumi_id, bangumi_id))
+                columns = [desc[0] for desc in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
+        except Exception as e:
+            logger.error(f"Error listing bangumi aliases: {e}")
+            return None
+
+    def add_bangumi_alias(self, alias: str, bangumi_id: str) -> Optional[str]:
+        """
+        手动添加别名（覆盖已有的同名别名），之后解析出该名称的订阅归入指定番剧
+
+        Returns:
+            str: 别名的比较键；别名为空、番剧不存在或写入失败时返回 None
+        """
+        key = normalize_name(alias)
+        if not key:
+            logger.error(f"Failed to add alias {alias!r}: alias is empty")
+            return None
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT 1 FROM rss_main WHERE bangumi_id = %s LIMIT 1;", (bangumi_id,))
+                if cur.fetchone() is None:
+                    logger.error(f"Failed to add alias {alias}: bangumi {bangumi_id} does not exist")
+                    return None
+                cur.execute("""
+                    INSERT INTO bangumi_aliases (alias_key, alias, bangumi_id, source)
+                    VALUES (%s, %s, %s, 'manual')
+                    ON CONFLICT (alias_key) DO UPDATE
+                    SET alias = EXCLUDED.alias, bangumi_id = EXCLUDED.bangumi_id, source = 'manual', created_at = now();
+                """, (key, alias, bangumi_id))
+        except Exception as e:
+            logger.error(f"Failed to add alias {alias} for bangumi {bangumi_id}: {e}")
+            return None
+        self._invalidate_catalogue()
+        return key
+
+    def remove_bangumi_alias(self, alias: str) -> bool:
+        """删除别名（可传入别名原文或比较键）"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM bangumi_aliases WHERE alias_key = %s;", (normalize_name(alias),))
+                removed = cur.rowcount > 0
+            if removed:
+                self._invalidate_catalogue()
+            return removed
+        except Exception as e:
+            logger.error(f"Failed to remove alias {alias}: {e}")
+            return False
+
+    def merge_bangumi(self, source_id: str, target_id: str) -> Optional[int]:
+        """
+        将已拆分的重复番剧合并到目标番剧：剧集并入目标子表（已存在的链接保留目标中的记录），
+        订阅、下载队列、选定版本与别名改为指向目标，原名称记为目标的别名，并删除原子表
+
+        Returns:
+            int: 并入目标子表的剧集数量；两个番剧相同、不存在或合并失败时返回 None
+        """
+        if source_id == target_id:
+            logger.error(f"Failed to merge bangumi {source_id}: cannot merge a bangumi into itself")
+            return None
+        try:
+            return self._merge_bangumi(source_id, target_id)
+        except Exception as e:
+            logger.error(f"Failed to merge bangumi {source_id} into {target_id}: {e}")
+            return None
+
+    def _merge_bangumi(self, source_id: str, target_id: str) -> Optional[int]:
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT bangumi_id, bangumi_name FROM rss_main WHERE bangumi_id = ANY(%s);",
+                        ([source_id, target_id],))
+            names = dict(cur.fetchall())
+        missing = [bangumi_id for bangumi_id in (source_id, target_id) if bangumi_id not in names]
+        if missing:
+            logger.error(f"Failed to merge bangumi {source_id} into {target_id}: {', '.join(missing)} not found")
+            return None
+        source_table, target_table = f"rss_{source_id}", f"rss_{target_id}"
+        self._ensure_bangumi_table(source_id)
+        self._ensure_bangumi_table(target_id)
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT column_name FROM information_schema.columns
+                WHERE table_name = %s ORDER BY ordinal_position;
+            """, (source_table,))
+            columns = sql.SQL(", ").join(sql.Identifier(row[0]) for row in cur.fetchall())
+        # 在独立连接的事务中合并，失败时整体回滚，不影响共享连接上其他线程的写入
+        with self._transaction() as cur:
+            # 阻止合并期间向原子表写入新剧集，避免随原子表一起被删除
+            cur.execute(sql.SQL("LOCK TABLE {} IN SHARE ROW EXCLUSIVE MODE;")
+                        .format(sql.Identifier(source_table)))
+            cur.execute(sql.SQL("""
+                INSERT INTO {target} ({columns})
+                SELECT {columns} FROM {source}
+                ON CONFLICT (link) DO NOTHING;
+            """).format(target=sql.Identifier(target_table), source=sql.Identifier(source_table),
+                        columns=columns))
+            merged = cur.rowcount
+            cur.execute("UPDATE rss_main SET bangumi_id = %s, bangumi_name = %s WHERE bangumi_id = %s;",
+                        (target_id, names[target_id], source_id))
+            cur.execute("UPDATE download_queue SET bangumi_id = %s WHERE bangumi_id = %s;",
+                        (target_id, source_id))
+            cur.execute("""
+                INSERT INTO release_picks (bangumi_id, season, episode, link, score, first_seen)
+                SELECT %s, season, episode, link, score, first_seen FROM release_picks WHERE bangumi_id = %s
+                ON CONFLICT (bangumi_id, season, episode) DO NOTHING;
+            """, (target_id, source_id))
+            cur.execute("DELETE FROM release_picks WHERE bangumi_id = %s;", (source_id,))
+            cur.execute("UPDATE bangumi_aliases SET bangumi_id = %s WHERE bangumi_id = %s;",
+                        (target_id, source_id))
+            cur.execute("""
+                INSERT INTO bangumi_aliases (alias_key, alias, bangumi_id, source)
+                VALUES (%s, %s, %s, 'manual')
+                ON CONFLICT (alias_key) DO UPDATE SET bangumi_id = EXCLUDED.bangumi_id;
+            """, (normalize_name(names[source_id]), names[source_id], target_id))
+            cur.execute(sql.SQL("DROP TABLE {};").format(sql.Identifier(source_table)))
+            cur.execute("DELETE FROM bangumi_stats WHERE bangumi_id = %s;", (source_id,))
+        self._ensured_tables.discard(source_table)
+        self._invalidate_catalogue()
+        logger.info(f"Merged bangumi {names[source_id]} ({source_id}) into {names[target_id]} ({target_id}), "
+                    f"{merged} episodes moved")
+        return merged
+
     def _ensure_bangumi_table(self, bangumi_id: str):
         """确保为 bangumi_id 创建对应的子表（表名：rss_<bangumi_id>）"""
         table_name = f"rss_{bangumi_id}"
+        if table_name in self._ensured_tables:
+            return
         try:
             with self.conn.cursor() as cur:
                 cur.execute(sql.SQL("""
@@ -65,6 +619,25 @@ class RSSDatabaseManager:
                         downloaded BOOLEAN DEFAULT FALSE
                     );
                 """).format(sql.Identifier(table_name)))
+                # 旧版本创建的子表补齐新增列
+                cur.execute(sql.SQL("""
+                    ALTER TABLE {}
+                        ADD COLUMN IF NOT EXISTS infohash TEXT DEFAULT NULL,
+                        ADD COLUMN IF NOT EXISTS submitted_at TIMESTAMPTZ DEFAULT NULL,
+                        ADD COLUMN IF NOT EXISTS completed BOOLEAN DEFAULT FALSE,
+                        ADD COLUMN IF NOT EXISTS removed BOOLEAN DEFAULT FALSE,
+                        ADD COLUMN IF NOT EXISTS organized BOOLEAN DEFAULT FALSE,
+                        ADD COLUMN IF NOT EXISTS pubdate TIMESTAMPTZ DEFAULT NULL,
+                        ADD COLUMN IF NOT EXISTS skipped BOOLEAN DEFAULT FALSE,
+                        ADD COLUMN IF NOT EXISTS inner_filename TEXT DEFAULT NULL,
+                        ADD COLUMN IF NOT EXISTS metadata_attempts INTEGER DEFAULT 0,
+                        ADD COLUMN IF NOT EXISTS metadata_retry_at TIMESTAMPTZ DEFAULT NULL,
+                        ADD COLUMN IF NOT EXISTS lease_owner TEXT DEFAULT NULL,
+                        ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ DEFAULT NULL,
+                        ADD COLUMN IF NOT EXISTS feed_link TEXT DEFAULT NULL;
+                """).format(sql.Identifier(table_name)))
+            self._ensure_stats_triggers(table_name, bangumi_id)
+            self._ensured_tables.add(table_name)
             logger.debug(f"Ensured table '{table_name}' exists.")
         except Exception as e:
             logger.error(f"Error ensuring table '{table_name}': {e}")
@@ -82,18 +655,88 @@ class RSSDatabaseManager:
                     VALUES (%s)
                     ON CONFLICT (link) DO NOTHING;
                 """, (link, ))
+                inserted = cur.rowcount > 0
             logger.info(f"Added/ignored RSS source: {link}")
+            if inserted:
+                self._invalidate_catalogue()
         except Exception as e:
             logger.error(f"Failed to add RSS source {link}: {e}")
             return False
         return True
     
+    def add_subscriptions_bulk(self, subscriptions: List[Tuple[str, str]]) -> Dict[str, str]:
+        """
+        批量添加已解析出番剧名称的订阅（已存在的链接忽略），并创建对应的番剧子表
+
+        Args:
+            subscriptions: [(链接, 番剧名称)]
+
+        Returns:
+            dict: 新添加的链接 -> bangumi_id
+        """
+        if not subscriptions:
+            return {}
+        rows = []
+        for link, name in subscriptions:
+            bangumi_id, bangumi_name = self.resolve_bangumi(link, name)
+            rows.append((link, bangumi_name, bangumi_id))
+        try:
+            with self.conn.cursor() as cur:
+                inserted = execute_values(cur, """
+                    INSERT INTO rss_main (link, bangumi_name, bangumi_id)
+                    VALUES %s
+                    ON CONFLICT (link) DO NOTHING
+                    RETURNING link, bangumi_id;
+                """, rows, fetch=True)
+        except Exception as e:
+            logger.error(f"Failed to add {len(rows)} subscriptions: {e}")
+            raise
+        added = dict(inserted)
+        for bangumi_id in set(added.values()):
+            self._ensure_bangumi_table(bangumi_id)
+        if added:
+            self._invalidate_catalogue()
+        return added
+
+    def add_episodes_bulk(self, bangumi_id: str, episodes: List[Dict], feed_link: Optional[str] = None) -> int:
+        """
+        一条语句批量写入剧集（已存在的链接忽略）
+
+        Args:
+            episodes: RSS 条目，需包含 torrent_link、filename，可选 pubdate
+            feed_link: 剧集来源的订阅链接
+
+        Returns:
+            int: 新写入的剧集数量
+        """
+        rows = list({episode["torrent_link"]: (episode["torrent_link"], episode["filename"], episode.get("pubdate"),
+                                               feed_link)
+                     for episode in episodes}.values())
+        if not rows:
+            return 0
+        self._ensure_bangumi_table(bangumi_id)
+        try:
+            with self.conn.cursor() as cur:
+                inserted = execute_values(cur, sql.SQL("""
+                    INSERT INTO {} (link, filename, pubdate, feed_link)
+                    VALUES %s
+                    ON CONFLICT (link) DO NOTHING
+                    RETURNING link;
+                """).format(sql.Identifier(f"rss_{bangumi_id}")).as_string(cur), rows, fetch=True)
+            return len(inserted)
+        except Exception as e:
+            logger.error(f"Failed to add {len(rows)} episodes for bangumi {bangumi_id}: {e}")
+            return 0
+
     def update_bangumi_info(self, link: str, bangumi_name: str):
         """
         为 rss_main 表中指定 link 的条目设置 bangumi_name 和 bangumi_id。
         如果该 link 不存在，会先插入（但通常应已存在）。
         """
-        bangumi_id = self._generate_bangumi_id(bangumi_name)
+        bangumi_id, bangumi_name = self.resolve_bangumi(link, bangumi_name)
+        if not bangumi_id:
+            logger.warning(f"Skipped updating bangumi info for {link}: bangumi name is not resolved")
+            return None
         logger.debug(f"Updating bangumi info for link: {link} -> {bangumi_name} (id: {bangumi_id})")
         try:
             with self.conn.cursor() as cur:
@@ -107,7 +750,10 @@ class RSSDatabaseManager:
                         bangumi_id = EXCLUDED.bangumi_id
                     WHERE rss_main.bangumi_name IS NULL OR rss_main.bangumi_name = '';
                 """, (link, bangumi_name, bangumi_id))
+                updated = cur.rowcount > 0
             logger.info(f"Updated bangumi info for: {link} -> {bangumi_name}")
+            if updated:
+                self._invalidate_catalogue()
         except Exception as e:
             logger.error(f"Failed to update bangumi info for {link}: {e}")
         return bangumi_id
@@ -130,21 +776,136 @@ class RSSDatabaseManager:
                 # 删除主表中的条目
                 cur.execute("DELETE FROM rss_main WHERE link = %s;", (link,))
                 logger.info(f"Deleted RSS source from main table: {link}")
+                cur.execute("DELETE FROM feed_stats WHERE link = %s;", (link,))
+                # 合并后多个订阅可共享同一番剧，仍有其他订阅时保留番剧数据
+                cur.execute("SELECT 1 FROM rss_main WHERE bangumi_id = %s LIMIT 1;", (bangumi_id,))
+                if bangumi_id is None or cur.fetchone() is not None:
+                    self._invalidate_catalogue()
+                    return
+                cur.execute("DELETE FROM download_queue WHERE bangumi_id = %s;", (bangumi_id,))
+                cur.execute("DELETE FROM release_picks WHERE bangumi_id = %s;", (bangumi_id,))
+                cur.execute("DELETE FROM bangumi_stats WHERE bangumi_id = %s;", (bangumi_id,))
+                cur.execute("DELETE FROM bangumi_aliases WHERE bangumi_id = %s;", (bangumi_id,))
 
                 # 删除对应的子表
                 table_name = f"rss_{bangumi_id}"
                 cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(sql.Identifier(table_name)))
+                self._ensured_tables.discard(table_name)
                 logger.info(f"Dropped table: {table_name}")
+            self._invalidate_catalogue()
 
         except Exception as e:
             logger.error(f"Failed to remove RSS source {link}: {e}")
 
+    def set_bangumi_source(self, links: List[str], source: Optional[str]):
+        """设置订阅所属的聚合 RSS，source 为 None 时恢复单独轮询"""
+        if not links:
+            return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE rss_main SET source = %s
+                    WHERE link = ANY(%s) AND source IS DISTINCT FROM %s;
+                """, (source, list(links), source))
+                updated = cur.rowcount > 0
+            if updated:
+                self._invalidate_catalogue()
+        except Exception as e:
+            logger.error(f"Failed to set source of {len(links)} RSS sources: {e}")
+
+    def add_aggregate_feed(self, link: str) -> bool:
+        """注册聚合 RSS 源"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO aggregate_feeds (link) VALUES (%s)
+                    ON CONFLICT (link) DO NOTHING;
+                """, (link,))
+            logger.info(f"Added/ignored aggregate feed: {link}")
+        except Exception as e:
+            logger.error(f"Failed to add aggregate feed {link}: {e}")
+            return False
+        return True
+
+    def remove_aggregate_feed(self, link: str):
+        """删除聚合 RSS 源，其覆盖的订阅恢复单独轮询"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM aggregate_feeds WHERE link = %s;", (link,))
+                cur.execute("UPDATE rss_main SET source = NULL WHERE source = %s;", (link,))
+                updated = cur.rowcount > 0
+            logger.info(f"Removed aggregate feed: {link}")
+            if updated:
+                self._invalidate_catalogue()
+        except Exception as e:
+            logger.error(f"Failed to remove aggregate feed {link}: {e}")
+
+    def get_aggregate_feeds(self) -> List[Dict]:
+        """返回所有聚合 RSS 源及其覆盖的订阅数量"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT f.link, f.added_at, f.last_fetched, COUNT(m.id) AS subscriptions
+                    FROM aggregate_feeds f
+                    LEFT JOIN rss_main m ON m.source = f.link
+                    GROUP BY f.link, f.added_at, f.last_fetched
+                    ORDER BY f.added_at;
+                """)
+                columns = [desc[0] for desc in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
+        except Exception as e:
+            logger.error(f"Error fetching aggregate feeds: {e}")
+            return []
+
+    def touch_aggregate_feed(self, link: str):
+        """记录聚合 RSS 源的最近一次拉取时间"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("UPDATE aggregate_feeds SET last_fetched = now() WHERE link = %s;", (link,))
+        except Exception as e:
+            logger.error(f"Failed to update aggregate feed {link}: {e}")
+
+    def get_feed_routes(self) -> Dict[str, str]:
+        """返回路由键 -> 订阅链接"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT route_key, link FROM feed_routes;")
+                return dict(cur.fetchall())
+        except Exception as e:
+            logger.error(f"Error fetching feed routes: {e}")
+            return {}
+
+    def learn_feed_routes(self, routes: Dict[str, str]):
+        """
+        批量记录路由键 -> 订阅链接，已有的路由键不会被覆盖
+
+        Args:
+            routes: 路由键 -> 订阅链接
+        """
+        if not routes:
+            return
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO feed_routes (route_key, link)
+                    SELECT v.route_key, v.link FROM (VALUES %s) AS v(route_key, link)
+                    WHERE EXISTS (SELECT 1 FROM rss_main WHERE rss_main.link = v.link)
+                    ON CONFLICT (route_key) DO NOTHING;
+                """, list(routes.items()))
+        except Exception as e:
+            logger.error(f"Failed to learn {len(routes)} feed routes: {e}")
+
     def add_episode(self,
                     bangumi_id: str,
                     link: str,
-                    filename: str):
+                    filename: str,
+                    pubdate: Optional[datetime] = None,
+                    feed_link: Optional[str] = None):
         """
-        向对应番剧子表添加剧集信息
+        向对应番剧子表添加剧集信息，feed_link 为剧集来源的订阅链接
+
+        Returns:
+            bool: 是否为新剧集（已存在时返回 False）
         """
         logger.debug(f"Adding episode to bangumi {bangumi_id}: {filename} ({link})")
         try:
@@ -152,14 +913,17 @@ class RSSDatabaseManager:
             table_name = f"rss_{bangumi_id}"
             with self.conn.cursor() as cur:
                 cur.execute(sql.SQL("""
-                    INSERT INTO {} (link, filename)
-                    VALUES (%s, %s)
+                    INSERT INTO {} (link, filename, pubdate, feed_link)
+                    VALUES (%s, %s, %s, %s)
                     ON CONFLICT (link) DO NOTHING
                 """).format(sql.Identifier(table_name)),
-                (link, filename))
+                (link, filename, pubdate, feed_link))
+                inserted = cur.rowcount == 1
             logger.debug(f"Upserted episode: {filename}")
+            return inserted
         except Exception as e:
             logger.error(f"Failed to add episode {link} for bangumi {bangumi_id}: {e}")
+            return False
 
     def update_episode(self,
                        bangumi_id: str,
@@ -229,12 +993,195 @@ class RSSDatabaseManager:
         try:
             with self.conn.cursor() as cur:
                 cur.execute(sql.SQL("""
-                    UPDATE {} SET downloaded = TRUE WHERE link = %s;
+                    UPDATE {} SET downloaded = TRUE, submitted_at = now() WHERE link = %s;
                 """).format(sql.Identifier(table_name)), (link,))
             logger.info(f"Marked as downloaded: {link}")
         except Exception as e:
             logger.error(f"Failed to mark as downloaded {link}: {e}")
 
+    def mark_as_downloaded_batch(self, bangumi_id: str, links: List[str], infohashes: Optional[Dict[str, str]] = None):
+        """
+        批量标记多个条目为已下载
+        infohashes 为 link -> infohash，记录后供下载状态同步使用
+        """
+        if not links:
+            return
+        logger.debug(f"Marking {len(links)} episodes as downloaded in bangumi {bangumi_id}")
+        table_name = f"rss_{bangumi_id}"
+        infohashes = infohashes or {}
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    UPDATE {} AS t
+                    SET downloaded = TRUE,
+                        infohash = COALESCE(v.infohash, t.infohash),
+                        submitted_at = now()
+                    FROM unnest(%s::text[], %s::text[]) AS v(link, infohash)
+                    WHERE t.link = v.link;
+                """).format(sql.Identifier(table_name)),
+                (list(links), [infohashes.get(link) for link in links]))
+            logger.info(f"Marked {len(links)} episodes as downloaded in bangumi {bangumi_id}")
+        except Exception as e:
+            logger.error(f"Failed to mark episodes as downloaded in bangumi {bangumi_id}: {e}")
+
+    def mark_as_completed(self, bangumi_id: str, links: List[str]):
+        """批量标记多个条目为已下载完成"""
+        if not links:
+            return
+        table_name = f"rss_{bangumi_id}"
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    UPDATE {} SET completed = TRUE WHERE link = ANY(%s);
+                """).format(sql.Identifier(table_name)), (list(links),))
+            logger.info(f"Marked {len(links)} episodes as completed in bangumi {bangumi_id}")
+        except Exception as e:
+            logger.error(f"Failed to mark episodes as completed in bangumi {bangumi_id}: {e}")
+
+    def mark_as_organized(self, bangumi_id: str, links: List[str]):
+        """批量标记多个条目为已整理（已重命名、移动到媒体库目录）"""
+        if not links:
+            return
+        table_name = f"rss_{bangumi_id}"
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    UPDATE {} SET organized = TRUE WHERE link = ANY(%s);
+                """).format(sql.Identifier(table_name)), (list(links),))
+            logger.info(f"Marked {len(links)} episodes as organized in bangumi {bangumi_id}")
+        except Exception as e:
+            logger.error(f"Failed to mark episodes as organized in bangumi {bangumi_id}: {e}")
+
+    def get_unorganized_episodes(self) -> List[Dict]:
+        """获取所有已下载完成但尚未整理的剧集"""
+        results = []
+        for bangumi in self.get_all_bangumi() or []:
+            bangumi_id = bangumi["bangumi_id"]
+            if not bangumi_id:
+                continue
+            self._ensure_bangumi_table(bangumi_id)
+            try:
+                with self.conn.cursor() as cur:
+                    cur.execute(sql.SQL("""
+                        SELECT link, infohash, season, episode
+                        FROM {} WHERE completed = TRUE AND organized = FALSE AND infohash IS NOT NULL;
+                    """).format(sql.Identifier(f"rss_{bangumi_id}")))
+                    columns = [desc[0] for desc in cur.description]
+                    results.extend(dict(zip(columns, row),
+                                        bangumi_id=bangumi_id,
+                                        bangumi_name=bangumi["bangumi_name"]) for row in cur.fetchall())
+            except Exception as e:
+                logger.error(f"Error fetching unorganized episodes for {bangumi_id}: {e}")
+        return results
+
+    def requeue_episodes(self, bangumi_id: str, links: List[str]):
+        """将提交失败或停滞的条目重新标记为未下载，等待下次提交"""
+        if not links:
+            return
+        table_name = f"rss_{bangumi_id}"
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    UPDATE {} SET downloaded = FALSE, submitted_at = NULL WHERE link = ANY(%s);
+                """).format(sql.Identifier(table_name)), (list(links),))
+            logger.info(f"Requeued {len(links)} episodes in bangumi {bangumi_id}")
+        except Exception as e:
+            logger.error(f"Failed to requeue episodes in bangumi {bangumi_id}: {e}")
+
+    def mark_as_removed(self, bangumi_id: str, links: List[str]):
+        """标记已提交、但被用户从下载器中删除的条目，不再对账也不重新提交"""
+        if not links:
+            return
+        table_name = f"rss_{bangumi_id}"
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    UPDATE {} SET removed = TRUE WHERE link = ANY(%s);
+                """).format(sql.Identifier(table_name)), (list(links),))
+            logger.info(f"Marked {len(links)} episodes removed from the downloader in bangumi {bangumi_id}")
+        except Exception as e:
+            logger.error(f"Failed to mark episodes as removed in bangumi {bangumi_id}: {e}")
+
+    def get_submitted_episodes(self) -> List[Dict]:
+        """获取所有已提交到下载器但尚未完成的剧集（需已知 infohash）"""
+        results = []
+        for bangumi in self.get_all_bangumi() or []:
+            bangumi_id = bangumi["bangumi_id"]
+            if not bangumi_id:
+                continue
+            self._ensure_bangumi_table(bangumi_id)
+            try:
+                with self.conn.cursor() as cur:
+                    cur.execute(sql.SQL("""
+                        SELECT link, infohash, submitted_at
+                        FROM {} WHERE downloaded = TRUE AND completed = FALSE AND removed = FALSE
+                          AND infohash IS NOT NULL;
+                    """).format(sql.Identifier(f"rss_{bangumi_id}")))
+                    columns = [desc[0] for desc in cur.description]
+                    results.extend(dict(zip(columns, row), bangumi_id=bangumi_id) for row in cur.fetchall())
+            except Exception as e:
+                logger.error(f"Error fetching submitted episodes for {bangumi_id}: {e}")
+        return results
+
+    def get_episodes_without_metadata(self, bangumi_id: str, max_attempts: int = 5) -> List[Dict]:
+        """
+        获取此前预取种子元数据失败、已到重试时间且未超过尝试次数的未下载条目
+        新条目在写入时直接预取，不经过此查询
+        """
+        table_name = f"rss_{bangumi_id}"
+        try:
+            self._ensure_bangumi_table(bangumi_id)
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    SELECT link, filename FROM {}
+                    WHERE infohash IS NULL AND downloaded = FALSE
+                      AND metadata_attempts > 0 AND metadata_attempts < %s
+                      AND metadata_retry_at <= NOW();
+                """).format(sql.Identifier(table_name)), (max_attempts,))
+                return [{"link": link, "filename": filename} for link, filename in cur.fetchall()]
+        except Exception as e:
+            logger.error(f"Error fetching episodes without metadata for {bangumi_id}: {e}")
+            return []
+
+    def record_metadata_failures(self, bangumi_id: str, links: List[str], retry_seconds: float):
+        """记录种子元数据预取失败：尝试次数加一，下次重试时间按尝试次数指数退避"""
+        if not links:
+            return
+        table_name = f"rss_{bangumi_id}"
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    UPDATE {}
+                    SET metadata_attempts = metadata_attempts + 1,
+                        metadata_retry_at = NOW() + make_interval(secs => %s * power(2, metadata_attempts))
+                    WHERE link = ANY(%s);
+                """).format(sql.Identifier(table_name)), (retry_seconds, list(links)))
+        except Exception as e:
+            logger.error(f"Failed to record metadata failures in bangumi {bangumi_id}: {e}")
+
+    def update_torrent_metadata(self, bangumi_id: str, metadata: Dict[str, Dict]):
+        """
+        批量写入种子元数据
+
+        Args:
+            metadata: link -> {infohash, inner_filename}
+        """
+        if not metadata:
+            return
+        table_name = f"rss_{bangumi_id}"
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, sql.SQL("""
+                    UPDATE {} AS t
+                    SET infohash = v.infohash, inner_filename = v.inner_filename
+                    FROM (VALUES %s) AS v(link, infohash, inner_filename)
+                    WHERE t.link = v.link;
+                """).format(sql.Identifier(table_name)).as_string(cur),
+                [(link, meta.get("infohash"), meta.get("inner_filename")) for link, meta in metadata.items()])
+            logger.debug(f"Updated torrent metadata of {len(metadata)} episodes in bangumi {bangumi_id}")
+        except Exception as e:
+            logger.error(f"Failed to update torrent metadata in bangumi {bangumi_id}: {e}")
+
     def get_unparsed_episodes(self, bangumi_id: str) -> List[Dict]:
         """获取某番剧未解析的剧集列表"""
         table_name = f"rss_{bangumi_id}"
@@ -247,7 +1194,7 @@ class RSSDatabaseManager:
 
             with self.conn.cursor() as cur:
                 cur.execute(sql.SQL("""
-                    SELECT link, filename, subtitle_type, hasCHS, hasCHT, season, episode
+                    SELECT link, filename, inner_filename, subtitle_type, hasCHS, hasCHT, season, episode
                     FROM {} WHERE parsed = FALSE;
                 """).format(sql.Identifier(table_name)))
                 columns = [desc[0] for desc in cur.description]
@@ -258,9 +1205,82 @@ class RSSDatabaseManager:
             logger.error(f"Error fetching unparsed episodes for {bangumi_id}: {e}")
             return []
 
-    def get_undownloaded_episodes(self, bangumi_id: str) -> List[Dict]:
+    def count_unparsed_episodes(self) -> int:
+        """统计所有番剧中待解析的剧集数量（一次查询）"""
+        tables = [f"rss_{b['bangumi_id']}" for b in self.get_all_bangumi() or [] if b["bangumi_id"]]
+        if not tables:
+            return 0
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("SELECT COALESCE(SUM(n), 0) FROM ({}) AS counts;").format(
+                    sql.SQL(" UNION ALL ").join(
+                        sql.SQL("SELECT COUNT(*) AS n FROM {} WHERE parsed = FALSE").format(sql.Identifier(t))
+                        for t in dict.fromkeys(tables))))
+                return int(cur.fetchone()[0])
+        except Exception as e:
+            logger.error(f"Error counting unparsed episodes: {e}")
+            return 0
+
+    def get_unparsed_backlog(self) -> Dict[str, Dict]:
+        """
+        按番剧统计待解析的剧集（一次查询）
+
+        Returns:
+            dict: bangumi_id -> {"unparsed", "claimable", "newest_pubdate"}，claimable 为未被其他进程认领的数量
+        """
+        bangumi_ids = list(dict.fromkeys(b["bangumi_id"] for b in self.get_all_bangumi() or [] if b["bangumi_id"]))
+        if not bangumi_ids:
+            return {}
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL(" UNION ALL ").join(
+                    sql.SQL("""
+                        SELECT {bangumi_id}, COUNT(*),
+                               COUNT(*) FILTER (WHERE lease_until IS NULL OR lease_until < now()),
+                               MAX(pubdate)
+                        FROM {table} WHERE parsed = FALSE HAVING COUNT(*) > 0
+                    """).format(bangumi_id=sql.Literal(bangumi_id), table=sql.Identifier(f"rss_{bangumi_id}"))
+                    for bangumi_id in bangumi_ids))
+                return {bangumi_id: {"unparsed": unparsed, "claimable": claimable, "newest_pubdate": newest}
+                        for bangumi_id, unparsed, claimable, newest in cur.fetchall()}
+        except Exception as e:
+            logger.error(f"Error counting unparsed episodes by bangumi: {e}")
+            return {}
+
+    def claim_unparsed_episodes(self, bangumi_id: str, limit: int, lease_seconds: float = 300) -> List[Dict]:
+        """
+        认领某番剧中最多 limit 个待解析剧集（FOR UPDATE SKIP LOCKED + 租约），最近发布的优先
+        已被其他进程认领且租约未过期的剧集会被跳过，进程异常退出后租约到期即可被重新认领
+        """
+        table_name = f"rss_{bangumi_id}"
+        try:
+            self._ensure_bangumi_table(bangumi_id)
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    UPDATE {table} AS t
+                    SET lease_owner = %s, lease_until = now() + make_interval(secs => %s)
+                    FROM (
+                        SELECT link FROM {table}
+                        WHERE parsed = FALSE AND (lease_until IS NULL OR lease_until < now())
+                        ORDER BY pubdate DESC NULLS LAST
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    ) AS c
+                    WHERE t.link = c.link
+                    RETURNING t.link, t.filename, t.inner_filename, t.subtitle_type,
+                              t.hasCHS, t.hasCHT, t.season, t.episode, t.feed_link;
+                """).format(table=sql.Identifier(table_name)), (self.worker_id, lease_seconds, limit))
+                columns = [desc[0] for desc in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
+        except Exception as e:
+            logger.error(f"Failed to claim unparsed episodes for {bangumi_id}: {e}")
+            return []
+
+    def get_undownloaded_episodes(self, bangumi_id: str,
+                                  condition: Optional[Tuple[sql.Composable, List]] = None) -> List[Dict]:
         """
         获取某番剧中所有未下载的剧集列表
+        condition 为额外的 (SQL 条件片段, 参数) ，如 downloadFilter.to_sql() 的结果
         """
         table_name = f"rss_{bangumi_id}"
         try:
@@ -272,10 +1292,12 @@ class RSSDatabaseManager:
                     return []
 
             with self.conn.cursor() as cur:
+                where, params = condition or (sql.SQL("TRUE"), [])
                 cur.execute(sql.SQL("""
-                    SELECT link, filename, subtitle_type, hasCHS, hasCHT, season, episode, parsed
-                    FROM {} WHERE downloaded = FALSE;
-                """).format(sql.Identifier(table_name)))
+                    SELECT link, filename, subtitle_type, hasCHS, hasCHT, season, episode, parsed, pubdate, infohash,
+                           feed_link
+                    FROM {} WHERE downloaded = FALSE AND skipped = FALSE AND ({});
+                """).format(sql.Identifier(table_name), where), params)
                 columns = [desc[0] for desc in cur.description]
                 results = [dict(zip(columns, row)) for row in cur.fetchall()]
                 logger.debug(f"Retrieved {len(results)} undownloaded episodes for {bangumi_id}.")
@@ -285,18 +1307,445 @@ class RSSDatabaseManager:
             return []
 
     def get_all_bangumi(self) -> List[Dict]:
-        """返回主表中所有番剧信息"""
+        """
+        返回主表中所有番剧信息
+        优先读取进程内缓存，仅在目录变更后才重新查询数据库
+        """
+        self._drain_notifications()
+        with self._cache_lock:
+            if self._bangumi_cache is not None:
+                return [dict(row) for row in self._bangumi_cache]
+            version = self._catalogue_version
         try:
             with self.conn.cursor() as cur:
-                cur.execute("SELECT id, link, bangumi_id, bangumi_name FROM rss_main;")
+                cur.execute("SELECT id, link, bangumi_id, bangumi_name, source FROM rss_main;")
                 columns = [desc[0] for desc in cur.description]
                 results = [dict(zip(columns, row)) for row in cur.fetchall()]
                 logger.debug(f"Retrieved {len(results)} bangumi entries.")
-                return results
         except Exception as e:
             logger.error(f"Error fetching all bangumi: {e}")
+            return None
+        with self._cache_lock:
+            # 查询期间若目录已变更，则不写入可能过期的结果
+            if version == self._catalogue_version:
+                self._bangumi_cache = results
+        return [dict(row) for row in results]
+
+    def get_catalogue_version(self) -> Optional[int]:
+        """数据库级目录版本号（番剧目录或剧集统计变化时递增），用于列表接口的 ETag"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT last_value FROM catalogue_version;")
+                return int(cur.fetchone()[0])
+        except Exception as e:
+            logger.error(f"Error fetching catalogue version: {e}")
+            return None
+
+    def list_bangumi_page(self, after_id: int = 0, limit: int = 50, search: Optional[str] = None,
+                          pending_only: bool = False) -> List[Dict]:
+        """
+        按 id 游标分页读取番剧及其剧集统计
+
+        Args:
+            after_id: 上一页最后一项的 id，0 表示第一页
+            limit: 最多返回的数量
+            search: 按番剧名或链接模糊搜索
+            pending_only: 只返回有待下载剧集的番剧
+        """
+        pattern = f"%{search}%" if search else None
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT m.id, m.link, m.bangumi_id, m.bangumi_name, m.source,
+                           COALESCE(s.total, 0) AS total, COALESCE(s.parsed, 0) AS parsed,
+                           COALESCE(s.downloaded, 0) AS downloaded, COALESCE(s.pending, 0) AS pending
+                    FROM rss_main m
+                    LEFT JOIN bangumi_stats s ON s.bangumi_id = m.bangumi_id
+                    WHERE m.id > %(after_id)s
+                      AND (%(pattern)s::text IS NULL OR m.bangumi_name ILIKE %(pattern)s OR m.link ILIKE %(pattern)s)
+                      AND (NOT %(pending_only)s OR COALESCE(s.pending, 0) > 0)
+                    ORDER BY m.id
+                    LIMIT %(limit)s;
+                """, {"after_id": after_id, "pattern": pattern, "pending_only": pending_only, "limit": limit})
+                columns = [desc[0] for desc in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
+        except Exception as e:
+            logger.error(f"Error listing bangumi page: {e}")
+            raise
+
+    def enqueue_downloads(self, jobs: List[Dict]) -> int:
+        """
+        将待下载任务批量写入持久化下载队列（已在队列中的忽略）
+
+        Args:
+            jobs: 包含 bangumi_id, link, infohash, save_path, category, display_name, priority, feed_link 的任务
+
+        Returns:
+            int: 新入队的数量
+        """
+        if not jobs:
+            return 0
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO download_queue
+                        (bangumi_id, link, infohash, save_path, category, display_name, priority, feed_link)
+                    VALUES %s
+                    ON CONFLICT (link) DO NOTHING;
+                """, [(job["bangumi_id"], job["link"], job.get("infohash"), job["save_path"],
+                       job.get("category"), job.get("display_name"), job.get("priority", 0), job.get("feed_link"))
+                      for job in jobs])
+                inserted = cur.rowcount
+            logger.debug(f"Enqueued {inserted}/{len(jobs)} downloads.")
+            return inserted
+        except Exception as e:
+            logger.error(f"Failed to enqueue downloads: {e}")
+            return 0
+
+    def claim_downloads(self, limit: int, exclude: Optional[List[str]] = None,
+                        lease_seconds: float = 300) -> List[Dict]:
+        """
+        按公平轮转顺序认领下载队列中的任务（FOR UPDATE SKIP LOCKED + 租约）
+        多个工作进程可同时认领而不会重复提交；提交成功后删除，失败时释放租约
+
+        Args:
+            limit: 最多认领的任务数
+            exclude: 需要跳过的链接（如本进程正在提交中的任务）
+            lease_seconds: 租约时长，进程异常退出后到期即可被其他进程重新认领
+        """
+        if limit <= 0:
+            return []
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    WITH ranked AS (
+                        SELECT id, priority,
+                               ROW_NUMBER() OVER (PARTITION BY bangumi_id ORDER BY priority DESC, id) AS turn
+                        FROM download_queue
+                        WHERE link <> ALL(%(exclude)s) AND (lease_until IS NULL OR lease_until < now())
+                    ), picked AS (
+                        SELECT q.id, r.turn
+                        FROM download_queue q JOIN ranked r ON r.id = q.id
+                        WHERE q.lease_until IS NULL OR q.lease_until < now()
+                        ORDER BY r.turn, r.priority DESC, r.id
+                        LIMIT %(limit)s
+                        FOR UPDATE OF q SKIP LOCKED
+                    )
+                    UPDATE download_queue q
+                    SET leased_by = %(owner)s, lease_until = now() + make_interval(secs => %(lease)s)
+                    FROM picked
+                    WHERE q.id = picked.id
+                    RETURNING q.bangumi_id, q.link, q.infohash, q.save_path, q.category,
+                              q.display_name, q.priority, q.feed_link, picked.turn, q.id;
+                """, {"exclude": list(exclude or []), "limit": limit,
+                      "owner": self.worker_id, "lease": lease_seconds})
+                columns = [desc[0] for desc in cur.description]
+                rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+            rows.sort(key=lambda row: (row["turn"], -row["priority"], row["id"]))
+            for row in rows:
+                del row["turn"], row["id"]
+            return rows
+        except Exception as e:
+            logger.error(f"Failed to claim downloads: {e}")
+            return []
+
+    def release_download_leases(self, links: List[str]):
+        """释放本进程认领但未能提交的任务，使其可被立即重新认领"""
+        if not links:
+            return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE download_queue SET leased_by = NULL, lease_until = NULL
+                    WHERE link = ANY(%s) AND leased_by = %s;
+                """, (list(links), self.worker_id))
+        except Exception as e:
+            logger.error(f"Failed to release download leases: {e}")
+
+    @contextmanager
+    def singleton_job(self, name: str) -> Iterator[bool]:
+        """
+        基于会话级 advisory lock 的单例任务（如 RSS 轮询、与下载器对账）
+        同一时间只有一个进程/节点能取得锁，取得时产出 True，否则产出 False，不阻塞等待
+
+            with db.singleton_job("poll_feeds") as acquired:
+                if acquired:
+                    ...
+        """
+        with self._job_locks_lock:
+            local_lock = self._job_locks.setdefault(name, threading.Lock())
+        if not local_lock.acquire(blocking=False):
+            # 本进程的其他线程正在执行该任务
+            yield False
+            return
+        try:
+            acquired = False
+            conn = None
+            try:
+                conn = self._job_connection(name)
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_try_advisory_lock(hashtext(%s));", (name,))
+                    acquired = bool(cur.fetchone()[0])
+            except Exception as e:
+                logger.error(f"Failed to acquire advisory lock {name}: {e}")
+                self._drop_job_connection(name)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    try:
+                        with conn.cursor() as cur:
+                            cur.execute("SELECT pg_advisory_unlock(hashtext(%s));", (name,))
+                    except Exception as e:
+                        # 关闭连接即结束会话并释放锁
+                        logger.error(f"Failed to release advisory lock {name}: {e}")
+                        self._drop_job_connection(name)
+        finally:
+            local_lock.release()
+
+    def _job_connection(self, name: str):
+        """单例任务 name 的专用连接，连接参数变化或连接断开后重新建立；调用方需持有该任务的线程锁"""
+        params, conn = self._job_conns.get(name, (None, None))
+        if conn is None or conn.closed or params != self.conn_params:
+            self._drop_job_connection(name)
+            conn = psycopg2.connect(**self.conn_params)
+            conn.autocommit = True
+            self._job_conns[name] = (dict(self.conn_params), conn)
+        return conn
+
+    def _drop_job_connection(self, name: str):
+        _, conn = self._job_conns.pop(name, (None, None))
+        if conn is not None and not conn.closed:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.debug(f"Failed to close connection of job {name}: {e}")
+
+    def remove_from_download_queue(self, links: List[str]):
+        """从下载队列中删除已提交的任务"""
+        if not links:
+            return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM download_queue WHERE link = ANY(%s);", (list(links),))
+        except Exception as e:
+            logger.error(f"Failed to remove downloads from queue: {e}")
+
+    def remove_unleased_from_download_queue(self, links: List[str]) -> bool:
+        """
+        从下载队列中删除未被认领的任务
+        返回 False 表示其中有任务正被某个进程认领（可能正在提交），此时不应撤下该发布
+        """
+        if not links:
+            return True
+        try:
+            with self.conn.cursor() as cur:
+                # 删除与检查在同一快照中进行：被删除的行均未被认领，不影响 EXISTS 的结果
+                cur.execute("""
+                    WITH removed AS (
+                        DELETE FROM download_queue
+                        WHERE link = ANY(%s) AND (lease_until IS NULL OR lease_until < NOW())
+                        RETURNING link
+                    )
+                    SELECT EXISTS (
+                        SELECT 1 FROM download_queue WHERE link = ANY(%s) AND lease_until >= NOW()
+                    );
+                """, (list(links), list(links)))
+                return not cur.fetchone()[0]
+        except Exception as e:
+            logger.error(f"Failed to remove unleased downloads from queue: {e}")
+            return False
+
+    def get_download_queue_depth(self) -> Dict[str, int]:
+        """返回下载队列中每个番剧的待提交数量"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT bangumi_id, count(*) FROM download_queue GROUP BY bangumi_id;")
+                return dict(cur.fetchall())
+        except Exception as e:
+            logger.error(f"Failed to count download queue: {e}")
+            return {}
+
+    @staticmethod
+    def _feed_stats_merge() -> sql.Composable:
+        """feed_stats 冲突时的合并规则"""
+        assignments = [sql.SQL("{0} = s.{0} + EXCLUDED.{0}").format(sql.Identifier(column))
+                       for column in FEED_STATS_SUM_COLUMNS]
+        assignments += [sql.SQL("{0} = GREATEST(s.{0}, EXCLUDED.{0})").format(sql.Identifier(column))
+                        for column in FEED_STATS_MAX_COLUMNS]
+        assignments.append(sql.SQL("last_status = COALESCE(EXCLUDED.last_status, s.last_status)"))
+        return sql.SQL(", ").join(assignments)
+
+    def record_feed_stats(self, stats: Dict[str, Dict]):
+        """
+        将各订阅本轮的统计累加到当前小时的桶中（一次写入）
+
+        Args:
+            stats: link -> {FEED_STATS_COLUMNS 中的列: 值}
+        """
+        if not stats:
+            return
+        columns = sql.SQL(", ").join(sql.Identifier(column) for column in FEED_STATS_COLUMNS)
+        rows = [(link, *(values.get(column, None if column == "last_status" else 0) for column in FEED_STATS_COLUMNS))
+                for link, values in stats.items()]
+        try:
+            with self.conn.cursor() as cur:
+                query = sql.SQL("""
+                    INSERT INTO feed_stats AS s (link, resolution, bucket, {columns})
+                    SELECT v.link, 3600, date_trunc('hour', now()), {values}
+                    FROM (VALUES %s) AS v(link, {columns})
+                    ON CONFLICT (link, resolution, bucket) DO UPDATE SET {merge};
+                """).format(columns=columns,
+                            values=sql.SQL(", ").join(sql.SQL("v.{}").format(sql.Identifier(column))
+                                                      for column in FEED_STATS_COLUMNS),
+                            merge=self._feed_stats_merge())
+                execute_values(cur, query.as_string(cur), rows,
+                               template="(%s" + ", %s::float8" * (len(FEED_STATS_COLUMNS) - 1) + ", %s::int)")
+        except Exception as e:
+            logger.error(f"Failed to record feed stats: {e}")
+
+    def compact_feed_stats(self, hourly_days: float = 2, retention_days: float = 30) -> int:
+        """
+        将早于 hourly_days 的小时桶合并为天桶，删除早于 retention_days 的统计
+
+        Returns:
+            int: 合并与删除的行数
+        """
+        sums = sql.SQL(", ").join(sql.SQL("sum({0})").format(sql.Identifier(column)) for column in FEED_STATS_SUM_COLUMNS)
+        maxes = sql.SQL(", ").join(sql.SQL("max({0})").format(sql.Identifier(column)) for column in FEED_STATS_MAX_COLUMNS)
+        columns = sql.SQL(", ").join(sql.Identifier(column) for column in FEED_STATS_COLUMNS)
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    WITH moved AS (
+                        DELETE FROM feed_stats
+                        WHERE resolution = 3600 AND bucket < now() - make_interval(secs => %s)
+                        RETURNING *
+                    )
+                    INSERT INTO feed_stats AS s (link, resolution, bucket, {columns})
+                    SELECT link, 86400, date_trunc('day', bucket), {sums}, {maxes},
+                           (array_agg(last_status ORDER BY bucket DESC) FILTER (WHERE last_status IS NOT NULL))[1]
+                    FROM moved
+                    GROUP BY link, date_trunc('day', bucket)
+                    ON CONFLICT (link, resolution, bucket) DO UPDATE SET {merge};
+                """).format(columns=columns, sums=sums, maxes=maxes, merge=self._feed_stats_merge()),
+                (float(hourly_days) * 86400,))
+                merged = cur.rowcount
+                cur.execute("DELETE FROM feed_stats WHERE bucket < now() - make_interval(secs => %s);",
+                            (float(retention_days) * 86400,))
+                return merged + cur.rowcount
+        except Exception as e:
+            logger.error(f"Failed to compact feed stats: {e}")
+            return 0
+
+    def get_feed_stats(self, hours: float = 24, sort: str = "cost", descending: bool = True,
+                       limit: int = 50) -> List[Dict]:
+        """
+        汇总最近 hours 小时内每个订阅的统计
+
+        Args:
+            sort: FEED_STATS_SORTS 中的排序方式
+        """
+        order = sql.SQL(FEED_STATS_SORTS[sort])
+        sums = sql.SQL(", ").join(sql.SQL("sum(f.{0}) AS {0}").format(sql.Identifier(column))
+                                  for column in FEED_STATS_SUM_COLUMNS)
+        maxes = sql.SQL(", ").join(sql.SQL("max(f.{0}) AS {0}").format(sql.Identifier(column))
+                                   for column in FEED_STATS_MAX_COLUMNS)
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    SELECT f.link, m.bangumi_id, m.bangumi_name, {sums}, {maxes},
+                           (array_agg(f.last_status ORDER BY f.bucket DESC)
+                                FILTER (WHERE f.last_status IS NOT NULL))[1] AS last_status,
+                           min(f.bucket) AS since
+                    FROM feed_stats f
+                    LEFT JOIN rss_main m ON m.link = f.link
+                    WHERE f.bucket >= date_trunc('hour', now() - make_interval(secs => %s))
+                    GROUP BY f.link, m.bangumi_id, m.bangumi_name
+                    ORDER BY {order} {direction} NULLS LAST, f.link
+                    LIMIT %s;
+                """).format(sums=sums, maxes=maxes, order=order,
+                            direction=sql.SQL("DESC" if descending else "ASC")),
+                (float(hours) * 3600, limit))
+                columns = [desc[0] for desc in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
+        except Exception as e:
+            logger.error(f"Error fetching feed stats: {e}")
+            raise
+
+    def mark_as_skipped(self, bangumi_id: str, links: List[str]):
+        """批量标记被其他更优发布取代、不再下载的条目"""
+        if not links:
+            return
+        table_name = f"rss_{bangumi_id}"
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    UPDATE {} SET skipped = TRUE WHERE link = ANY(%s);
+                """).format(sql.Identifier(table_name)), (list(links),))
+            logger.info(f"Skipped {len(links)} superseded releases in bangumi {bangumi_id}")
+        except Exception as e:
+            logger.error(f"Failed to mark releases as skipped in bangumi {bangumi_id}: {e}")
+
+    def get_episode_states(self, bangumi_id: str, links: List[str]) -> Dict[str, Dict]:
+        """返回指定条目的下载状态：link -> {downloaded, completed, infohash}"""
+        if not links:
+            return {}
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    SELECT link, downloaded, completed, infohash FROM {} WHERE link = ANY(%s);
+                """).format(sql.Identifier(f"rss_{bangumi_id}")), (list(links),))
+                return {row[0]: {"downloaded": row[1], "completed": row[2], "infohash": row[3]}
+                        for row in cur.fetchall()}
+        except Exception as e:
+            logger.error(f"Failed to fetch episode states for {bangumi_id}: {e}")
+            return {}
+
+    def get_release_picks(self, bangumi_id: str) -> Dict[Tuple[int, int], Dict]:
+        """返回某番剧各集的发布选择：(season, episode) -> {link, score, first_seen}"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT season, episode, link, score, first_seen
+                    FROM release_picks WHERE bangumi_id = %s;
+                """, (bangumi_id,))
+                return {(row[0], row[1]): {"link": row[2], "score": row[3], "first_seen": row[4]}
+                        for row in cur.fetchall()}
+        except Exception as e:
+            logger.error(f"Failed to fetch release picks for {bangumi_id}: {e}")
+            return {}
+
+    def add_release_keys(self, bangumi_id: str, keys: List[Tuple[int, int]]):
+        """记录首次出现的 (season, episode)，开始等待窗口计时"""
+        if not keys:
+            return
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO release_picks (bangumi_id, season, episode)
+                    VALUES %s
+                    ON CONFLICT DO NOTHING;
+                """, [(bangumi_id, season, episode) for season, episode in keys])
+        except Exception as e:
+            logger.error(f"Failed to add release keys for {bangumi_id}: {e}")
+
+    def set_release_pick(self, bangumi_id: str, season: int, episode: int, link: str, score: float):
+        """设置某集选定的发布"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO release_picks (bangumi_id, season, episode, link, score)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT (bangumi_id, season, episode) DO UPDATE
+                    SET link = EXCLUDED.link, score = EXCLUDED.score;
+                """, (bangumi_id, season, episode, link, score))
+        except Exception as e:
+            logger.error(f"Failed to set release pick for {bangumi_id} S{season}E{episode}: {e}")
 
     def close(self):
+        for name in list(self._job_conns):
+            self._drop_job_connection(name)
         if self.conn:
             self.conn.close()
             logger.info("Database connection closed.")
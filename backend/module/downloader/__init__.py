@@ -1 +1,5 @@
-from .qbittorrent import QbDownloader
\ No newline at end of file
+from .qbittorrent import QbDownloader, QbUnavailableError
+from .infohash import extract_infohash
+from .reconciler import qbReconciler
+from .organizer import torrentOrganizer
+from .torrentCache import torrentCache, parse_torrent, main_video_file
\ No newline at end of file
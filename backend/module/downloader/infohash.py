@@ -0,0 +1,39 @@
+import base64
+import re
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+# magnet 链接中的 btih，可能为 40 位十六进制或 32 位 base32
+_btih_pattern = re.compile(r'urn:btih:([0-9a-zA-Z]+)', re.IGNORECASE)
+# 种子地址中的 40 位十六进制 infohash（如 Mikan 的 /Download/<date>/<hash>.torrent）
+_hex_pattern = re.compile(r'(?<![0-9a-fA-F])([0-9a-fA-F]{40})(?![0-9a-fA-F])')
+
+
+def extract_infohash(link: str) -> Optional[str]:
+    """
+    从 magnet 链接或种子下载地址中提取 infohash
+
+    Args:
+        link: magnet 链接或种子 URL
+
+    Returns:
+        str: 小写 40 位十六进制 infohash，无法提取时返回 None
+    """
+    if not link:
+        return None
+    if link.lower().startswith('magnet:'):
+        for xt in parse_qs(urlparse(link).query).get('xt', []):
+            match = _btih_pattern.search(xt)
+            if not match:
+                continue
+            value = match.group(1)
+            if len(value) == 40:
+                return value.lower()
+            if len(value) == 32:
+                try:
+                    return base64.b32decode(value.upper()).hex()
+                except ValueError:
+                    return None
+        return None
+    match = _hex_pattern.search(urlparse(link).path)
+    return match.group(1).lower() if match else None
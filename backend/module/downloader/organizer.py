@@ -0,0 +1,109 @@
+import logging
+import posixpath
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = {".mkv", ".mp4", ".avi", ".ts", ".m2ts", ".webm", ".mov", ".flv", ".rmvb"}
+SUBTITLE_EXTENSIONS = {".ass", ".ssa", ".srt", ".sub", ".vtt", ".sup", ".idx"}
+
+
+class torrentOrganizer:
+    """
+    下载完成后的整理器
+    将已完成剧集按 `Show/Season NN/Show SxxEyy.ext` 组织（含字幕文件），
+    重命名通过 torrents_rename_file 完成，移动按目标目录分组后通过 torrents_set_location 一次提交。
+    整理进度记录在数据库 organized 列中，重启后从断点继续。
+    """
+
+    def __init__(self, qb_downloader, db_manager, path_prefix: str = "/"):
+        self.qb_downloader = qb_downloader
+        self.db_manager = db_manager
+        self.path_prefix = (path_prefix or "").rstrip("/")
+
+    @staticmethod
+    def episode_name(bangumi_name: str, season: Optional[int], episode: Optional[int]) -> Optional[str]:
+        """生成 `Show SxxEyy` 形式的剧集名，缺少集数时返回 None"""
+        if episode is None:
+            return None
+        return f"{bangumi_name} S{int(season or 1):02d}E{int(episode):02d}"
+
+    def target_location(self, bangumi_name: str, season: Optional[int]) -> str:
+        """剧集的保存目录 `前缀/Show/Season NN`，提交下载与整理时共用"""
+        return f"{self.path_prefix}/{bangumi_name}/Season {int(season or 1):02d}"
+
+    @staticmethod
+    def plan_renames(files: List[Dict], episode_name: str) -> Dict[str, str]:
+        """
+        计算种子内文件的新名称
+
+        Args:
+            files: qB 返回的文件列表（含 name）
+            episode_name: `Show SxxEyy`
+
+        Returns:
+            dict: 原路径 -> 新路径；包含多个视频文件（合集）时不重命名
+        """
+        videos = [f for f in files if posixpath.splitext(f["name"])[1].lower() in VIDEO_EXTENSIONS]
+        if len(videos) != 1:
+            return {}
+        renames = {}
+        for f in files:
+            old_path = f["name"]
+            stem, ext = posixpath.splitext(posixpath.basename(old_path))
+            ext_lower = ext.lower()
+            if ext_lower in VIDEO_EXTENSIONS:
+                new_path = f"{episode_name}{ext_lower}"
+            elif ext_lower in SUBTITLE_EXTENSIONS:
+                # 保留字幕语言后缀，如 xxx.chs.ass -> Show S01E01.chs.ass
+                lang = posixpath.splitext(stem)[1]
+                lang = lang if 1 < len(lang) <= 9 else ""
+                new_path = f"{episode_name}{lang}{ext_lower}"
+            else:
+                continue
+            if new_path != old_path and new_path not in renames.values():
+                renames[old_path] = new_path
+        return renames
+
+    def organize(self) -> int:
+        """
+        整理所有已完成但未整理的剧集
+
+        Returns:
+            int: 本轮整理完成的剧集数量
+        """
+        episodes = self.db_manager.get_unorganized_episodes()
+        if not episodes:
+            return 0
+
+        moves = defaultdict(list)
+        done = defaultdict(list)
+        for episode in episodes:
+            name = self.episode_name(episode["bangumi_name"], episode["season"], episode["episode"])
+            try:
+                if name:
+                    files = self.qb_downloader.torrent_files(episode["infohash"])
+                    for old_path, new_path in self.plan_renames(files, name).items():
+                        self.qb_downloader.rename_file(episode["infohash"], old_path, new_path)
+            except Exception as e:
+                logger.error(f"Failed to rename files of {episode['infohash']}: {e}")
+                continue
+            location = self.target_location(episode["bangumi_name"], episode["season"])
+            moves[location].append(episode)
+
+        for location, location_episodes in moves.items():
+            try:
+                self.qb_downloader.set_location([e["infohash"] for e in location_episodes], location)
+            except Exception as e:
+                logger.error(f"Failed to move {len(location_episodes)} torrents to {location}: {e}")
+                continue
+            for episode in location_episodes:
+                done[episode["bangumi_id"]].append(episode["link"])
+
+        for bangumi_id, links in done.items():
+            self.db_manager.mark_as_organized(bangumi_id, links)
+        organized = sum(len(links) for links in done.values())
+        if organized:
+            logger.info(f"Organized {organized} episodes")
+        return organized
@@ -1,58 +1,215 @@
 import logging
+import threading
 import time
+from typing import Dict, Iterable, List, Optional, Set
 from qbittorrentapi import Client, LoginFailed
 from qbittorrentapi.exceptions import (
     APIConnectionError,
-    Conflict409Error,
     Forbidden403Error,
+    HTTP403Error,
+    HTTP4XXError,
 )
 
+from module.metrics import QB_REQUEST_SECONDS, TRACER
+
 logger = logging.getLogger(__name__)
 
+
+class QbUnavailableError(APIConnectionError):
+    """熔断器打开期间直接拒绝请求，不再尝试连接 qBittorrent"""
+
+
 class QbDownloader:
-    def __init__(self, host: str, username: str, password: str, ssl: bool=False):
-        self._client: Client = Client(
+    """
+    qBittorrent 客户端封装
+    - 复用同一个已登录会话与长连接池
+    - 会话过期（403）时自动重新登录一次
+    - 连续连接失败后打开熔断器，按指数退避非阻塞地拒绝请求，到期后放行一次试探
+    """
+
+    def __init__(self, host: str, username: str, password: str, ssl: bool=False,
+                 pool_size: int = 8, failure_threshold: int = 3,
+                 backoff_base: float = 5.0, backoff_max: float = 300.0):
+        self.ssl = ssl
+        self.pool_size = pool_size
+        self._client: Client = self._create_client(host, username, password)
+        self.host = host
+        self.username = username
+
+        self.failure_threshold = failure_threshold
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._authenticated = False
+        self._auth_error: Optional[str] = None
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._last_error: Optional[str] = None
+        self._last_success_at: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        根据配置中的 qbittorrent.* 创建客户端，连接池大小按下载提交线程数确定
+        qbittorrent.* 变更后自动重建客户端
+        """
+        downloader = cls(config.get("qbittorrent.host"),
+                         config.get("qbittorrent.user"),
+                         config.get("qbittorrent.password"),
+                         pool_size=int(config.get("downloader.workers", 2)) + 2)
+        config.subscribe(downloader.apply_config, prefixes=("qbittorrent.host", "qbittorrent.user",
+                                                            "qbittorrent.password"))
+        return downloader
+
+    def _create_client(self, host: str, username: str, password: str) -> Client:
+        return Client(
             host=host,
             username=username,
             password=password,
-            VERIFY_WEBUI_CERTIFICATE=ssl,
+            VERIFY_WEBUI_CERTIFICATE=self.ssl,
             DISABLE_LOGGING_DEBUG_OUTPUT=True,
             REQUESTS_ARGS={"timeout": (3.1, 10)},
+            HTTPADAPTER_ARGS={"pool_connections": 1, "pool_maxsize": self.pool_size},
         )
-        self.host = host
-        self.username = username
 
-    def auth(self, retry=3):
-        times = 0
-        while times < retry:
+    def apply_config(self, config, changed=()):
+        """配置订阅回调：使用新的地址与账号重建客户端，并重置登录与熔断状态"""
+        host, username = config.get("qbittorrent.host"), config.get("qbittorrent.user")
+        with self._lock:
+            self._client = self._create_client(host, username, config.get("qbittorrent.password"))
+            self.host = host
+            self.username = username
+            self._authenticated = False
+            self._auth_error = None
+            self._consecutive_failures = 0
+            self._open_until = 0.0
+        logger.info(f"qBittorrent settings changed, client rebuilt for {host}")
+
+    # ---------- 健康状态与熔断 ----------
+
+    @property
+    def circuit_state(self) -> str:
+        """closed：正常；open：熔断中；half_open：熔断到期，允许试探"""
+        with self._lock:
+            if self._consecutive_failures < self.failure_threshold:
+                return "closed"
+            return "open" if time.time() < self._open_until else "half_open"
+
+    def available(self) -> bool:
+        """当前是否允许向 qBittorrent 发送请求"""
+        return self.circuit_state != "open"
+
+    def health(self) -> Dict:
+        """连接与认证健康状态"""
+        state = self.circuit_state
+        with self._lock:
+            return {
+                "host": self.host,
+                "available": state != "open",
+                "circuit": state,
+                "authenticated": self._authenticated,
+                "auth_error": self._auth_error,
+                "consecutive_failures": self._consecutive_failures,
+                "retry_at": self._open_until if state == "open" else None,
+                "last_error": self._last_error,
+                "last_success_at": self._last_success_at,
+            }
+
+    def _record_success(self):
+        with self._lock:
+            if self._consecutive_failures >= self.failure_threshold:
+                logger.info(f"qBittorrent Server {self.host} is reachable again")
+            self._consecutive_failures = 0
+            self._open_until = 0.0
+            self._last_success_at = time.time()
+
+    def _record_failure(self, error: Exception):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._last_error = str(error)
+            self._authenticated = False
+            if self._consecutive_failures >= self.failure_threshold:
+                exponent = self._consecutive_failures - self.failure_threshold
+                delay = min(self.backoff_base * 2 ** exponent, self.backoff_max)
+                self._open_until = time.time() + delay
+                logger.error(f"Cannot connect to qBittorrent Server {self.host}, retry in {delay:.0f} seconds")
+
+    def _call(self, func, *args, **kwargs):
+        """经过熔断器与自动登录执行一次 API 调用"""
+        operation = getattr(func, "__name__", "call")
+        if not self.available():
+            QB_REQUEST_SECONDS.observe(0, operation=operation, outcome="unavailable")
+            raise QbUnavailableError(f"qBittorrent Server {self.host} is unavailable")
+        with TRACER.span(f"qb.{operation}", root=False):
+            start_time = time.perf_counter()
+            outcome = "error"
             try:
-                self._client.auth_log_in()
-                return True
-            except LoginFailed:
-                logger.error(
-                    f"Can't login qBittorrent Server {self.host} by {self.username}, retry in {5} seconds."
-                )
-                time.sleep(5)
-                times += 1
-            except Forbidden403Error:
-                logger.error("Login refused by qBittorrent Server")
-                logger.info("Please release the IP in qBittorrent Server")
-                break
-            except APIConnectionError:
-                logger.error("Cannot connect to qBittorrent Server")
-                logger.info("Please check the IP and port in WebUI settings")
-                time.sleep(10)
-                times += 1
-            except Exception as e:
-                logger.error(f"Unknown error: {e}")
-                break
+                if not self._authenticated:
+                    self._login()
+                try:
+                    result = func(*args, **kwargs)
+                except HTTP403Error:
+                    # 会话过期，重新登录一次后重试
+                    logger.info("qBittorrent session expired, logging in again")
+                    self._authenticated = False
+                    self._login()
+                    result = func(*args, **kwargs)
+                outcome = "ok"
+            except HTTP4XXError as e:
+                # 404/409 等客户端错误说明服务器可达（如种子已被删除、目标文件已存在），不计入熔断；
+                # 重新登录后仍为 403 时视为认证失败
+                if isinstance(e, HTTP403Error):
+                    self._record_failure(e)
+                else:
+                    outcome = "client_error"
+                raise
+            except (APIConnectionError, LoginFailed) as e:
+                self._record_failure(e)
+                raise
+            finally:
+                QB_REQUEST_SECONDS.observe(time.perf_counter() - start_time, operation=operation,
+                                           outcome=outcome)
+        self._record_success()
+        return result
+
+    def _login(self):
+        try:
+            self._client.auth_log_in()
+        except LoginFailed:
+            self._auth_error = f"Can't login qBittorrent Server {self.host} by {self.username}"
+            logger.error(self._auth_error)
+            raise
+        except Forbidden403Error:
+            self._auth_error = "Login refused by qBittorrent Server, please release the IP in qBittorrent Server"
+            logger.error(self._auth_error)
+            raise
+        self._authenticated = True
+        self._auth_error = None
+
+    # ---------- API ----------
+
+    def auth(self) -> bool:
+        """立即登录（不阻塞重试），返回是否成功"""
+        try:
+            self._call(lambda: None)
+            return self._authenticated
+        except APIConnectionError:
+            logger.error("Cannot connect to qBittorrent Server")
+            logger.info("Please check the IP and port in WebUI settings")
+        except (LoginFailed, Forbidden403Error):
+            pass
+        except Exception as e:
+            logger.error(f"Unknown error: {e}")
         return False
 
     def logout(self):
         self._client.auth_log_out()
+        self._authenticated = False
 
     def add_torrents(self, torrent_urls, torrent_files, save_path, category, rename):
-        resp = self._client.torrents_add(
+        resp = self._call(
+            self._client.torrents_add,
             is_paused=False,
             urls=torrent_urls,
             torrent_files=torrent_files,
@@ -63,3 +220,89 @@ class QbDownloader:
             content_layout="NoSubFolder"
         )
         return resp == "Ok."
+
+    def add_torrents_batch(self, torrent_urls: List[str], save_path: str, category: Optional[str] = None,
+                           expected_hashes: Iterable[str] = (), confirm_retry: int = 3,
+                           torrent_files: Optional[Dict[str, bytes]] = None) -> Set[str]:
+        """
+        一次请求提交多个种子到同一保存路径/分类
+
+        Args:
+            torrent_urls: 种子 URL 或 magnet 链接列表
+            torrent_files: 已缓存的种子文件，文件名 -> 内容
+            save_path: 保存路径
+            category: 分类
+            expected_hashes: 预期添加的 infohash，用于确认添加结果
+            confirm_retry: 确认时的最大查询次数（qB 下载 .torrent 需要一点时间）
+
+        Returns:
+            set: 已被 qBittorrent 确认存在的 infohash
+        """
+        resp = self._call(
+            self._client.torrents_add,
+            is_paused=False,
+            urls=torrent_urls or None,
+            torrent_files=torrent_files or None,
+            save_path=save_path,
+            category=category,
+            use_auto_torrent_management=False,
+            content_layout="NoSubFolder"
+        )
+        if resp != "Ok.":
+            total = len(torrent_urls or []) + len(torrent_files or {})
+            logger.warning(f"qBittorrent rejected batch of {total} torrents: {resp}")
+        expected = {h.lower() for h in expected_hashes}
+        confirmed: Set[str] = set()
+        for attempt in range(confirm_retry):
+            confirmed = self.existing_hashes(expected)
+            if confirmed == expected or attempt + 1 == confirm_retry:
+                break
+            time.sleep(0.5 * (attempt + 1))
+        return confirmed
+
+    def existing_hashes(self, hashes: Iterable[str]) -> Set[str]:
+        """返回给定 infohash 中已存在于 qBittorrent 的部分"""
+        hashes = list(hashes)
+        if not hashes:
+            return set()
+        torrents = self._call(self._client.torrents_info, torrent_hashes=hashes)
+        return {t.hash.lower() for t in torrents}
+
+    def rename_torrents(self, names: Dict[str, str]):
+        """
+        批量设置种子显示名称（qB 仅支持逐个种子重命名）
+
+        Args:
+            names: infohash -> 显示名称
+        """
+        for torrent_hash, name in names.items():
+            try:
+                self._call(self._client.torrents_rename, torrent_hash=torrent_hash, new_torrent_name=name)
+            except QbUnavailableError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to rename torrent {torrent_hash} to {name}: {e}")
+
+    def sync_maindata(self, rid: int = 0) -> Dict:
+        """增量获取种子状态，rid 为上次返回的响应 ID，0 表示全量"""
+        return self._call(self._client.sync_maindata, rid=rid)
+
+    def delete_torrents(self, hashes: Iterable[str], delete_files: bool = True):
+        """删除种子（可同时删除已下载的文件）"""
+        hashes = list(hashes)
+        if hashes:
+            self._call(self._client.torrents_delete, delete_files=delete_files, torrent_hashes=hashes)
+
+    def torrent_files(self, torrent_hash: str) -> List[Dict]:
+        """获取种子内的文件列表"""
+        return [dict(f) for f in self._call(self._client.torrents_files, torrent_hash=torrent_hash)]
+
+    def rename_file(self, torrent_hash: str, old_path: str, new_path: str):
+        """重命名种子内的单个文件"""
+        self._call(self._client.torrents_rename_file, torrent_hash=torrent_hash, old_path=old_path, new_path=new_path)
+
+    def set_location(self, hashes: Iterable[str], location: str):
+        """一次请求将多个种子移动到同一目录"""
+        hashes = list(hashes)
+        if hashes:
+            self._call(self._client.torrents_set_location, location=location, torrent_hashes=hashes)
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# qBittorrent 中表示已下载完成的状态
+COMPLETED_STATES = {"uploading", "stalledUP", "pausedUP", "stoppedUP", "queuedUP", "forcedUP", "checkingUP"}
+# 添加失败、需要重新提交的状态
+FAILED_STATES = {"error", "missingFiles"}
+# 可能停滞的状态（元数据获取中或无速度）
+STALLED_STATES = {"metaDL", "stalledDL", "forcedMetaDL"}
+
+
+class qbReconciler:
+    """
+    qBittorrent 状态同步器
+    通过 sync/maindata 的 rid 增量接口维护本地种子镜像，每次轮询只传输变化部分，
+    并据此去重、检测添加失败或停滞的种子重新入队、记录下载完成。
+    出现过又消失的种子视为被用户删除，不会重新提交。
+    """
+
+    def __init__(self, qb_downloader, db_manager, add_timeout: float = 300, stall_timeout: float = 1800,
+                 delete_stale_files: bool = False):
+        """
+        Args:
+            qb_downloader: QbDownloader 实例
+            db_manager: RSSDatabaseManager 实例
+            add_timeout: 提交后多久仍未出现在 qB 中视为添加失败（秒）
+            stall_timeout: 提交后多久仍无进度视为停滞（秒）
+            delete_stale_files: 删除失败或停滞的种子时是否同时删除已下载的文件
+        """
+        self.qb_downloader = qb_downloader
+        self.db_manager = db_manager
+        self.add_timeout = add_timeout
+        self.stall_timeout = stall_timeout
+        self.delete_stale_files = delete_stale_files
+
+        self._rid = 0
+        self._torrents: Dict[str, Dict] = {}
+        # 曾出现在 qB 中的种子，之后消失说明被用户删除而不是添加失败
+        self._seen = set()
+        # 开始观察 qB 的时间，早于此时间 add_timeout 以上提交的种子无法判断是否出现过
+        self._observing_since: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self.last_sync_at: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, qb_downloader, db_manager, config):
+        """根据配置中的 downloader.* 创建同步器"""
+        return cls(qb_downloader, db_manager,
+                   add_timeout=config.get("downloader.add_timeout", 300),
+                   stall_timeout=config.get("downloader.stall_timeout", 1800),
+                   delete_stale_files=config.get("downloader.delete_stale_files", False))
+
+    # ---------- 本地镜像 ----------
+
+    def sync(self):
+        """拉取自上次 rid 以来的变化并合并到本地镜像"""
+        data = self.qb_downloader.sync_maindata(self._rid)
+        with self._lock:
+            if data.get("full_update"):
+                self._torrents = {}
+            for torrent_hash, delta in (data.get("torrents") or {}).items():
+                self._torrents.setdefault(torrent_hash, {}).update(delta)
+                self._seen.add(torrent_hash)
+            for torrent_hash in data.get("torrents_removed") or []:
+                self._torrents.pop(torrent_hash, None)
+            self._rid = data.get("rid", self._rid)
+            if self._observing_since is None:
+                self._observing_since = datetime.now(timezone.utc)
+        self.last_sync_at = time.time()
+
+    def has(self, torrent_hash: str) -> bool:
+        """种子是否已存在于 qBittorrent"""
+        with self._lock:
+            return torrent_hash in self._torrents
+
+    def get(self, torrent_hash: str) -> Optional[Dict]:
+        with self._lock:
+            torrent = self._torrents.get(torrent_hash)
+            return dict(torrent) if torrent else None
+
+    def add_known(self, hashes):
+        """将刚确认添加的种子加入镜像，避免在下次同步前被重复提交"""
+        with self._lock:
+            for torrent_hash in hashes:
+                self._torrents.setdefault(torrent_hash, {"hash": torrent_hash})
+                self._seen.add(torrent_hash)
+
+    def is_completed(self, torrent: Dict) -> bool:
+        return torrent.get("progress", 0) >= 1 or torrent.get("state") in COMPLETED_STATES
+
+    def active_count(self) -> int:
+        """qBittorrent 中尚未下载完成的种子数量"""
+        with self._lock:
+            return sum(1 for t in self._torrents.values() if not self.is_completed(t))
+
+    # ---------- 对账 ----------
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        同步种子状态并与数据库对账
+
+        Returns:
+            dict: 本轮完成、重新入队、被用户删除的剧集数量
+        """
+        self.sync()
+        now = datetime.now(timezone.utc)
+        completed: Dict[str, List[str]] = {}
+        requeued: Dict[str, List[str]] = {}
+        removed: Dict[str, List[str]] = {}
+        stale_hashes = []
+
+        for episode in self.db_manager.get_submitted_episodes():
+            torrent = self.get(episode["infohash"])
+            submitted_at = episode.get("submitted_at")
+            age = (now - submitted_at).total_seconds() if submitted_at else 0
+
+            if torrent is None:
+                with self._lock:
+                    seen = episode["infohash"] in self._seen
+                if seen or (submitted_at and submitted_at < self._observing_since - timedelta(seconds=self.add_timeout)):
+                    # 出现过又消失（或开始观察时早应出现、无法确认是否出现过）：视为被用户删除，不重新提交
+                    logger.info(f"Torrent {episode['infohash']} was removed from qBittorrent, stop tracking {episode['link']}")
+                    removed.setdefault(episode["bangumi_id"], []).append(episode["link"])
+                elif age > self.add_timeout:
+                    logger.warning(f"Torrent {episode['infohash']} never appeared in qBittorrent, requeue {episode['link']}")
+                    requeued.setdefault(episode["bangumi_id"], []).append(episode["link"])
+                continue
+            if self.is_completed(torrent):
+                completed.setdefault(episode["bangumi_id"], []).append(episode["link"])
+            elif torrent.get("state") in FAILED_STATES or \
+                    (torrent.get("state") in STALLED_STATES and not torrent.get("progress") and age > self.stall_timeout):
+                logger.warning(f"Torrent {episode['infohash']} is {torrent.get('state')}, requeue {episode['link']}")
+                requeued.setdefault(episode["bangumi_id"], []).append(episode["link"])
+                stale_hashes.append(episode["infohash"])
+
+        if stale_hashes:
+            self.qb_downloader.delete_torrents(stale_hashes, delete_files=self.delete_stale_files)
+            with self._lock:
+                for torrent_hash in stale_hashes:
+                    self._torrents.pop(torrent_hash, None)
+                    # 重新提交的种子应重新出现，不应视为被用户删除
+                    self._seen.discard(torrent_hash)
+        for bangumi_id, links in completed.items():
+            self.db_manager.mark_as_completed(bangumi_id, links)
+        for bangumi_id, links in requeued.items():
+            self.db_manager.requeue_episodes(bangumi_id, links)
+        for bangumi_id, links in removed.items():
+            self.db_manager.mark_as_removed(bangumi_id, links)
+
+        return {
+            "completed": sum(len(v) for v in completed.values()),
+            "requeued": sum(len(v) for v in requeued.values()),
+            "removed": sum(len(v) for v in removed.values()),
+        }
+
+    def status(self) -> Dict:
+        with self._lock:
+            total = len(self._torrents)
+        return {
+            "rid": self._rid,
+            "torrents": total,
+            "active": self.active_count(),
+            "last_sync_at": self.last_sync_at,
+        }
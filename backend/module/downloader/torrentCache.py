@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .infohash import extract_infohash
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = (".mkv", ".mp4", ".avi", ".ts", ".m2ts", ".webm", ".mov", ".flv", ".rmvb")
+
+
+class BencodeError(ValueError):
+    pass
+
+
+def _decode(data: bytes, index: int) -> Tuple[object, int]:
+    token = data[index:index + 1]
+    if token == b"i":
+        end = data.index(b"e", index)
+        return int(data[index + 1:end]), end + 1
+    if token == b"l":
+        index += 1
+        items = []
+        while data[index:index + 1] != b"e":
+            item, index = _decode(data, index)
+            items.append(item)
+        return items, index + 1
+    if token == b"d":
+        index += 1
+        items = {}
+        while data[index:index + 1] != b"e":
+            key, index = _decode(data, index)
+            start = index
+            value, index = _decode(data, index)
+            items[key] = value
+            if key == b"info":
+                # 记录 info 字典的原始字节范围，用于计算 infohash
+                items[b"__info_span__"] = (start, index)
+        return items, index + 1
+    if token.isdigit():
+        colon = data.index(b":", index)
+        length = int(data[index:colon])
+        start = colon + 1
+        if start + length > len(data):
+            raise BencodeError("string exceeds data length")
+        return data[start:start + length], start + length
+    raise BencodeError(f"invalid token {token!r} at {index}")
+
+
+def bdecode(data: bytes):
+    """解码 bencode 数据"""
+    try:
+        value, _ = _decode(data, 0)
+    except (IndexError, ValueError) as e:
+        raise BencodeError(str(e)) from e
+    return value
+
+
+def _text(value: bytes) -> str:
+    return value.decode("utf-8", errors="replace")
+
+
+def parse_torrent(data: bytes) -> Dict:
+    """
+    解析 .torrent 文件
+
+    Returns:
+        dict: infohash（v1，40 位十六进制）、name、files（种子内文件相对路径列表）
+    """
+    torrent = bdecode(data)
+    if not isinstance(torrent, dict) or b"__info_span__" not in torrent:
+        raise BencodeError("missing info dictionary")
+    start, end = torrent[b"__info_span__"]
+    info = torrent[b"info"]
+    name = _text(info.get(b"name.utf-8") or info.get(b"name", b""))
+    if b"files" in info:
+        files = ["/".join(_text(p) for p in (f.get(b"path.utf-8") or f.get(b"path") or [])) for f in info[b"files"]]
+    else:
+        files = [name]
+    return {
+        "infohash": hashlib.sha1(data[start:end]).hexdigest(),
+        "name": name,
+        "files": files,
+    }
+
+
+def main_video_file(files: List[str]) -> Optional[str]:
+    """返回种子内唯一的视频文件名（合集等多视频种子返回 None）"""
+    videos = [f for f in files if f.lower().endswith(VIDEO_EXTENSIONS)]
+    return os.path.basename(videos[0]) if len(videos) == 1 else None
+
+
+class torrentCache:
+    """
+    以 infohash 为键的本地 .torrent 缓存
+    通过共享连接池并发下载种子文件，解析出 infohash 与种子内文件列表后保存为 <infohash>.torrent；
+    magnet 链接直接从链接中提取 infohash。
+    """
+
+    def __init__(self, cache_dir: Union[str, Path], timeout: float = 30, workers: int = 8):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.workers = max(1, int(workers))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("downloader.torrent_cache", "config/torrents"),
+                   workers=config.get("downloader.prefetch_workers", 8))
+
+    def path(self, infohash: str) -> Path:
+        return self.cache_dir / f"{infohash}.torrent"
+
+    def read(self, infohash: Optional[str]) -> Optional[bytes]:
+        """读取缓存的种子文件，不存在时返回 None"""
+        if not infohash:
+            return None
+        try:
+            return self.path(infohash).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _store(self, data: bytes, infohash: str):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path(infohash))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def fetch(self, link: str) -> Optional[Dict]:
+        """
+        获取单个种子的元数据
+
+        Returns:
+            dict: infohash、files（magnet 链接为空列表）；失败时返回 None
+        """
+        if not link:
+            return None
+        if link.lower().startswith("magnet:"):
+            infohash = extract_infohash(link)
+            return {"infohash": infohash, "files": []} if infohash else None
+
+        data = self.read(extract_infohash(link))
+        if data is None:
+            try:
+                response = self.session.get(link, timeout=self.timeout)
+                response.raise_for_status()
+                data = response.content
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Failed to fetch torrent {link}: {e}")
+                return None
+        try:
+            meta = parse_torrent(data)
+        except BencodeError as e:
+            logger.warning(f"Invalid torrent file {link}: {e}")
+            return None
+        if not self.path(meta["infohash"]).exists():
+            self._store(data, meta["infohash"])
+        return meta
+
+    def prefetch(self, links: Iterable[str]) -> Dict[str, Dict]:
+        """并发获取多个种子的元数据，返回 link -> 元数据（失败的链接不包含在内）"""
+        links = list(dict.fromkeys(links))
+        if not links:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(links))) as executor:
+            results = dict(zip(links, executor.map(self.fetch, links)))
+        return {link: meta for link, meta in results.items() if meta}
@@ -1,3 +1,12 @@
 from .rssManager import rssManager
 from .parseManager import parseManager
-from .downloadManager import downloadManager
\ No newline at end of file
+from .downloadManager import downloadManager
+from .downloadDispatcher import downloadDispatcher
+from .downloadFilter import downloadFilter
+from .parseScheduler import parseScheduler
+from .workerRuntime import workerRuntime
+from .eventBus import eventBus, pipeline_events
+from .bulkImporter import bulkImporter
+from .onboardingQueue import onboardingQueue
+from .feedStats import feedStatsRecorder
+from .fairParseQueue import fairParseQueue
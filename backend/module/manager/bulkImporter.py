@@ -0,0 +1,137 @@
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from module.databse import RSSDatabaseManager
+from module.parser import openaiParser
+from module.rss import torrentRSSParser, subscription_route_keys, normalize_feed_link, is_aggregate_feed
+from module.metrics import ENTRIES_INGESTED
+from .eventBus import pipeline_events
+
+logger = logging.getLogger(__name__)
+
+
+class bulkImporter:
+    """
+    批量导入订阅（OPML 或链接列表）
+    - 归一化并去重链接，跳过已存在的订阅，聚合 RSS（MyBangumi）作为聚合源添加
+    - 并发拉取并校验所有 RSS，并发解析番剧名称（相同 RSS 标题只解析一次）
+    - 批量写入订阅与首批剧集，导入后无需等待下一轮解析即可开始解析文件名
+    - 返回每个链接的导入结果
+    """
+
+    def __init__(self, db_manager: RSSDatabaseManager, openai_parser: openaiParser,
+                 rss_parser: Optional[torrentRSSParser] = None, workers: int = 16, max_links: int = 2000):
+        """
+        Args:
+            workers: 并发拉取 RSS 与解析名称的线程数
+            max_links: 单次导入的最大链接数
+        """
+        self.db_manager = db_manager
+        self.openai_parser = openai_parser
+        self.rss_parser = rss_parser or torrentRSSParser(timeout=30)
+        self.workers = max(1, int(workers))
+        self.max_links = int(max_links)
+
+    @classmethod
+    def from_config(cls, db_manager, openai_parser, config):
+        """根据配置中的 rss.* 创建导入器"""
+        return cls(db_manager, openai_parser,
+                   workers=config.get("rss.import_workers", 16),
+                   max_links=config.get("rss.import_max_links", 2000))
+
+    def run(self, links: List[str]) -> Dict:
+        """
+        导入订阅
+
+        Returns:
+            dict: {"summary": 各状态的数量, "results": 每个链接的结果, "seconds": 耗时}
+            状态：added / exists / duplicate / aggregate / invalid / error
+        """
+        if len(links) > self.max_links:
+            raise ValueError(f"一次最多导入 {self.max_links} 个链接")
+        start_time = time.perf_counter()
+        results: List[Dict] = []
+        existing = {normalize_feed_link(bangumi["link"]) for bangumi in self.db_manager.get_all_bangumi() or []}
+        existing |= {normalize_feed_link(feed["link"]) for feed in self.db_manager.get_aggregate_feeds() or []}
+
+        seen = set()
+        to_fetch: List[Dict] = []
+        for raw in links:
+            link = normalize_feed_link(raw)
+            result = {"link": link, "status": None, "bangumi_name": None, "entries": 0, "new_entries": 0,
+                      "error": None}
+            results.append(result)
+            if not link.startswith(("http://", "https://")):
+                result.update(status="invalid", error="不是有效的 HTTP(S) 链接")
+            elif link in seen:
+                result["status"] = "duplicate"
+            elif link in existing:
+                result["status"] = "exists"
+            elif is_aggregate_feed(link):
+                self.db_manager.add_aggregate_feed(link)
+                result["status"] = "aggregate"
+            else:
+                to_fetch.append(result)
+            seen.add(link)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="import") as executor:
+            feeds = list(executor.map(self._fetch, to_fetch))
+            valid = [(result, feed) for result, feed in zip(to_fetch, feeds) if feed is not None]
+            titles = list(dict.fromkeys(feed["RSSName"] for _, feed in valid))
+            names = dict(zip(titles, executor.map(self._resolve_name, titles)))
+
+        self._store(valid, names)
+        summary = Counter(result["status"] for result in results)
+        elapsed = time.perf_counter() - start_time
+        logger.info(f"Imported {summary.get('added', 0)}/{len(links)} subscriptions in {elapsed:.2f} seconds")
+        pipeline_events.publish("feeds_imported", count=summary.get("added", 0), seconds=elapsed)
+        return {"summary": dict(summary), "results": results, "seconds": elapsed}
+
+    def _fetch(self, result: Dict) -> Optional[Dict]:
+        """拉取并校验 RSS，失败时记录原因并返回 None"""
+        try:
+            feed = self.rss_parser.fetch_rss(result["link"])
+        except Exception as e:
+            result.update(status="error", error=str(e))
+            return None
+        if not feed["RSSName"] and not feed["torrents"]:
+            result.update(status="invalid", error="不是有效的 RSS 源")
+            return None
+        result["entries"] = len(feed["torrents"])
+        return feed
+
+    def _resolve_name(self, title: Optional[str]) -> Optional[str]:
+        if not title:
+            return None
+        try:
+            return self.openai_parser.parseName(title)
+        except Exception as e:
+            logger.error(f"Failed to resolve bangumi name of {title}: {e}")
+            return None
+
+    def _store(self, valid: List, names: Dict[str, Optional[str]]):
+        """批量写入订阅、剧集与路由键"""
+        named = [(result["link"], names.get(feed["RSSName"])) for result, feed in valid
+                 if names.get(feed["RSSName"])]
+        added = self.db_manager.add_subscriptions_bulk(named)
+        routes = {}
+        for result, feed in valid:
+            link = result["link"]
+            result["bangumi_name"] = names.get(feed["RSSName"])
+            if not result["bangumi_name"]:
+                # 名称暂时无法解析（LLM 不可用），先添加订阅，下一轮解析时再获取名称
+                self.db_manager.add_rss_source(link)
+                result.update(status="added", error="番剧名称将在下一轮解析时获取")
+                continue
+            if link not in added:
+                # 与其他请求并发添加
+                result["status"] = "exists"
+                continue
+            result["new_entries"] = self.db_manager.add_episodes_bulk(added[link], feed["torrents"], link)
+            ENTRIES_INGESTED.inc(result["new_entries"])
+            result["status"] = "added"
+            routes.update({key: link for key in subscription_route_keys(link, feed["torrents"])})
+        if routes:
+            self.db_manager.learn_feed_routes(routes)
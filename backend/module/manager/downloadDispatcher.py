@@ -0,0 +1,324 @@
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from module.metrics import CYCLE_SECONDS, DOWNLOAD_QUEUE_DEPTH, DOWNLOAD_INFLIGHT
+from .eventBus import pipeline_events
+
+logger = logging.getLogger(__name__)
+
+
+class downloadDispatcher:
+    """
+    下载调度器
+    - 无任务时按指数退避休眠，有新任务（wake）时立即唤醒
+    - 待下载剧集先写入持久化下载队列，再按优先级与番剧间轮转顺序取出
+    - 按提交速率（令牌桶）与 qBittorrent 中活动种子上限控制提交量
+    - 按保存路径分组，使用多个提交线程并行向下载器批量提交种子
+    - 下载器不可用（熔断中）时不扫描、不提交，按空闲退避等待恢复
+    - 支持启动、停止、暂停、恢复，并统计队列深度与每轮耗时
+    """
+
+    def __init__(self, download_manager, workers: int = 2, idle_min: float = 1.0, idle_max: float = 60.0,
+                 submit_rate: float = 0, max_active: int = 0, batch_limit: int = 200):
+        """
+        Args:
+            download_manager: 提供 downloader_available / reconcile / enqueue_ready_episodes / next_jobs /
+                release_jobs / queue_depth / active_torrents / group_jobs / submit_batch 的下载管理器
+            workers: 提交线程数量
+            idle_min: 空闲时的最短休眠时间（秒）
+            idle_max: 空闲时的最长休眠时间（秒）
+            submit_rate: 每分钟最多提交的种子数，0 表示不限制
+            max_active: qBittorrent 中最多同时存在的未完成种子数，0 表示不限制
+            batch_limit: 每轮最多取出的任务数
+        """
+        self.manager = download_manager
+        self.workers = max(1, int(workers))
+        self.idle_min = float(idle_min)
+        self.idle_max = float(idle_max)
+        self.submit_rate = float(submit_rate or 0)
+        self.max_active = int(max_active or 0)
+        self.batch_limit = max(1, int(batch_limit))
+
+        # 提交速率令牌桶，容量为一分钟的提交量
+        self._tokens = self.submit_rate
+        self._tokens_at = time.monotonic()
+        # 持久化下载队列中每个番剧的待提交数量（每轮更新）
+        self._backlog: Dict[str, int] = {}
+
+        # 队列中每一项为同一保存路径下的一组剧集任务
+        self._queue: "queue.Queue[Optional[List[Dict]]]" = queue.Queue()
+        # 已入队或正在提交的剧集链接，避免同一剧集被重复入队
+        self._inflight = set()
+        self._inflight_lock = threading.Lock()
+
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+
+        self._thread: Optional[threading.Thread] = None
+        self._worker_threads: List[threading.Thread] = []
+        self._state_lock = threading.Lock()
+
+        self._idle_delay = self.idle_min
+        # 调度线程与提交线程都会更新统计
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "cycles": 0,
+            "last_cycle_seconds": None,
+            "max_cycle_seconds": None,
+            "total_cycle_seconds": 0.0,
+            "last_cycle_at": None,
+            "enqueued": 0,
+            "submitted": 0,
+            "failed": 0,
+            "skipped_unavailable": 0,
+            "consecutive_failures": 0,
+            "last_error": None,
+        }
+
+    @classmethod
+    def from_config(cls, download_manager, config):
+        """根据配置中的 downloader.* 创建调度器，downloader.* 变更后自动调整限速与退避参数"""
+        dispatcher = cls(download_manager,
+                         workers=config.get("downloader.workers", 2),
+                         idle_min=config.get("downloader.idle_min", 1),
+                         idle_max=config.get("downloader.idle_max", 60),
+                         submit_rate=config.get("downloader.submit_rate", 0),
+                         max_active=config.get("downloader.max_active", 0),
+                         batch_limit=config.get("downloader.batch_limit", 200))
+        config.subscribe(dispatcher.apply_config, prefixes=("downloader",))
+        return dispatcher
+
+    def apply_config(self, config, changed=()):
+        """配置订阅回调：更新空闲退避、提交速率、活动种子上限与每轮任务数（提交线程数在重启后生效）"""
+        self.idle_min = float(config.get("downloader.idle_min", 1))
+        self.idle_max = float(config.get("downloader.idle_max", 60))
+        self.submit_rate = float(config.get("downloader.submit_rate", 0) or 0)
+        self.max_active = int(config.get("downloader.max_active", 0) or 0)
+        self.batch_limit = max(1, int(config.get("downloader.batch_limit", 200)))
+        self.wake()
+
+    # ---------- 控制 ----------
+
+    def start(self) -> bool:
+        """启动调度线程与提交线程，已在运行时返回 False"""
+        with self._state_lock:
+            if self.is_running:
+                return False
+            self._stop_event.clear()
+            self._resume_event.set()
+            self._idle_delay = self.idle_min
+            # 调度线程意外退出后重启时，复用仍存活的提交线程
+            alive = [t for t in self._worker_threads if t.is_alive()]
+            new_threads = [
+                threading.Thread(target=self._worker_loop, name=f"download-worker-{i}", daemon=True)
+                for i in range(len(alive), self.workers)
+            ]
+            self._worker_threads = alive + new_threads
+            for t in new_threads:
+                t.start()
+            self._thread = threading.Thread(target=self._loop, name="download-dispatcher", daemon=True)
+            self._thread.start()
+        logger.info(f"Download dispatcher started with {self.workers} workers.")
+        return True
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止调度，丢弃尚未提交的队列内容并释放其租约，使其可被立即重新认领"""
+        with self._state_lock:
+            if not self.is_running:
+                return
+            self._stop_event.set()
+            self._resume_event.set()
+            self._wake_event.set()
+            # 先等待调度线程退出，之后不会再有新任务入队
+            self._thread.join(timeout)
+            self.manager.release_jobs(self._drain_queue())
+            for _ in self._worker_threads:
+                self._queue.put(None)
+            workers = list(self._worker_threads)
+        for t in workers:
+            t.join(timeout)
+        logger.info("Download dispatcher stopped.")
+
+    def pause(self):
+        """暂停调度（正在提交的任务会完成）"""
+        self._resume_event.clear()
+        logger.info("Download dispatcher paused.")
+
+    def resume(self):
+        """恢复调度并立即开始新一轮"""
+        self._resume_event.set()
+        self.wake()
+        logger.info("Download dispatcher resumed.")
+
+    def wake(self):
+        """有新任务时调用，立即结束空闲休眠"""
+        self._wake_event.set()
+
+    def join(self):
+        """阻塞直到调度线程退出"""
+        if self._thread:
+            self._thread.join()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def is_paused(self) -> bool:
+        return not self._resume_event.is_set()
+
+    def status(self) -> Dict:
+        """返回运行状态、队列深度与每轮耗时统计"""
+        with self._inflight_lock:
+            inflight = len(self._inflight)
+        with self._stats_lock:
+            stats = dict(self._stats)
+        cycles = stats.pop("total_cycle_seconds")
+        stats["avg_cycle_seconds"] = cycles / stats["cycles"] if stats["cycles"] else None
+        backlog = dict(self._backlog)
+        return {
+            "running": self.is_running,
+            "paused": self.is_paused,
+            "workers": self.workers,
+            "queue_depth": sum(backlog.values()),
+            "backlog": backlog,
+            "inflight": inflight,
+            "idle_delay": self._idle_delay,
+            **stats,
+        }
+
+    # ---------- 调度 ----------
+
+    def _submit_budget(self, inflight: int) -> int:
+        """根据令牌桶与活动种子上限计算本轮最多可提交的数量"""
+        budget = self.batch_limit
+        if self.submit_rate > 0:
+            now = time.monotonic()
+            self._tokens = min(self.submit_rate,
+                               self._tokens + (now - self._tokens_at) * self.submit_rate / 60)
+            self._tokens_at = now
+            budget = min(budget, int(self._tokens))
+        if self.max_active > 0:
+            budget = min(budget, self.max_active - self.manager.active_torrents() - inflight)
+        return max(0, budget)
+
+    def run_cycle(self) -> int:
+        """
+        同步下载器状态，扫描待下载剧集写入下载队列，
+        再按公平顺序与提交配额取出任务，按保存路径分组交给提交线程
+
+        Returns:
+            int: 本轮交给提交线程的剧集数量
+        """
+        start_time = time.perf_counter()
+        enqueued = 0
+        try:
+            if not self.manager.downloader_available():
+                with self._stats_lock:
+                    self._stats["skipped_unavailable"] += 1
+                return 0
+            self.manager.reconcile()
+            self.manager.enqueue_ready_episodes()
+            with self._inflight_lock:
+                exclude = list(self._inflight)
+            budget = self._submit_budget(len(exclude))
+            new_jobs = self.manager.next_jobs(budget, exclude) if budget else []
+            with self._inflight_lock:
+                self._inflight.update(job["link"] for job in new_jobs)
+            if self.submit_rate > 0:
+                self._tokens -= len(new_jobs)
+            for jobs in self.manager.group_jobs(new_jobs).values():
+                self._queue.put(jobs)
+                enqueued += len(jobs)
+            self._backlog = self.manager.queue_depth()
+        finally:
+            elapsed = time.perf_counter() - start_time
+            with self._stats_lock:
+                self._stats["cycles"] += 1
+                self._stats["enqueued"] += enqueued
+                self._stats["last_cycle_seconds"] = elapsed
+                self._stats["max_cycle_seconds"] = max(self._stats["max_cycle_seconds"] or 0.0, elapsed)
+                self._stats["total_cycle_seconds"] += elapsed
+                self._stats["last_cycle_at"] = time.time()
+            CYCLE_SECONDS.observe(elapsed, stage="downloader")
+            DOWNLOAD_QUEUE_DEPTH.set(sum(self._backlog.values()))
+            with self._inflight_lock:
+                DOWNLOAD_INFLIGHT.set(len(self._inflight))
+        return enqueued
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            self._resume_event.wait()
+            if self._stop_event.is_set():
+                break
+            self._wake_event.clear()
+            try:
+                enqueued = self.run_cycle()
+                with self._stats_lock:
+                    self._stats["consecutive_failures"] = 0
+                    self._stats["last_error"] = None
+            except Exception as e:
+                logger.error(f"Download dispatcher cycle failed: {e}", exc_info=True)
+                pipeline_events.publish("error", stage="downloader", message=str(e))
+                with self._stats_lock:
+                    self._stats["consecutive_failures"] += 1
+                    self._stats["last_error"] = str(e)
+                enqueued = 0
+
+            if enqueued:
+                self._idle_delay = self.idle_min
+            else:
+                self._idle_delay = min(self._idle_delay * 2, self.idle_max)
+            delay = self._idle_delay
+            if self.submit_rate > 0 and self._backlog and self._tokens < 1:
+                # 仅因速率限制而等待时，在下一个令牌可用时醒来
+                delay = min(delay, (1 - self._tokens) * 60 / self.submit_rate)
+            # 等待期间若被 wake() 唤醒则立即开始下一轮
+            self._wake_event.wait(delay)
+
+    def _worker_loop(self):
+        while True:
+            jobs = self._queue.get()
+            if jobs is None:
+                break
+            try:
+                if self._stop_event.is_set():
+                    self.manager.release_jobs([job["link"] for job in jobs])
+                    continue
+                submitted = len(self.manager.submit_batch(jobs))
+                with self._stats_lock:
+                    self._stats["submitted"] += submitted
+                    self._stats["failed"] += len(jobs) - submitted
+            except Exception as e:
+                with self._stats_lock:
+                    self._stats["failed"] += len(jobs)
+                logger.error(f"Failed to submit {len(jobs)} episodes to {jobs[0].get('save_path')}: {e}")
+                pipeline_events.publish("error", stage="downloader", message=str(e))
+                # 未提交的任务立即释放租约，而不是等租约过期后才能被重新认领；已提交的任务已出队，释放为空操作
+                try:
+                    self.manager.release_jobs([job["link"] for job in jobs])
+                except Exception as release_error:
+                    logger.error(f"Failed to release {len(jobs)} download leases: {release_error}")
+            finally:
+                with self._inflight_lock:
+                    for job in jobs:
+                        self._inflight.discard(job["link"])
+
+    def _drain_queue(self) -> List[str]:
+        """取出队列中尚未提交的任务，返回其剧集链接"""
+        drained = []
+        while True:
+            try:
+                jobs = self._queue.get_nowait()
+            except queue.Empty:
+                return drained
+            if jobs is not None:
+                drained.extend(job["link"] for job in jobs)
+                with self._inflight_lock:
+                    for job in jobs:
+                        self._inflight.discard(job["link"])
@@ -0,0 +1,144 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from psycopg2 import sql
+
+# 分辨率名称 -> 文件名中的匹配模式（同时用于 Python 与 PostgreSQL 正则）
+RESOLUTION_PATTERNS = {
+    "2160p": r"2160[pP]|4[kK]|3840[xX×]2160",
+    "1080p": r"1080[pP]|1920[xX×]1080",
+    "720p": r"720[pP]|1280[xX×]720",
+    "480p": r"480[pP]|848[xX×]480|640[xX×]480",
+}
+
+# 文件名开头的字幕组，如 [喵萌奶茶屋] 或 【喵萌奶茶屋】
+_GROUP_PATTERN = re.compile(r"^\s*[\[【]([^\]】]+)[\]】]")
+_GROUP_SQL_PATTERN = r"^\s*[[【]([^]】]+)[]】]"
+
+
+def extract_group(filename: str) -> Optional[str]:
+    """从文件名中提取字幕组名称"""
+    match = _GROUP_PATTERN.match(filename or "")
+    return match.group(1).strip() if match else None
+
+
+def extract_resolution(filename: str) -> Optional[str]:
+    """从文件名中提取分辨率（如 1080p），无法识别时返回 None"""
+    for name, pattern in RESOLUTION_PATTERNS.items():
+        if re.search(pattern, filename or ""):
+            return name
+    return None
+
+
+def _lower_set(values: Optional[Iterable[str]]) -> frozenset:
+    return frozenset(v.strip().lower() for v in values or [] if v and v.strip())
+
+
+class downloadFilter:
+    """
+    编译后的下载过滤条件
+    由配置中的 filter.* 生成一次，之后对每个剧集只做常量时间的判断；
+    同时可生成等价的 SQL 条件，直接在数据库端过滤。
+
+    支持的规则：
+    - hasCHS / hasCHT: 是否要求简体 / 繁体字幕
+    - subtype: 允许的字幕类型列表
+    - resolution: 允许的分辨率列表（空表示不限制）
+    - group_allow / group_deny: 字幕组白名单 / 黑名单（不区分大小写）
+    - include / exclude: 文件名需匹配 / 不得匹配的正则表达式
+    注意：include / exclude 同时用于 Python 与 PostgreSQL，应使用两者通用的正则语法。
+    """
+
+    def __init__(self,
+                 hasCHS: bool = False,
+                 hasCHT: bool = False,
+                 subtype: Optional[Iterable[str]] = None,
+                 resolution: Optional[Iterable[str]] = None,
+                 group_allow: Optional[Iterable[str]] = None,
+                 group_deny: Optional[Iterable[str]] = None,
+                 include: Optional[str] = None,
+                 exclude: Optional[str] = None):
+        self.hasCHS = bool(hasCHS)
+        self.hasCHT = bool(hasCHT)
+        self.subtype = frozenset(subtype or [])
+        self.resolution = tuple(r for r in resolution or [] if r in RESOLUTION_PATTERNS)
+        self.group_allow = _lower_set(group_allow)
+        self.group_deny = _lower_set(group_deny)
+        self.include = include or None
+        self.exclude = exclude or None
+
+        self._resolution_source = "|".join(RESOLUTION_PATTERNS[r] for r in self.resolution) or None
+        self._resolution_re = re.compile(self._resolution_source) if self._resolution_source else None
+        self._include_re = re.compile(self.include) if self.include else None
+        self._exclude_re = re.compile(self.exclude) if self.exclude else None
+
+    @classmethod
+    def from_config(cls, config) -> "downloadFilter":
+        """根据配置中的 filter.* 编译过滤条件"""
+        return cls(hasCHS=config.get("filter.hasCHS"),
+                   hasCHT=config.get("filter.hasCHT"),
+                   subtype=config.get("filter.subtype"),
+                   resolution=config.get("filter.resolution"),
+                   group_allow=config.get("filter.group_allow"),
+                   group_deny=config.get("filter.group_deny"),
+                   include=config.get("filter.include"),
+                   exclude=config.get("filter.exclude"))
+
+    def __call__(self, episode: Dict) -> bool:
+        """判断剧集（get_undownloaded_episodes 返回的行）是否应当下载"""
+        if not episode.get("parsed"):
+            return False
+        if self.hasCHS and not episode.get("haschs"):
+            return False
+        if self.hasCHT and not episode.get("hascht"):
+            return False
+        if episode.get("subtitle_type") not in self.subtype:
+            return False
+        return self.accepts_filename(episode.get("filename"))
+
+    def accepts_filename(self, filename: Optional[str]) -> bool:
+        """只按文件名可判断的规则（分辨率、字幕组、include / exclude）过滤，可用于尚未解析的条目"""
+        filename = filename or ""
+        if self._resolution_re and not self._resolution_re.search(filename):
+            return False
+        if self.group_allow or self.group_deny:
+            group = (extract_group(filename) or "").lower()
+            if self.group_allow and group not in self.group_allow:
+                return False
+            if group and group in self.group_deny:
+                return False
+        if self._include_re and not self._include_re.search(filename):
+            return False
+        if self._exclude_re and self._exclude_re.search(filename):
+            return False
+        return True
+
+    def to_sql(self) -> Tuple[sql.Composable, List]:
+        """
+        生成与 __call__ 等价的 SQL 条件
+
+        Returns:
+            tuple: (SQL 条件片段, 参数列表)
+        """
+        clauses = [sql.SQL("parsed = TRUE"), sql.SQL("subtitle_type = ANY(%s)")]
+        params: List = [list(self.subtype)]
+        if self.hasCHS:
+            clauses.append(sql.SQL("haschs = TRUE"))
+        if self.hasCHT:
+            clauses.append(sql.SQL("hascht = TRUE"))
+        if self._resolution_source:
+            clauses.append(sql.SQL("filename ~ %s"))
+            params.append(self._resolution_source)
+        group = sql.SQL("lower(trim(substring(filename from %s)))")
+        if self.group_allow:
+            clauses.append(sql.SQL("{} = ANY(%s)").format(group))
+            params.extend([_GROUP_SQL_PATTERN, list(self.group_allow)])
+        if self.group_deny:
+            clauses.append(sql.SQL("COALESCE({} <> ALL(%s), TRUE)").format(group))
+            params.extend([_GROUP_SQL_PATTERN, list(self.group_deny)])
+        if self.include:
+            clauses.append(sql.SQL("filename ~ %s"))
+            params.append(self.include)
+        if self.exclude:
+            clauses.append(sql.SQL("filename !~ %s"))
+            params.append(self.exclude)
+        return sql.SQL(" AND ").join(clauses), params
@@ -1,46 +1,266 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from psycopg2 import sql
 from module.databse import RSSDatabaseManager
 from module.settings import configManager
-from module.downloader import QbDownloader
+from module.downloader import QbDownloader, qbReconciler, torrentOrganizer, torrentCache, extract_infohash
+from .downloadDispatcher import downloadDispatcher
+from module.metrics import TORRENTS_SUBMITTED, TRACER
+from .eventBus import pipeline_events
+from .downloadFilter import downloadFilter
+from .releaseSelector import releaseSelector
+from .feedStats import feedStatsRecorder
+
+logger = logging.getLogger(__name__)
 
 class downloadManager:
-    def __init__(self):
-        self.config = configManager("config/config.yaml")
-        self.db_manager = RSSDatabaseManager(self.config.get("database.host"),
-                                             self.config.get("database.port"),
-                                             self.config.get("database.database"),
-                                             self.config.get("database.user"),
-                                             self.config.get("database.password"))
-        self.qb_downloader = QbDownloader(self.config.get("qbittorrent.host"),
-                                          self.config.get("qbittorrent.user"),
-                                          self.config.get("qbittorrent.password"))
+    def __init__(self, config: Optional[configManager] = None, db_manager: Optional[RSSDatabaseManager] = None,
+                 qb_downloader: Optional[QbDownloader] = None):
+        self.config = config or configManager.shared()
+        self.db_manager = db_manager or RSSDatabaseManager.from_config(self.config)
+        self.qb_downloader = qb_downloader or QbDownloader.from_config(self.config)
+        self.reconciler = qbReconciler.from_config(self.qb_downloader, self.db_manager, self.config)
+        self.organizer = torrentOrganizer(self.qb_downloader, self.db_manager, self.config.get("qbittorrent.path_prefix"))
+        # 启动后首轮对账需整理上次未完成的剧集
+        self._organize_pending = True
+        self.release_selector = releaseSelector.from_config(self.db_manager, self.qb_downloader, self.config,
+                                                            reconciler=self.reconciler)
+        self.torrent_cache = torrentCache.from_config(self.config)
+        self.feed_stats = feedStatsRecorder.from_config(self.db_manager, self.config)
+        # 多个工作进程共享下载队列时，认领任务的租约时长
+        self.lease_seconds = self.config.get("runtime.lease_seconds", 300)
+        self._filter = None
+        self._filter_sql = None
+        self._filter_version = None
     
     def main(self):
-        while True:
-            self._download_episode()
+        dispatcher = downloadDispatcher.from_config(self, self.config)
+        dispatcher.start()
+        dispatcher.join()
 
-    def _download_episode(self):
+    def downloader_available(self) -> bool:
+        """下载器是否可用，不可用时调度器应暂停提交"""
+        return self.qb_downloader.available()
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        与 qBittorrent 同步种子状态，记录完成并重新入队失败的剧集，
+        有新完成的剧集时进行整理；多个工作进程中同一时间只有一个进程对账
+        """
+        with self.db_manager.singleton_job("download_reconcile") as acquired:
+            try:
+                if not acquired:
+                    # 其他进程正在对账，本进程只同步种子状态镜像
+                    self.reconciler.sync()
+                    return {"completed": 0, "requeued": 0, "removed": 0, "organized": 0}
+                result = self.reconciler.reconcile()
+            except Exception as e:
+                logger.error(f"Failed to reconcile with qBittorrent: {e}")
+                return {"completed": 0, "requeued": 0, "removed": 0, "organized": 0}
+            result["organized"] = 0
+            if result["completed"] or self._organize_pending:
+                try:
+                    result["organized"] = self.organizer.organize()
+                    self._organize_pending = False
+                except Exception as e:
+                    logger.error(f"Failed to organize completed episodes: {e}")
+            return result
+
+    def _compile_filter(self):
+        """按配置版本编译过滤条件与下载路径前缀，仅在配置变更后重新编译"""
+        if self._filter is None or self._filter_version != self.config.version:
+            self._filter = downloadFilter.from_config(self.config)
+            where, params = self._filter.to_sql()
+            # 已在下载队列中的剧集无需重复扫描入队
+            self._filter_sql = (sql.SQL("({}) AND link NOT IN (SELECT link FROM download_queue)").format(where), params)
+            self.organizer.path_prefix = (self.config.get('qbittorrent.path_prefix') or '').rstrip('/')
+            self._filter_version = self.config.version
+
+    @property
+    def download_filter(self) -> downloadFilter:
+        """已编译的下载过滤条件"""
+        self._compile_filter()
+        return self._filter
+
+    def collect_ready_episodes(self) -> List[Dict]:
+        """
+        扫描所有番剧，返回通过过滤条件、尚未入队的待下载剧集任务
+        过滤在数据库端通过已编译的 SQL 条件完成，同一集的多个发布只保留最优的一个
+        """
+        jobs = []
         bangumi_list = self.db_manager.get_all_bangumi()
         if not bangumi_list:
-            return
+            return jobs
+        self._compile_filter()
         for bangumi in bangumi_list:
-            undownloaded_episodes = self.db_manager.get_undownloaded_episodes(bangumi["bangumi_id"])
-            for undownloaded_episode in undownloaded_episodes:
-                if (not self.config.get("filter.hasCHS") or undownloaded_episode["haschs"]) and \
-                   (not self.config.get("filter.hasCHT") or undownloaded_episode["hascht"]) and \
-                   (undownloaded_episode["subtitle_type"] in self.config.get("filter.subtype")) and \
-                   undownloaded_episode["parsed"]:
-                    prefix = (self.config.get('qbittorrent.path_prefix') or '').rstrip('/')
-                    bangumi_name = bangumi.get('bangumi_name', '')
-                    season = str(undownloaded_episode.get('season', ''))
-                    episode = str(undownloaded_episode.get('episode', ''))
-                    target_path = f"{prefix}/{bangumi_name}/Season {season}"
-                    display_name = f"{bangumi_name} S{season.zfill(2)}E{episode.zfill(2)}"
-
-                    self.qb_downloader.add_torrents(
-                        undownloaded_episode['link'],
-                        None,
-                        target_path,
-                        None,
-                        display_name
-                    )
-                    self.db_manager.mark_as_downloaded(bangumi["bangumi_id"], undownloaded_episode["link"])
\ No newline at end of file
+            if not bangumi["bangumi_id"]:
+                continue
+            ready_episodes = self.db_manager.get_undownloaded_episodes(bangumi["bangumi_id"], self._filter_sql)
+            ready_episodes = self.release_selector.select(bangumi["bangumi_id"], ready_episodes)
+            for ready_episode in ready_episodes:
+                bangumi_name = bangumi.get('bangumi_name', '')
+                season = str(ready_episode.get('season', ''))
+                episode = str(ready_episode.get('episode', ''))
+                jobs.append({
+                    "bangumi_id": bangumi["bangumi_id"],
+                    "link": ready_episode["link"],
+                    # 与整理时的目标目录一致，整理时无需再移动
+                    "save_path": self.organizer.target_location(bangumi_name, ready_episode.get("season")),
+                    "display_name": f"{bangumi_name} S{season.zfill(2)}E{episode.zfill(2)}",
+                    "category": None,
+                    # 优先使用预取种子时记录的 infohash
+                    "infohash": ready_episode.get("infohash") or extract_infohash(ready_episode["link"]),
+                    # 发布时间越新越优先
+                    "priority": ready_episode["pubdate"].timestamp() if ready_episode.get("pubdate") else 0,
+                    "feed_link": ready_episode.get("feed_link"),
+                })
+        return jobs
+
+    def enqueue_ready_episodes(self) -> int:
+        """
+        扫描待下载剧集并写入持久化下载队列，返回新入队数量
+        多个工作进程中同一时间只有一个进程扫描
+        """
+        with self.db_manager.singleton_job("download_enqueue") as acquired:
+            if not acquired:
+                return 0
+            return self.db_manager.enqueue_downloads(self.collect_ready_episodes())
+
+    def next_jobs(self, limit: int, exclude: List[str] = ()) -> List[Dict]:
+        """按优先级与番剧间轮转顺序从下载队列认领最多 limit 个任务（其他进程已认领的跳过）"""
+        return self.db_manager.claim_downloads(limit, list(exclude), self.lease_seconds)
+
+    def release_jobs(self, links: List[str]):
+        """释放已认领但未提交的任务的租约，使其可被任意进程立即重新认领"""
+        self.db_manager.release_download_leases(links)
+
+    def queue_depth(self) -> Dict[str, int]:
+        """下载队列中每个番剧的待提交数量"""
+        return self.db_manager.get_download_queue_depth()
+
+    def active_torrents(self) -> int:
+        """qBittorrent 中尚未完成的种子数量"""
+        return self.reconciler.active_count()
+
+    def submit_episode(self, job: Dict) -> bool:
+        """
+        向下载器提交单个剧集，仅在下载器确认后标记为已下载
+        """
+        added = self.qb_downloader.add_torrents(
+            job["link"],
+            None,
+            job["save_path"],
+            None,
+            job["display_name"]
+        )
+        if not added:
+            logger.warning(f"qBittorrent rejected torrent: {job['link']}")
+            return False
+        self.db_manager.mark_as_downloaded(job["bangumi_id"], job["link"])
+        return True
+
+    @staticmethod
+    def group_jobs(jobs: List[Dict]) -> Dict[Tuple[str, str], List[Dict]]:
+        """按 (保存路径, 分类) 对剧集任务分组，同组可一次请求提交"""
+        groups = defaultdict(list)
+        for job in jobs:
+            groups[(job["save_path"], job.get("category"))].append(job)
+        return groups
+
+    def submit_batch(self, jobs: List[Dict]) -> List[str]:
+        """
+        批量提交同一保存路径/分类下的剧集
+        已知 infohash 的剧集一次请求提交，再批量设置显示名称；
+        本地缓存中已有种子文件的直接上传，不再让 qBittorrent 重新下载；
+        仅标记 qBittorrent 确认存在的种子为已下载。
+        无法得到 infohash 的剧集退回逐个提交。
+
+        Returns:
+            list: 成功提交的剧集链接
+        """
+        with TRACER.span("qb_submit", save_path=jobs[0]["save_path"] if jobs else None, count=len(jobs)):
+            return self._submit_batch(jobs)
+
+    def _submit_batch(self, jobs: List[Dict]) -> List[str]:
+        submitted = []
+        hashed, existing = [], []
+        for job in jobs:
+            if not job.get("infohash"):
+                if self.submit_episode(job):
+                    submitted.append(job["link"])
+            elif self.reconciler.has(job["infohash"]):
+                # 种子已在 qBittorrent 中（例如其他订阅的相同发布），无需重复添加
+                existing.append(job)
+            else:
+                hashed.append(job)
+
+        accepted = []
+        if hashed:
+            save_path, category = hashed[0]["save_path"], hashed[0].get("category")
+            urls, files = [], {}
+            for job in hashed:
+                data = self.torrent_cache.read(job["infohash"])
+                if data:
+                    files[f"{job['infohash']}.torrent"] = data
+                else:
+                    urls.append(job["link"])
+            confirmed = self.qb_downloader.add_torrents_batch(
+                urls,
+                save_path,
+                category,
+                expected_hashes=[job["infohash"] for job in hashed],
+                torrent_files=files
+            )
+            accepted = [job for job in hashed if job["infohash"] in confirmed]
+            if len(accepted) < len(hashed):
+                logger.warning(f"qBittorrent confirmed {len(accepted)}/{len(hashed)} torrents for {save_path}")
+            self.reconciler.add_known(confirmed)
+            self.qb_downloader.rename_torrents({job["infohash"]: job["display_name"] for job in accepted})
+
+        by_bangumi = defaultdict(list)
+        for job in accepted + existing:
+            by_bangumi[job["bangumi_id"]].append(job)
+        for bangumi_id, bangumi_jobs in by_bangumi.items():
+            self.db_manager.mark_as_downloaded_batch(bangumi_id,
+                                                     [job["link"] for job in bangumi_jobs],
+                                                     {job["link"]: job["infohash"] for job in bangumi_jobs})
+        submitted.extend(job["link"] for job in accepted + existing)
+        self._record_submitted(accepted + existing)
+        for bangumi_id, bangumi_jobs in by_bangumi.items():
+            pipeline_events.publish("torrent_submitted", bangumi_id=bangumi_id, count=len(bangumi_jobs),
+                                    name=bangumi_jobs[-1]["display_name"])
+        self.db_manager.remove_from_download_queue(submitted)
+        # 未能提交的任务释放租约，下一轮可被任意进程重新认领
+        done = set(submitted)
+        TORRENTS_SUBMITTED.inc(len(accepted), result="accepted")
+        TORRENTS_SUBMITTED.inc(len(existing), result="existing")
+        TORRENTS_SUBMITTED.inc(len(jobs) - len(done), result="rejected")
+        if len(done) < len(jobs):
+            pipeline_events.publish("submit_failed", count=len(jobs) - len(done), save_path=jobs[0]["save_path"])
+        self.db_manager.release_download_leases([job["link"] for job in jobs if job["link"] not in done])
+        return submitted
+
+    def _record_submitted(self, jobs: List[Dict]):
+        """按任务的来源订阅记录提交数量与发布到提交的延迟（priority 为发布时间戳）"""
+        if not jobs:
+            return
+        by_feed = defaultdict(list)
+        for job in jobs:
+            by_feed[job.get("feed_link")].append(job)
+        now = time.time()
+        for feed_link, feed_jobs in by_feed.items():
+            delays = [now - job["priority"] for job in feed_jobs if job.get("priority")]
+            self.feed_stats.record(feed_link, submitted=len(feed_jobs),
+                                   submit_delay_seconds=sum(delays),
+                                   max_submit_delay_seconds=max(delays, default=None))
+        self.feed_stats.flush()
+
+    def _download_episode(self):
+        if not self.downloader_available():
+            return
+        self.reconcile()
+        self.enqueue_ready_episodes()
+        for jobs in self.group_jobs(self.next_jobs(self.config.get("downloader.batch_limit", 200))).values():
+            self.submit_batch(jobs)
@@ -0,0 +1,77 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 这些事件逐条保留，不与同类事件合并
+UNCOALESCED_TYPES = {"error", "stage"}
+
+
+class eventBus:
+    """
+    进程内流水线事件总线
+    - 各阶段调用 publish 发布事件（拉取 RSS、新条目、解析完成、提交种子、错误等），不会阻塞
+    - 事件保存在固定容量的环形缓冲区中，按递增 id 读取，所有订阅者共享同一缓冲区
+    - 读取较慢的客户端不会占用额外内存：落后超过缓冲区容量时只收到一条 overflow 事件
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self._events = deque(maxlen=capacity)
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, **data):
+        """发布事件"""
+        with self._lock:
+            self._events.append({"id": self._next_id, "type": event_type, "time": time.time(), **data})
+            self._next_id += 1
+
+    @property
+    def last_id(self) -> int:
+        """最近一条事件的 id，没有事件时为 0"""
+        return self._next_id - 1
+
+    def since(self, last_id: int) -> Tuple[List[Dict], int]:
+        """
+        读取 id 大于 last_id 的事件
+
+        Returns:
+            tuple: (事件列表, 因缓冲区已覆盖而丢失的事件数量)
+        """
+        with self._lock:
+            if not self._events or last_id >= self._next_id - 1:
+                return [], 0
+            first_id = self._events[0]["id"]
+            dropped = max(0, first_id - last_id - 1)
+            start = max(0, last_id + 1 - first_id)
+            return [self._events[i] for i in range(start, len(self._events))], dropped
+
+
+def coalesce(events: List[Dict]) -> List[Dict]:
+    """
+    合并同一类型、同一对象（番剧、RSS 链接或阶段）的事件：
+    count 累加，其余字段取最新一条，保持首次出现的顺序
+    """
+    merged: Dict[tuple, Dict] = {}
+    result = []
+    for event in events:
+        if event["type"] in UNCOALESCED_TYPES:
+            result.append(dict(event))
+            continue
+        key = (event["type"], event.get("bangumi_id"), event.get("link"), event.get("stage"))
+        current = merged.get(key)
+        if current is None:
+            current = merged[key] = {**event, "count": event.get("count", 1)}
+            result.append(current)
+        else:
+            count = current["count"] + event.get("count", 1)
+            current.update(event)
+            current["count"] = count
+    return result
+
+
+# 本进程的流水线事件，由解析、下载阶段发布，SSE 接口订阅
+pipeline_events = eventBus()
@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Tuple
+
+# 没有发布时间的番剧排在最后
+_NO_PUBDATE = datetime.min.replace(tzinfo=timezone.utc)
+
+
+class fairParseQueue:
+    """
+    在番剧之间轮转分配一轮解析的工作量
+    - 有最新发布剧集的番剧先轮到，每次轮到只解析 quantum 集（认领时最近发布的优先），
+      导入的大量旧剧集不会阻塞其他番剧新剧集的解析
+    - 每个番剧一轮最多解析 max_per_bangumi 集，超出的部分留到下一轮
+
+        queue = fairParseQueue(db.get_unparsed_backlog(), quantum=5, max_per_bangumi=60)
+        for bangumi_id, count in queue:
+            claimed = db.claim_unparsed_episodes(bangumi_id, count)
+            queue.report(bangumi_id, count, len(claimed))
+    """
+
+    def __init__(self, backlog: Dict[str, Dict], quantum: int = 5, max_per_bangumi: int = 0):
+        """
+        Args:
+            backlog: get_unparsed_backlog() 的结果，bangumi_id -> {"claimable", "newest_pubdate", ...}
+            quantum: 每次轮到时解析的剧集数
+            max_per_bangumi: 每个番剧一轮最多解析的剧集数，0 表示不限
+        """
+        self.quantum = max(int(quantum), 1)
+        self.max_per_bangumi = int(max_per_bangumi)
+        ordered = sorted(backlog.items(), key=lambda item: (item[1].get("newest_pubdate") or _NO_PUBDATE,
+                                                            -item[1].get("claimable", 0)), reverse=True)
+        self._budget: Dict[str, int] = {}
+        self._deferred: Dict[str, int] = {}
+        for bangumi_id, stats in ordered:
+            claimable = stats.get("claimable", 0)
+            if claimable <= 0:
+                continue
+            budget = min(claimable, self.max_per_bangumi) if self.max_per_bangumi > 0 else claimable
+            self._budget[bangumi_id] = budget
+            if claimable > budget:
+                self._deferred[bangumi_id] = claimable - budget
+        self._active: List[str] = list(self._budget)
+        self.rounds = 0
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        """按轮依次产出 (bangumi_id, 本次解析数量)，直到所有番剧的工作量用完；rounds 为当前轮次"""
+        while self._active:
+            self.rounds += 1
+            for bangumi_id in list(self._active):
+                yield bangumi_id, min(self.quantum, self._budget[bangumi_id])
+
+    def report(self, bangumi_id: str, requested: int, claimed: int):
+        """记录实际认领的数量，认领不足（已被其他进程认领或已解析完）或用完工作量的番剧退出轮转"""
+        self._budget[bangumi_id] -= claimed
+        if claimed < requested or self._budget[bangumi_id] <= 0:
+            if claimed < requested:
+                self._deferred.pop(bangumi_id, None)
+            self._active.remove(bangumi_id)
+
+    @property
+    def deferred(self) -> Dict[str, int]:
+        """因达到单轮上限而留到下一轮的剧集数量"""
+        return dict(self._deferred)
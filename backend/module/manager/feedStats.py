@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+from module.databse import RSSDatabaseManager, FEED_STATS_MAX_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+class feedStatsRecorder:
+    """
+    订阅统计收集器
+    - 在内存中按订阅累计一轮内的拉取、解析、提交统计，flush 时一次写入 feed_stats
+    - 定期将旧的小时统计合并为天统计并删除过期统计（多进程中同一时间只有一个进程执行）
+    """
+
+    def __init__(self, db_manager: RSSDatabaseManager, hourly_days: float = 2, retention_days: float = 30,
+                 compact_interval: float = 3600):
+        """
+        Args:
+            hourly_days: 按小时保留统计的天数
+            retention_days: 统计保留天数
+            compact_interval: 两次合并之间的最短间隔（秒）
+        """
+        self.db_manager = db_manager
+        self.hourly_days = hourly_days
+        self.retention_days = retention_days
+        self.compact_interval = compact_interval
+        self._pending: Dict[str, Dict] = defaultdict(dict)
+        self._lock = threading.Lock()
+        self._compacted_at: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, db_manager, config):
+        return cls(db_manager,
+                   hourly_days=config.get("rss.stats_hourly_days", 2),
+                   retention_days=config.get("rss.stats_retention_days", 30))
+
+    def record(self, link: Optional[str], last_status: Optional[int] = None, **values):
+        """累计一个订阅的统计，max_* 取最大值，其他数值累加"""
+        if not link:
+            return
+        with self._lock:
+            stats = self._pending[link]
+            for column, value in values.items():
+                if value is None:
+                    continue
+                if column in FEED_STATS_MAX_COLUMNS:
+                    stats[column] = max(stats.get(column, 0), value)
+                else:
+                    stats[column] = stats.get(column, 0) + value
+            if last_status is not None:
+                stats["last_status"] = last_status
+
+    def record_fetch(self, link: str, results: Dict):
+        """记录 parse_rss_link / fetch_rss 返回结果中的拉取统计"""
+        fetch = results.get("fetch")
+        if not fetch:
+            return
+        self.record(link, last_status=fetch.get("status"), fetches=1, fetch_errors=0 if fetch.get("ok") else 1,
+                    fetch_seconds=fetch.get("seconds") or 0, max_fetch_seconds=fetch.get("seconds") or 0,
+                    bytes=fetch.get("bytes") or 0, entries=len(results.get("torrents") or []))
+
+    def flush(self):
+        """写入已累计的统计，并按间隔合并旧统计"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(dict)
+        if pending:
+            self.db_manager.record_feed_stats(dict(pending))
+        if self._compacted_at is None or time.monotonic() - self._compacted_at >= self.compact_interval:
+            self._compacted_at = time.monotonic()
+            with self.db_manager.singleton_job("feed_stats_compact") as acquired:
+                if acquired:
+                    removed = self.db_manager.compact_feed_stats(self.hourly_days, self.retention_days)
+                    logger.debug(f"Compacted {removed} feed stats rows")
@@ -0,0 +1,150 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from module.metrics import ONBOARDING_SECONDS, TRACER
+from .eventBus import pipeline_events
+
+logger = logging.getLogger(__name__)
+
+
+class onboardingQueue:
+    """
+    新订阅快速通道
+    - API 添加订阅后立即入队，由后台线程拉取 RSS、解析番剧名称、写入剧集、解析文件名并写入下载队列，
+      无需等待下一轮定时解析（定时全量解析仍作为兜底）
+    - 同一链接在队列中只保留一个任务
+    - 记录每个任务各阶段的耗时（fetch / ingest / parse / enqueue / total，total 含排队时间）
+    """
+
+    def __init__(self, parse_manager, on_ready: Optional[Callable[[], object]] = None,
+                 workers: int = 1, history: int = 50):
+        """
+        Args:
+            parse_manager: 提供 rss_parser / poll_subscription / parse_bangumi 的解析管理器
+            on_ready: 剧集解析完成后调用，用于写入下载队列并唤醒下载调度器
+            workers: 处理线程数
+            history: 保留的已完成任务数量
+        """
+        self.manager = parse_manager
+        self.on_ready = on_ready
+        self.workers = max(1, int(workers))
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self._jobs: Dict[str, Dict] = {}
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    @classmethod
+    def from_config(cls, parse_manager, config, on_ready: Optional[Callable[[], object]] = None):
+        return cls(parse_manager, on_ready, workers=config.get("parser.onboarding_workers", 1))
+
+    # ---------- 控制 ----------
+
+    def start(self):
+        """启动处理线程（已启动时跳过）"""
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._threads = [threading.Thread(target=self._loop, name=f"onboarding-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """处理完正在进行的任务后停止，未开始的任务留给定时解析"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, link: str) -> Dict:
+        """
+        将新订阅加入队列，链接已在队列中时返回已有任务
+
+        Returns:
+            dict: 任务状态
+        """
+        with self._lock:
+            job = self._jobs.get(link)
+            if job is None:
+                job = {"link": link, "status": "queued", "queued_at": time.time(), "started_at": None,
+                       "finished_at": None, "timings": {}, "result": None, "error": None}
+                self._jobs[link] = job
+                self._queue.put(job)
+            return dict(job)
+
+    def status(self) -> Dict:
+        """排队中、处理中与最近完成的任务"""
+        with self._lock:
+            active = [dict(job) for job in self._jobs.values()]
+            recent = [dict(job) for job in self._history]
+        return {
+            "queued": [job for job in active if job["status"] == "queued"],
+            "running": [job for job in active if job["status"] == "running"],
+            "recent": recent[::-1],
+        }
+
+    # ---------- 处理 ----------
+
+    def _loop(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            self._process(job)
+
+    def _process(self, job: Dict):
+        link = job["link"]
+        timings = job["timings"]
+        job.update(status="running", started_at=time.time())
+        try:
+            with TRACER.span("onboarding", link=link):
+                job["result"] = self._run_stages(link, timings)
+            job["status"] = "done"
+        except Exception as e:
+            logger.error(f"Failed to onboard subscription {link}: {e}", exc_info=True)
+            job.update(status="failed", error=str(e))
+            pipeline_events.publish("error", stage="onboarding", message=f"{link}: {e}")
+        finally:
+            job["finished_at"] = time.time()
+            timings["total"] = job["finished_at"] - job["queued_at"]
+            ONBOARDING_SECONDS.observe(timings["total"], stage="total")
+            with self._lock:
+                self._jobs.pop(link, None)
+                self._history.append(dict(job))
+        if job["status"] == "done":
+            logger.info(f"Onboarded subscription {link} in {timings['total']:.2f} seconds")
+            pipeline_events.publish("subscription_ready", link=link, bangumi_id=job["result"]["bangumi_id"],
+                                    bangumi_name=job["result"]["bangumi_name"], seconds=timings["total"],
+                                    parsed=job["result"]["parsed"])
+
+    def _run_stages(self, link: str, timings: Dict) -> Dict:
+        """依次执行各阶段并记录耗时，返回 poll_subscription 的结果与解析数量"""
+        def stage(name: str, start_time: float):
+            timings[name] = time.perf_counter() - start_time
+            ONBOARDING_SECONDS.observe(timings[name], stage=name)
+
+        start_time = time.perf_counter()
+        results = self.manager.rss_parser.fetch_rss(link)
+        stage("fetch", start_time)
+
+        start_time = time.perf_counter()
+        result = self.manager.poll_subscription(link, results)
+        stage("ingest", start_time)
+        if not result["bangumi_id"]:
+            raise RuntimeError("番剧名称解析失败，将在下一轮轮询时重试")
+
+        start_time = time.perf_counter()
+        result["parsed"] = self.manager.parse_bangumi(result["bangumi_id"])
+        stage("parse", start_time)
+        self.manager.feed_stats.flush()
+
+        if self.on_ready:
+            start_time = time.perf_counter()
+            self.on_ready()
+            stage("enqueue", start_time)
+        return result
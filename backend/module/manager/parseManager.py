@@ -1,54 +1,300 @@
 from module.parser import openaiParser
 from module.databse import RSSDatabaseManager
 from module.settings import configManager
-from module.rss import torrentRSSParser
+from module.rss import torrentRSSParser, feedRouter, entry_route_keys, subscription_route_keys, subscription_link, \
+    is_aggregate_only
+from module.downloader import torrentCache, main_video_file
+from module.metrics import ENTRIES_INGESTED, EPISODES_PARSED, TRACER
+from .eventBus import pipeline_events
+from .feedStats import feedStatsRecorder
+from .fairParseQueue import fairParseQueue
+from .downloadFilter import downloadFilter
+import logging
 import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 文件名解析结果必须包含的字段
+EPISODE_FIELDS = {"subtitle_type", "hasCHS", "hasCHT", "season", "episode"}
 
 
 class parseManager:
-    def __init__(self):
-        self.config = configManager("config/config.yaml")
+    def __init__(self, config: Optional[configManager] = None, db_manager: Optional[RSSDatabaseManager] = None,
+                 openai_parser: Optional[openaiParser] = None):
+        self.config = config or configManager.shared()
         self.rss_parser = torrentRSSParser(timeout=300)
-        self.openai_parser = openaiParser(self.config.get("openai.base_url"),
-                                          self.config.get("openai.model_name"),
-                                          self.config.get("openai.api_key"))
-        self.db_manager = RSSDatabaseManager(self.config.get("database.host"),
-                                             self.config.get("database.port"),
-                                             self.config.get("database.databse"),
-                                             self.config.get("database.user"),
-                                             self.config.get("database.password"))
+        self.openai_parser = openai_parser or openaiParser.from_config(self.config)
+        self.db_manager = db_manager or RSSDatabaseManager.from_config(self.config)
+        self.torrent_cache = torrentCache.from_config(self.config)
+        self.feed_stats = feedStatsRecorder.from_config(self.db_manager, self.config)
+        # 每轮解析完成后的回调，用于唤醒下载调度器
+        self.on_cycle_done: Optional[Callable[[], None]] = None
+        # 上一轮因单番剧上限留下的待解析剧集：bangumi_id -> 数量，非空时提前开始下一轮
+        self.deferred: Dict[str, int] = {}
+        self._last_poll: Optional[float] = None
+        # 按配置版本编译的下载过滤条件，预取前先排除不会下载的条目
+        self._filter: Optional[downloadFilter] = None
+        self._filter_version: Optional[int] = None
         
     def main(self):
         while True:
-            self._parse_rss_link()
-            self._parse_file()
-            time.sleep(self.config.get("parser.interval")*60)
+            self.run_cycle()
+            time.sleep(self.interval())
+
+    def run_cycle(self):
+        """
+        执行一轮解析：拉取 RSS、解析文件名，完成后通知下游
+        多个工作进程中同一时间只有一个进程拉取 RSS，文件名解析按租约分摊到各进程
+        为消化解析积压而提前开始的一轮，未到拉取间隔时不拉取 RSS
+        """
+        if not self.deferred or self._last_poll is None \
+                or time.monotonic() - self._last_poll >= self.config.get("parser.interval", 10) * 60:
+            self._last_poll = time.monotonic()
+            with self.db_manager.singleton_job("poll_feeds") as acquired:
+                if acquired:
+                    self._parse_rss_link()
+        self._parse_file()
+        self.feed_stats.flush()
+        if self.on_cycle_done:
+            self.on_cycle_done()
+
+    def interval(self) -> float:
+        """两轮解析之间的间隔（秒），仍有积压时按 parser.backlog_interval 提前开始下一轮"""
+        interval = self.config.get("parser.interval", 10) * 60
+        if self.deferred:
+            return min(interval, self.config.get("parser.backlog_interval", 30))
+        return interval
+
+    def unparsed_backlog(self) -> int:
+        """待解析的剧集数量"""
+        return self.db_manager.count_unparsed_episodes()
     
     def _parse_rss_link(self):
+        with TRACER.span("aggregate_poll"):
+            self._parse_aggregate_feeds()
         bangumi_list = self.db_manager.get_all_bangumi()
         if not bangumi_list:
             return
         for bangumi in bangumi_list:
-            results = self.rss_parser.parse_rss_link(bangumi["link"])
-            bangumi_name = self.openai_parser.parseName(results["RSSName"])
-            bangumi_id = self.db_manager.update_bangumi_info(bangumi["link"], bangumi_name)
-            for torrent in results["torrents"]:
-                self.db_manager.add_episode(bangumi_id, torrent["torrent_link"], torrent["filename"])
+            if bangumi.get("source") or is_aggregate_only(bangumi["link"]):
+                # 已由聚合 RSS 覆盖，无需单独拉取
+                continue
+            self.poll_subscription(bangumi["link"])
 
-    def _parse_file(self):
-        bangumi_list = self.db_manager.get_all_bangumi()
-        if not bangumi_list:
+    def poll_subscription(self, link: str, results: Optional[Dict] = None) -> Dict:
+        """
+        拉取单个订阅：解析番剧名称并写入新剧集
+
+        Args:
+            link: 订阅链接
+            results: 已拉取的 RSS 内容，为空时重新拉取
+
+        Returns:
+            dict: {"bangumi_id", "bangumi_name", "entries", "new_entries"}
+        """
+        with TRACER.span("feed_poll", link=link):
+            return self._poll_subscription(link, results)
+
+    def _poll_subscription(self, link: str, results: Optional[Dict]) -> Dict:
+        if results is None:
+            results = self.rss_parser.parse_rss_link(link)
+        self.feed_stats.record_fetch(link, results)
+        bangumi_name = self._parse_name(link, results["RSSName"])
+        bangumi_id = self.db_manager.update_bangumi_info(link, bangumi_name)
+        if not bangumi_id:
+            # 名称解析失败且订阅尚无番剧，本轮不写入剧集，下一轮重新解析名称
+            logger.warning(f"Skipped ingesting {link}: failed to resolve bangumi name")
+            return {"bangumi_id": None, "bangumi_name": None,
+                    "entries": len(results["torrents"]), "new_entries": 0}
+        new_entries = self._add_episodes(bangumi_id, results["torrents"], link)
+        self.feed_stats.record(link, new_entries=new_entries)
+        pipeline_events.publish("feed_fetched", link=link, bangumi_id=bangumi_id,
+                                bangumi_name=bangumi_name, entries=len(results["torrents"]),
+                                new_entries=new_entries)
+        # 从单独订阅的条目中学习标题，供聚合 RSS 路由使用
+        self.db_manager.learn_feed_routes({key: link
+                                           for key in subscription_route_keys(link, results["torrents"])})
+        return {"bangumi_id": bangumi_id, "bangumi_name": bangumi_name,
+                "entries": len(results["torrents"]), "new_entries": new_entries}
+
+    def _parse_name(self, link: str, name: Optional[str]) -> Optional[str]:
+        """解析番剧名称，并计入该订阅的 LLM 调用统计"""
+        started = time.perf_counter()
+        bangumi_name = self.openai_parser.parseName(name)
+        self.feed_stats.record(link, llm_calls=1, llm_seconds=time.perf_counter() - started)
+        return bangumi_name
+
+    def _add_episodes(self, bangumi_id: str, torrents: List[Dict], feed_link: str) -> int:
+        """写入剧集（记录来源订阅 feed_link）并预取新剧集的种子文件，返回新剧集数量"""
+        added = []
+        with TRACER.span("entry_ingest", root=False, bangumi_id=bangumi_id, entries=len(torrents)) as span:
+            for torrent in torrents:
+                if self.db_manager.add_episode(bangumi_id, torrent["torrent_link"], torrent["filename"],
+                                               torrent.get("pubdate"), feed_link):
+                    added.append({"link": torrent["torrent_link"], "filename": torrent["filename"]})
+            if span is not None:
+                span["attrs"]["new_entries"] = len(added)
+        ENTRIES_INGESTED.inc(len(added))
+        if added:
+            with TRACER.span("torrent_prefetch", root=False):
+                self._prefetch_metadata(bangumi_id, added)
+        return len(added)
+
+    def _parse_aggregate_feeds(self):
+        """
+        每轮只拉取一次聚合 RSS（如 Mikan MyBangumi），按路由键将条目分发到对应订阅，
+        无法匹配的条目自动创建新订阅；被覆盖的订阅不再单独轮询
+        """
+        feeds = self.db_manager.get_aggregate_feeds()
+        if not feeds:
             return
-        for bangumi in bangumi_list:
-            unparsed_episodes = self.db_manager.get_unparsed_episodes(bangumi["bangumi_id"])
-            for unparsed_episode in unparsed_episodes:
-                episode_info = self.openai_parser.parseFile(unparsed_episode["filename"])
-                self.db_manager.update_episode(bangumi["bangumi_id"],
+        router = feedRouter(self.db_manager.get_feed_routes())
+        bangumi_by_link = {bangumi["link"]: bangumi for bangumi in self.db_manager.get_all_bangumi() or []}
+        for feed in feeds:
+            results = self.rss_parser.parse_rss_link(feed["link"])
+            self.feed_stats.record_fetch(feed["link"], results)
+            if not results["torrents"]:
+                continue
+            self.db_manager.touch_aggregate_feed(feed["link"])
+            new_entries = 0
+            routed, unmatched = router.split(results["torrents"])
+            for torrent in unmatched:
+                # 同一轮中先前未匹配的条目可能已创建了对应订阅
+                link = router.route(torrent)
+                if not link:
+                    link = subscription_link(feed["link"], torrent)
+                    bangumi_name = self._parse_name(link, torrent["filename"])
+                    bangumi_id = self.db_manager.update_bangumi_info(link, bangumi_name)
+                    if not bangumi_id:
+                        # 名称解析失败时不创建订阅，下一轮重新尝试
+                        logger.warning(f"Skipped aggregate entry {torrent['filename']}: failed to resolve bangumi name")
+                        continue
+                    bangumi_by_link[link] = {"link": link, "bangumi_id": bangumi_id, "bangumi_name": bangumi_name}
+                    self.db_manager.learn_feed_routes(router.learn(entry_route_keys(torrent), link))
+                    logger.info(f"Created subscription {bangumi_name} from aggregate feed: {link}")
+                routed.setdefault(link, []).append(torrent)
+
+            self.db_manager.set_bangumi_source(list(routed), feed["link"])
+            for link, torrents in routed.items():
+                bangumi = bangumi_by_link.get(link)
+                if bangumi is None:
+                    continue
+                bangumi_id = bangumi["bangumi_id"]
+                if not bangumi_id:
+                    # 订阅尚未单独拉取过，从条目标题解析番剧名称
+                    bangumi_id = self.db_manager.update_bangumi_info(link, self._parse_name(link, torrents[0]["filename"]))
+                    if not bangumi_id:
+                        logger.warning(f"Skipped routed entries of {link}: failed to resolve bangumi name")
+                        continue
+                    bangumi["bangumi_id"] = bangumi_id
+                added = self._add_episodes(bangumi_id, torrents, link)
+                self.feed_stats.record(link, new_entries=added)
+                new_entries += added
+            pipeline_events.publish("feed_fetched", link=feed["link"], entries=len(results["torrents"]),
+                                    new_entries=new_entries, subscriptions=len(routed))
+            logger.info(f"Routed {len(results['torrents'])} entries of aggregate feed {feed['link']} "
+                        f"to {len(routed)} subscriptions")
+
+    def _download_filter(self) -> downloadFilter:
+        """按配置版本编译下载过滤条件，仅在配置变更后重新编译"""
+        if self._filter is None or self._filter_version != self.config.version:
+            self._filter = downloadFilter.from_config(self.config)
+            self._filter_version = self.config.version
+        return self._filter
+
+    def _prefetch_metadata(self, bangumi_id: str, added: List[Dict]):
+        """
+        并发预取新写入条目的种子文件，记录 infohash 与种子内的视频文件名
+        下载时可直接从本地缓存提交，解析时使用更规范的内部文件名
+        按文件名即可判断不会下载的条目不预取；此前失败且已到重试时间的条目一并重试，
+        失败的条目按尝试次数指数退避，超过 downloader.prefetch_max_attempts 后不再预取
+        """
+        retries = self.db_manager.get_episodes_without_metadata(
+            bangumi_id, self.config.get("downloader.prefetch_max_attempts", 5))
+        download_filter = self._download_filter()
+        links = [episode["link"] for episode in added + retries if download_filter.accepts_filename(episode["filename"])]
+        if not links:
+            return
+        fetched = self.torrent_cache.prefetch(links)
+        metadata = {link: {"infohash": meta["infohash"], "inner_filename": main_video_file(meta["files"])}
+                    for link, meta in fetched.items()}
+        self.db_manager.update_torrent_metadata(bangumi_id, metadata)
+        failed = [link for link in dict.fromkeys(links) if link not in metadata]
+        if failed:
+            self.db_manager.record_metadata_failures(bangumi_id, failed,
+                                                     self.config.get("downloader.prefetch_retry_seconds", 600))
+            logger.warning(f"Prefetched {len(metadata)}/{len(metadata) + len(failed)} torrents of bangumi {bangumi_id}")
+
+    def _parse_file(self):
+        """
+        在番剧之间轮转解析待解析的剧集（见 fairParseQueue），第一轮轮转结束即通知下游，
+        各番剧最新的剧集无需等待大量旧剧集解析完成即可下载
+        """
+        lease_seconds = self.config.get("runtime.lease_seconds", 300)
+        queue = fairParseQueue(self.db_manager.get_unparsed_backlog(),
+                               quantum=self.config.get("parser.fair_quantum", 5),
+                               max_per_bangumi=self.config.get("parser.max_per_bangumi", 60))
+        notified = False
+        for bangumi_id, count in queue:
+            if queue.rounds > 1 and not notified and self.on_cycle_done:
+                self.on_cycle_done()
+                notified = True
+            unparsed_episodes = self.db_manager.claim_unparsed_episodes(bangumi_id, count, lease_seconds)
+            queue.report(bangumi_id, count, len(unparsed_episodes))
+            if unparsed_episodes:
+                self._parse_episodes(bangumi_id, unparsed_episodes)
+        self.deferred = queue.deferred
+        if self.deferred:
+            logger.info(f"Deferred {sum(self.deferred.values())} unparsed episodes of "
+                        f"{len(self.deferred)} bangumi to the next cycle")
+
+    def backlog(self) -> List[Dict]:
+        """每个番剧的待解析剧集数量、最新发布时间与留到下一轮的数量，积压最多的在前"""
+        names = {bangumi["bangumi_id"]: bangumi["bangumi_name"] for bangumi in self.db_manager.get_all_bangumi() or []}
+        deferred = self.deferred
+        rows = [{"bangumi_id": bangumi_id, "bangumi_name": names.get(bangumi_id), **stats,
+                 "deferred": deferred.get(bangumi_id, 0)}
+                for bangumi_id, stats in self.db_manager.get_unparsed_backlog().items()]
+        return sorted(rows, key=lambda row: row["unparsed"], reverse=True)
+
+    def parse_bangumi(self, bangumi_id: str) -> int:
+        """解析单个番剧的全部待解析剧集，返回解析的数量"""
+        batch_size = self.config.get("runtime.parse_batch", 20)
+        lease_seconds = self.config.get("runtime.lease_seconds", 300)
+        parsed = 0
+        while True:
+            # 每次认领一小批，其他进程可同时认领同一番剧的其余剧集
+            unparsed_episodes = self.db_manager.claim_unparsed_episodes(bangumi_id, batch_size, lease_seconds)
+            if not unparsed_episodes:
+                return parsed
+            self._parse_episodes(bangumi_id, unparsed_episodes)
+            parsed += len(unparsed_episodes)
+
+    def _parse_episodes(self, bangumi_id: str, unparsed_episodes: List[Dict]):
+        for unparsed_episode in unparsed_episodes:
+            # 多个订阅可能合并到同一番剧，按剧集的来源订阅记录解析统计
+            link = unparsed_episode.get("feed_link")
+            with TRACER.span("episode_parse", bangumi_id=bangumi_id, link=unparsed_episode["link"]):
+                # 种子内的视频文件名通常比 RSS 标题更规范，优先用于解析
+                started = time.perf_counter()
+                episode_info = self.openai_parser.parseFile(unparsed_episode.get("inner_filename")
+                                                            or unparsed_episode["filename"])
+                self.feed_stats.record(link, llm_calls=1, llm_seconds=time.perf_counter() - started)
+                if not isinstance(episode_info, dict) or not EPISODE_FIELDS <= episode_info.keys():
+                    # 解析失败，租约过期后重新认领解析
+                    self.feed_stats.record(link, parse_failures=1)
+                    logger.warning(f"Failed to parse episode {unparsed_episode['filename']}: {episode_info}")
+                    continue
+                self.db_manager.update_episode(bangumi_id,
                                                unparsed_episode["link"],
                                                episode_info["subtitle_type"],
                                                episode_info["hasCHS"],
                                                episode_info["hasCHT"],
                                                episode_info["season"],
                                                episode_info["episode"])
-                self.db_manager.mark_as_parsed(bangumi["bangumi_id"],
+                self.db_manager.mark_as_parsed(bangumi_id,
                                                unparsed_episode["link"])
+            EPISODES_PARSED.inc()
+            pipeline_events.publish("episode_parsed", bangumi_id=bangumi_id, filename=unparsed_episode["filename"],
+                                    season=episode_info["season"], episode=episode_info["episode"])
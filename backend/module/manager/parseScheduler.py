@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from module.metrics import CYCLE_SECONDS, PARSE_BACKLOG
+from .eventBus import pipeline_events
+
+logger = logging.getLogger(__name__)
+
+
+class parseScheduler:
+    """
+    解析调度器
+    - 在独立线程中按 parser.interval 周期执行解析，trigger（wake）时立即开始新一轮
+    - 单轮异常不会终止线程，连续失败时按指数退避延后下一轮
+    - 支持启动、停止、暂停、恢复，并统计每轮耗时与待解析剧集数量
+    """
+
+    def __init__(self, parse_manager, failure_backoff_max: float = 600.0):
+        """
+        Args:
+            parse_manager: 提供 run_cycle / interval / unparsed_backlog / deferred 的解析管理器
+            failure_backoff_max: 连续失败时下一轮的最长等待时间（秒）
+        """
+        self.manager = parse_manager
+        self.failure_backoff_max = float(failure_backoff_max)
+
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        self._thread: Optional[threading.Thread] = None
+        self._state_lock = threading.Lock()
+
+        self._backlog: Optional[int] = None
+        self._stats = {
+            "cycles": 0,
+            "failures": 0,
+            "consecutive_failures": 0,
+            "last_error": None,
+            "last_cycle_seconds": None,
+            "max_cycle_seconds": None,
+            "deferred": 0,
+            "last_cycle_at": None,
+            "next_cycle_at": None,
+        }
+
+    # ---------- 控制 ----------
+
+    def start(self) -> bool:
+        """启动解析线程，已在运行时返回 False"""
+        with self._state_lock:
+            if self.is_running:
+                return False
+            self._stop_event.clear()
+            self._resume_event.set()
+            self._thread = threading.Thread(target=self._loop, name="parse-scheduler", daemon=True)
+            self._thread.start()
+        logger.info("Parse scheduler started.")
+        return True
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止解析线程（正在进行的一轮会先完成）"""
+        with self._state_lock:
+            if not self.is_running:
+                return
+            self._stop_event.set()
+            self._resume_event.set()
+            self._wake_event.set()
+            thread = self._thread
+        thread.join(timeout)
+        logger.info("Parse scheduler stopped.")
+
+    def pause(self):
+        """暂停解析（正在进行的一轮会完成）"""
+        self._resume_event.clear()
+        logger.info("Parse scheduler paused.")
+
+    def resume(self):
+        """恢复解析并立即开始新一轮"""
+        self._resume_event.set()
+        self.wake()
+        logger.info("Parse scheduler resumed.")
+
+    def wake(self):
+        """立即开始新一轮解析"""
+        self._wake_event.set()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def is_paused(self) -> bool:
+        return not self._resume_event.is_set()
+
+    def status(self) -> Dict:
+        """返回运行状态、每轮耗时、待解析剧集数量与因单番剧上限留到下一轮的数量"""
+        return {
+            "running": self.is_running,
+            "paused": self.is_paused,
+            "backlog": self._backlog,
+            **self._stats,
+        }
+
+    # ---------- 调度 ----------
+
+    def run_cycle(self):
+        """执行一轮解析并记录耗时与失败情况"""
+        start_time = time.perf_counter()
+        try:
+            self.manager.run_cycle()
+            self._stats["consecutive_failures"] = 0
+            self._stats["last_error"] = None
+        except Exception as e:
+            self._stats["failures"] += 1
+            self._stats["consecutive_failures"] += 1
+            self._stats["last_error"] = str(e)
+            logger.error(f"Parse cycle failed: {e}", exc_info=True)
+            pipeline_events.publish("error", stage="parser", message=str(e))
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self._stats["cycles"] += 1
+            self._stats["last_cycle_seconds"] = elapsed
+            self._stats["max_cycle_seconds"] = max(self._stats["max_cycle_seconds"] or 0.0, elapsed)
+            self._stats["last_cycle_at"] = time.time()
+            self._stats["deferred"] = sum(self.manager.deferred.values())
+            CYCLE_SECONDS.observe(elapsed, stage="parser")
+            try:
+                self._backlog = self.manager.unparsed_backlog()
+                PARSE_BACKLOG.set(self._backlog)
+            except Exception as e:
+                logger.debug(f"Failed to count unparsed episodes: {e}")
+            pipeline_events.publish("cycle_done", stage="parser", seconds=elapsed, backlog=self._backlog)
+
+    def _next_delay(self) -> float:
+        delay = self.manager.interval()
+        failures = self._stats["consecutive_failures"]
+        if failures:
+            # 连续失败时按指数退避，避免在外部服务故障期间频繁重试
+            delay = min(delay * 2 ** (failures - 1), max(delay, self.failure_backoff_max))
+        return delay
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            self._resume_event.wait()
+            if self._stop_event.is_set():
+                break
+            self._wake_event.clear()
+            self.run_cycle()
+            delay = self._next_delay()
+            self._stats["next_cycle_at"] = time.time() + delay
+            # 等待期间若被 wake() 唤醒则立即开始下一轮
+            self._wake_event.wait(delay)
@@ -0,0 +1,167 @@
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from .downloadFilter import extract_group, extract_resolution
+
+logger = logging.getLogger(__name__)
+
+_VERSION_PATTERN = re.compile(r"(?<![A-Za-z])[vV](\d)(?!\d)")
+_RESOLUTION_RANK = {"480p": 1, "720p": 2, "1080p": 3, "2160p": 4}
+
+
+def extract_version(filename: str) -> int:
+    """从文件名中提取发布版本号（如 v2），未标注时为 1"""
+    match = _VERSION_PATTERN.search(filename or "")
+    return int(match.group(1)) if match else 1
+
+
+class releaseSelector:
+    """
+    同一集多发布的去重选择器
+    以 (番剧, 季, 集) 为键收集通过过滤条件的竞争发布（多个字幕组、简繁、v2 等），
+    按偏好字幕组、分辨率、字幕类型、版本打分，在等待窗口结束后只放行得分最高的一个；
+    之后出现更优的发布时，仅在先前的选择尚未开始下载时替换（不会删除任何已下载的文件）。
+    """
+
+    def __init__(self, db_manager, qb_downloader=None,
+                 prefer_groups: Optional[List[str]] = None,
+                 prefer_resolution: Optional[str] = "1080p",
+                 prefer_subtype: Optional[List[str]] = None,
+                 grace_minutes: float = 10,
+                 replace_completed: bool = False,
+                 reconciler=None):
+        """
+        Args:
+            db_manager: RSSDatabaseManager 实例
+            qb_downloader: 替换先前选择时用于从 qB 中移除尚未开始下载的旧种子
+            prefer_groups: 偏好字幕组，越靠前越优先
+            prefer_resolution: 偏好分辨率，越接近越优先
+            prefer_subtype: 偏好字幕类型，越靠前越优先
+            grace_minutes: 某集首次出现后等待其他发布的时间（分钟）
+            replace_completed: 是否允许替换已下载完成的发布（旧种子及其文件保留在 qB 中）
+            reconciler: qbReconciler 实例，用于判断已提交的旧种子是否已开始下载
+        """
+        self.db_manager = db_manager
+        self.qb_downloader = qb_downloader
+        self.prefer_groups = [g.lower() for g in prefer_groups or []]
+        self.prefer_resolution = _RESOLUTION_RANK.get(prefer_resolution or "", 0)
+        self.prefer_subtype = list(prefer_subtype or ["SFT", "HRD", "EXT", "UKN"])
+        self.grace = timedelta(minutes=float(grace_minutes or 0))
+        self.replace_completed = bool(replace_completed)
+        self.reconciler = reconciler
+
+    @classmethod
+    def from_config(cls, db_manager, qb_downloader, config, reconciler=None):
+        """根据配置中的 downloader.prefer_* 创建选择器"""
+        return cls(db_manager, qb_downloader, reconciler=reconciler,
+                   prefer_groups=config.get("downloader.prefer_groups"),
+                   prefer_resolution=config.get("downloader.prefer_resolution", "1080p"),
+                   prefer_subtype=config.get("downloader.prefer_subtype"),
+                   grace_minutes=config.get("downloader.grace_minutes", 10),
+                   replace_completed=config.get("downloader.replace_completed", False))
+
+    def score(self, episode: Dict) -> float:
+        """
+        为发布打分，分值越高越好
+        优先级依次为：偏好字幕组 > 分辨率 > 字幕类型 > 版本
+        """
+        filename = episode.get("filename") or ""
+        group = (extract_group(filename) or "").lower()
+        group_score = len(self.prefer_groups) - self.prefer_groups.index(group) if group in self.prefer_groups else 0
+
+        resolution = _RESOLUTION_RANK.get(extract_resolution(filename) or "", 0)
+        if self.prefer_resolution and resolution:
+            # 偏好分辨率最高，其余按与偏好的距离递减
+            resolution_score = 10 - abs(resolution - self.prefer_resolution) * 2 - (resolution > self.prefer_resolution)
+        else:
+            resolution_score = resolution
+
+        subtype = episode.get("subtitle_type")
+        subtype_score = len(self.prefer_subtype) - self.prefer_subtype.index(subtype) \
+            if subtype in self.prefer_subtype else 0
+
+        version = min(extract_version(filename), 9)
+        return group_score * 10000 + resolution_score * 100 + subtype_score * 10 + version
+
+    def select(self, bangumi_id: str, episodes: List[Dict]) -> List[Dict]:
+        """
+        从某番剧通过过滤条件的待下载剧集中选出本轮应入队的发布
+
+        Args:
+            bangumi_id: 番剧 ID
+            episodes: get_undownloaded_episodes 返回的行
+
+        Returns:
+            list: 应入队的剧集；无集数的条目（合集、剧场版等）不参与去重，原样返回
+        """
+        selected = [e for e in episodes if e.get("episode") is None]
+        candidates: Dict[Tuple[int, int], List[Dict]] = defaultdict(list)
+        for episode in episodes:
+            if episode.get("episode") is not None:
+                candidates[(episode.get("season") or 1, episode["episode"])].append(episode)
+        if not candidates:
+            return selected
+
+        picks = self.db_manager.get_release_picks(bangumi_id)
+        new_keys = [key for key in candidates if key not in picks]
+        if new_keys:
+            self.db_manager.add_release_keys(bangumi_id, new_keys)
+            picks.update(self.db_manager.get_release_picks(bangumi_id))
+
+        now = datetime.now(timezone.utc)
+        skipped = []
+        for key, releases in candidates.items():
+            pick = picks.get(key) or {"link": None, "score": None, "first_seen": now}
+            scored = sorted(((self.score(e), e) for e in releases), key=lambda item: item[0], reverse=True)
+            best_score, best = scored[0]
+            losers = [e["link"] for _, e in scored[1:]]
+            # 先前选定的发布重新出现在待下载剧集中（如下载失败或停滞后被重新入队）
+            current = next((e for e in releases if e["link"] == pick["link"]), None) if pick["link"] else None
+
+            if pick["link"] is None:
+                if now - pick["first_seen"] < self.grace:
+                    continue
+            elif best_score <= (pick["score"] or 0) or best is current:
+                if current is not None:
+                    selected.append(current)
+                skipped.extend(e["link"] for e in releases if e is not current)
+                continue
+            elif not self._replace(bangumi_id, pick["link"]):
+                skipped.extend(e["link"] for e in releases)
+                continue
+
+            self.db_manager.set_release_pick(bangumi_id, key[0], key[1], best["link"], best_score)
+            selected.append(best)
+            skipped.extend(losers)
+
+        self.db_manager.mark_as_skipped(bangumi_id, skipped)
+        return selected
+
+    def _replace(self, bangumi_id: str, old_link: str) -> bool:
+        """
+        撤下先前选定的发布，返回是否允许替换
+        旧发布正被认领提交、或已开始下载时保留；只从 qB 中移除尚未开始下载的旧种子，从不删除文件
+        """
+        if not self.db_manager.remove_unleased_from_download_queue([old_link]):
+            logger.debug(f"Keep release {old_link} in bangumi {bangumi_id}: it is being submitted")
+            return False
+        state = self.db_manager.get_episode_states(bangumi_id, [old_link]).get(old_link)
+        if state and state["completed"]:
+            if not self.replace_completed:
+                return False
+        elif state and state["downloaded"]:
+            torrent = self.reconciler.get(state["infohash"]) if self.reconciler and state["infohash"] else None
+            if torrent is None or torrent.get("progress") or not self.qb_downloader:
+                # 无法确认尚未开始下载，保留先前的选择
+                return False
+            try:
+                self.qb_downloader.delete_torrents([state["infohash"]], delete_files=False)
+            except Exception as e:
+                logger.error(f"Failed to remove superseded torrent {state['infohash']}: {e}")
+                return False
+        self.db_manager.mark_as_skipped(bangumi_id, [old_link])
+        logger.info(f"Replacing release {old_link} in bangumi {bangumi_id} with a better one")
+        return True
@@ -1,20 +1,13 @@
-from module.rss import torrentRSSParser
-from module.parser import openaiParser
-from module.databse import RSSDatabaseManager
+from typing import Dict, List, Optional
+from module.databse import RSSDatabaseManager, FEED_STATS_SUM_COLUMNS
+from module.parser import nameIndex, normalize_name
+from module.rss import mikan_ids
 from module.settings import configManager
 
 class rssManager:
-    def __init__(self):
-        self.config = configManager("config/config.yaml")
-        self.rss_parser = torrentRSSParser(timeout=300)
-        self.openai_parser = openaiParser(self.config.get("openai.base_url"),
-                                   self.config.get("openai.model_name"),
-                                   self.config.get("openai.api_key"))
-        self.db_manager = RSSDatabaseManager(self.config.get("database.host"),
-                                             self.config.get("database.port"),
-                                             self.config.get("database.databse"),
-                                             self.config.get("database.user"),
-                                             self.config.get("database.password"))
+    def __init__(self, config: Optional[configManager] = None, db_manager: Optional[RSSDatabaseManager] = None):
+        self.config = config or configManager.shared()
+        self.db_manager = db_manager or RSSDatabaseManager.from_config(self.config)
     
     def add_rss(self, rss_link):
         self.db_manager.add_rss_source(rss_link)
@@ -22,7 +15,76 @@ class rssManager:
     def list_rss(self):
         return self.db_manager.get_all_bangumi()
 
+    def list_rss_page(self, after_id=0, limit=50, search=None, pending_only=False):
+        return self.db_manager.list_bangumi_page(after_id, limit, search, pending_only)
+
+    def catalogue_version(self):
+        return self.db_manager.get_catalogue_version()
+
     def remove_rss(self, rss_link):
         self.db_manager.remove_rss_source(rss_link)
 
+    def feed_stats(self, hours=24, sort="cost", descending=True, limit=50) -> List[Dict]:
+        """最近 hours 小时内每个订阅的拉取、解析、提交统计及派生指标"""
+        rows = self.db_manager.get_feed_stats(hours, sort, descending, limit)
+        for row in rows:
+            for column in FEED_STATS_SUM_COLUMNS:
+                value = row[column] or 0
+                row[column] = value if column.endswith("seconds") else int(value)
+            row["cost_seconds"] = row["fetch_seconds"] + row["llm_seconds"]
+            row["avg_fetch_seconds"] = row["fetch_seconds"] / row["fetches"] if row["fetches"] else None
+            row["new_ratio"] = row["new_entries"] / row["entries"] if row["entries"] else None
+            row["bytes_per_new_entry"] = row["bytes"] / row["new_entries"] if row["new_entries"] else None
+            row["avg_submit_delay_seconds"] = (row["submit_delay_seconds"] / row["submitted"]
+                                               if row["submitted"] else None)
+        return rows
+
+    def list_aliases(self, bangumi_id=None):
+        return self.db_manager.list_bangumi_aliases(bangumi_id)
+
+    def add_alias(self, alias, bangumi_id):
+        return self.db_manager.add_bangumi_alias(alias, bangumi_id)
+
+    def remove_alias(self, alias):
+        return self.db_manager.remove_bangumi_alias(alias)
+
+    def merge_bangumi(self, source_id, target_id):
+        return self.db_manager.merge_bangumi(source_id, target_id)
+
+    def duplicate_candidates(self, threshold=None) -> List[Dict]:
+        """
+        已被拆分为多个 bangumi_id 的疑似同一番剧：名称相似或属于同一 Mikan 番剧，
+        可确认后通过 merge_bangumi 合并
+        """
+        bangumi = {}
+        for row in self.db_manager.get_all_bangumi() or []:
+            if row["bangumi_id"]:
+                bangumi.setdefault(row["bangumi_id"], row)
+        index = nameIndex({}, self.db_manager.alias_similarity if threshold is None else threshold)
+        by_mikan = {}
+        candidates = []
+        for bangumi_id, row in sorted(bangumi.items(), key=lambda item: item[1]["id"]):
+            match = index.lookup(row["bangumi_name"])
+            reason, score = "similar_name", match[2] if match else None
+            mikan_id = mikan_ids(row["link"])[0]
+            if match is None and mikan_id in by_mikan:
+                match, reason, score = (by_mikan[mikan_id],), "mikan_id", None
+            if match is not None and match[0] != bangumi_id:
+                target = bangumi[match[0]]
+                candidates.append({"source_id": bangumi_id, "source_name": row["bangumi_name"],
+                                   "target_id": target["bangumi_id"], "target_name": target["bangumi_name"],
+                                   "reason": reason, "similarity": score})
+                continue
+            index.add(normalize_name(row["bangumi_name"]), bangumi_id)
+            if mikan_id:
+                by_mikan.setdefault(mikan_id, bangumi_id)
+        return candidates
+
+    def add_aggregate(self, rss_link):
+        self.db_manager.add_aggregate_feed(rss_link)
+
+    def list_aggregate(self):
+        return self.db_manager.get_aggregate_feeds()
 
+    def remove_aggregate(self, rss_link):
+        self.db_manager.remove_aggregate_feed(rss_link)
@@ -0,0 +1,135 @@
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+from module.metrics import TRACER, LOG_FORMAT, install_log_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGES = ("parser", "downloader")
+
+
+def run_worker(stages: Sequence[str] = DEFAULT_STAGES):
+    """
+    工作进程入口：在本进程内创建解析/下载阶段并由 workerRuntime 监督，
+    直到收到 SIGTERM/SIGINT。各进程通过数据库租约与 advisory lock 分摊任务。
+    """
+    from .parseManager import parseManager
+    from .parseScheduler import parseScheduler
+    from .downloadManager import downloadManager
+    from .downloadDispatcher import downloadDispatcher
+    from .workerRuntime import workerRuntime
+
+    install_log_context()
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    runtime_stages = {}
+    config = None
+    if "downloader" in stages:
+        download_manager = downloadManager()
+        config = download_manager.config
+        runtime_stages["downloader"] = downloadDispatcher.from_config(download_manager, config)
+    if "parser" in stages:
+        parse_manager = parseManager()
+        config = config or parse_manager.config
+        if "downloader" in runtime_stages:
+            parse_manager.on_cycle_done = runtime_stages["downloader"].wake
+        runtime_stages["parser"] = parseScheduler(parse_manager)
+    if not runtime_stages:
+        raise ValueError(f"No known stages in {list(stages)}")
+
+    config.start_watching(config.get("runtime.config_watch_interval", 2))
+    TRACER.bind_config(config)
+    runtime = workerRuntime.from_config(runtime_stages, config)
+    stopped = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stopped.set())
+    runtime.start(runtime_stages)
+    stopped.wait()
+    runtime.shutdown()
+
+
+class workerPool:
+    """
+    工作进程池（--workers N）
+    - 启动 N 个独立进程运行解析/下载阶段，突破单进程 GIL 的限制
+    - 进程意外退出时按指数退避重启
+    - 多个进程（或多个节点上的进程池）通过数据库租约共享同一流水线，不会重复下载
+    """
+
+    def __init__(self, workers: int, stages: Sequence[str] = DEFAULT_STAGES,
+                 restart_base: float = 5.0, restart_max: float = 300.0):
+        self.workers = max(0, int(workers))
+        self.stages = tuple(stages)
+        self.restart_base = float(restart_base)
+        self.restart_max = float(restart_max)
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * self.workers
+        self._restarts = [0] * self.workers
+        self._next_restart_at: List[Optional[float]] = [None] * self.workers
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _spawn(self, index: int):
+        process = self._context.Process(target=run_worker, args=(self.stages,),
+                                        name=f"hclo-worker-{index}", daemon=False)
+        process.start()
+        self._processes[index] = process
+        logger.info(f"Started worker process {process.name} (pid {process.pid})")
+
+    def start(self):
+        """启动所有工作进程与监督线程"""
+        for index in range(self.workers):
+            self._spawn(index)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._supervise, name="worker-pool", daemon=True)
+        self._thread.start()
+
+    def _supervise(self):
+        while not self._stop_event.wait(1.0):
+            now = time.time()
+            for index, process in enumerate(self._processes):
+                if process is None or process.is_alive():
+                    continue
+                if self._next_restart_at[index] is None:
+                    delay = min(self.restart_base * 2 ** self._restarts[index], self.restart_max)
+                    self._next_restart_at[index] = now + delay
+                    logger.error(f"Worker process {process.name} exited with code {process.exitcode}, "
+                                 f"restarting in {delay:.0f} seconds")
+                elif now >= self._next_restart_at[index]:
+                    self._restarts[index] += 1
+                    self._next_restart_at[index] = None
+                    self._spawn(index)
+
+    def stop(self, timeout: float = 30.0):
+        """通知所有工作进程退出并等待"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        deadline = time.time() + timeout
+        for process in self._processes:
+            if process is not None:
+                process.join(max(0.0, deadline - time.time()))
+                if process.is_alive():
+                    process.kill()
+        logger.info("Worker pool stopped.")
+
+    def join(self):
+        """阻塞直到收到 SIGTERM/SIGINT，然后停止所有工作进程"""
+        stopped = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stopped.set())
+        stopped.wait()
+        self.stop()
+
+    def status(self) -> List[Dict]:
+        return [{
+            "name": process.name if process else None,
+            "pid": process.pid if process else None,
+            "alive": bool(process and process.is_alive()),
+            "restarts": self._restarts[index],
+        } for index, process in enumerate(self._processes)]
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from .eventBus import pipeline_events
+
+logger = logging.getLogger(__name__)
+
+
+class workerRuntime:
+    """
+    后台工作运行时（随 FastAPI lifespan 启动与关闭）
+    - 统一管理解析、下载等阶段的启动、停止、暂停、恢复与立即触发
+    - 监督线程定期检查应处于运行状态的阶段，线程意外退出时按指数退避重启
+    - 汇总每个阶段的健康状态、最近一轮耗时与积压数量
+
+    每个阶段需提供 start / stop / pause / resume / wake / is_running / is_paused / status，
+    例如 parseScheduler 与 downloadDispatcher。
+    """
+
+    def __init__(self, stages: Dict[str, object], check_interval: float = 5.0,
+                 restart_base: float = 5.0, restart_max: float = 300.0, stable_seconds: float = 60.0):
+        """
+        Args:
+            stages: 阶段名称 -> 阶段
+            check_interval: 监督线程的检查间隔（秒）
+            restart_base: 首次重启前的等待时间（秒），之后每次翻倍
+            restart_max: 重启前的最长等待时间（秒）
+            stable_seconds: 重启后持续运行超过该时间视为恢复，重置退避
+        """
+        self.stages = dict(stages)
+        self.check_interval = float(check_interval)
+        self.restart_base = float(restart_base)
+        self.restart_max = float(restart_max)
+        self.stable_seconds = float(stable_seconds)
+
+        self._lock = threading.Lock()
+        # 用户期望处于运行状态的阶段，只有这些阶段会被自动重启
+        self._desired = set()
+        self._restarts = {name: 0 for name in self.stages}
+        self._next_restart_at: Dict[str, Optional[float]] = {name: None for name in self.stages}
+        self._started_at: Dict[str, Optional[float]] = {name: None for name in self.stages}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, stages: Dict[str, object], config):
+        """根据配置中的 runtime.* 创建运行时"""
+        return cls(stages,
+                   check_interval=config.get("runtime.check_interval", 5),
+                   restart_base=config.get("runtime.restart_backoff_base", 5),
+                   restart_max=config.get("runtime.restart_backoff_max", 300))
+
+    # ---------- 运行时 ----------
+
+    def start(self, autostart: Iterable[str] = ()):
+        """启动监督线程（已启动时跳过），并启动 autostart 中的阶段"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._supervise, name="worker-supervisor", daemon=True)
+            self._thread.start()
+            logger.info(f"Worker runtime started with stages: {', '.join(self.stages)}")
+        for name in autostart:
+            if name in self.stages:
+                self.start_stage(name)
+            else:
+                logger.warning(f"Unknown worker stage in autostart: {name}")
+
+    def shutdown(self, timeout: Optional[float] = 10.0):
+        """停止监督线程与所有阶段"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for name in self.stages:
+            self.stop_stage(name, timeout)
+        logger.info("Worker runtime stopped.")
+
+    # ---------- 阶段控制 ----------
+
+    def _stage(self, name: str):
+        if name not in self.stages:
+            raise KeyError(name)
+        return self.stages[name]
+
+    def start_stage(self, name: str) -> bool:
+        """启动阶段，已在运行时返回 False"""
+        stage = self._stage(name)
+        with self._lock:
+            self._desired.add(name)
+            self._restarts[name] = 0
+            self._next_restart_at[name] = None
+            started = stage.start()
+            if started:
+                self._started_at[name] = time.time()
+        if started:
+            pipeline_events.publish("stage", stage=name, state="started")
+        return started
+
+    def stop_stage(self, name: str, timeout: Optional[float] = None):
+        """停止阶段，停止后不会被自动重启"""
+        stage = self._stage(name)
+        with self._lock:
+            self._desired.discard(name)
+            self._next_restart_at[name] = None
+        stage.stop(timeout)
+        pipeline_events.publish("stage", stage=name, state="stopped")
+
+    def pause_stage(self, name: str):
+        self._stage(name).pause()
+        pipeline_events.publish("stage", stage=name, state="paused")
+
+    def resume_stage(self, name: str):
+        self._stage(name).resume()
+        pipeline_events.publish("stage", stage=name, state="resumed")
+
+    def trigger(self, name: str) -> bool:
+        """立即开始阶段的新一轮，阶段未运行时返回 False"""
+        stage = self._stage(name)
+        if not stage.is_running:
+            return False
+        stage.wake()
+        return True
+
+    def is_running(self, name: str) -> bool:
+        return self._stage(name).is_running
+
+    # ---------- 监督 ----------
+
+    def _supervise(self):
+        while not self._stop_event.wait(self.check_interval):
+            self.check()
+
+    def check(self):
+        """检查所有期望运行的阶段，必要时按退避重启"""
+        now = time.time()
+        with self._lock:
+            for name in list(self._desired):
+                stage = self.stages[name]
+                if stage.is_running:
+                    started_at = self._started_at[name]
+                    if self._restarts[name] and started_at and now - started_at >= self.stable_seconds:
+                        self._restarts[name] = 0
+                    continue
+                next_restart_at = self._next_restart_at[name]
+                if next_restart_at is None:
+                    delay = min(self.restart_base * 2 ** self._restarts[name], self.restart_max)
+                    self._next_restart_at[name] = now + delay
+                    logger.error(f"Worker stage {name} exited unexpectedly, restarting in {delay:.0f} seconds")
+                    pipeline_events.publish("stage", stage=name, state="crashed", restart_in=delay)
+                elif now >= next_restart_at:
+                    self._restarts[name] += 1
+                    self._next_restart_at[name] = None
+                    try:
+                        stage.start()
+                        self._started_at[name] = now
+                        logger.info(f"Worker stage {name} restarted (attempt {self._restarts[name]})")
+                        pipeline_events.publish("stage", stage=name, state="restarted",
+                                                attempt=self._restarts[name])
+                    except Exception as e:
+                        logger.error(f"Failed to restart worker stage {name}: {e}")
+
+    def _health(self, name: str, status: Dict) -> str:
+        if not status.get("running"):
+            return "crashed" if name in self._desired else "stopped"
+        if status.get("paused"):
+            return "paused"
+        if status.get("consecutive_failures"):
+            return "degraded"
+        return "healthy"
+
+    def status(self) -> Dict[str, Dict]:
+        """每个阶段的健康状态、重启次数与阶段自身的统计"""
+        result = {}
+        for name, stage in self.stages.items():
+            stage_status = stage.status()
+            with self._lock:
+                result[name] = {
+                    "health": self._health(name, stage_status),
+                    "desired": name in self._desired,
+                    "restarts": self._restarts[name],
+                    "next_restart_at": self._next_restart_at[name],
+                    "started_at": self._started_at[name],
+                    **stage_status,
+                }
+        return result
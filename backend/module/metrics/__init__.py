@@ -0,0 +1,22 @@
+from .registry import metricsRegistry, metricCounter, metricGauge, metricHistogram, instrument_methods
+from .tracing import tracer, TRACER, trace_methods, current_trace_id, install_log_context, LOG_FORMAT
+from .profiler import ProfilerBusyError, sample_stacks, format_collapsed, format_top, profile_process, \
+    format_pstats, dump_pstats
+from .pipeline import (
+    REGISTRY,
+    FEED_FETCH_SECONDS,
+    FEED_FETCH_BYTES,
+    FEED_ENTRIES,
+    ENTRIES_INGESTED,
+    PARSE_BACKLOG,
+    EPISODES_PARSED,
+    LLM_REQUEST_SECONDS,
+    LLM_INVALID_RESPONSES,
+    DB_QUERY_SECONDS,
+    QB_REQUEST_SECONDS,
+    TORRENTS_SUBMITTED,
+    DOWNLOAD_QUEUE_DEPTH,
+    DOWNLOAD_INFLIGHT,
+    CYCLE_SECONDS,
+    ONBOARDING_SECONDS,
+)
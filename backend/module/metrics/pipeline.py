@@ -0,0 +1,42 @@
+from .registry import metricsRegistry
+
+# 数据量分桶（字节）
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# 本进程的指标注册表，由 /metrics 接口导出
+REGISTRY = metricsRegistry()
+
+FEED_FETCH_SECONDS = REGISTRY.histogram(
+    "hclo_feed_fetch_seconds", "拉取并解析一个 RSS 源的耗时（秒）", ["outcome"])
+FEED_FETCH_BYTES = REGISTRY.histogram(
+    "hclo_feed_fetch_bytes", "RSS 响应大小（字节）", buckets=SIZE_BUCKETS)
+FEED_ENTRIES = REGISTRY.counter(
+    "hclo_feed_entries_total", "从 RSS 源读取到的条目数")
+ENTRIES_INGESTED = REGISTRY.counter(
+    "hclo_entries_ingested_total", "新写入数据库的剧集数")
+
+PARSE_BACKLOG = REGISTRY.gauge(
+    "hclo_parse_backlog", "待解析的剧集数")
+EPISODES_PARSED = REGISTRY.counter(
+    "hclo_episodes_parsed_total", "解析完成的剧集数")
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "hclo_llm_request_seconds", "LLM 调用耗时（秒）", ["call", "outcome"])
+LLM_INVALID_RESPONSES = REGISTRY.counter(
+    "hclo_llm_invalid_responses_total", "无法解析为 JSON 的 LLM 响应数")
+
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "hclo_db_query_seconds", "RSSDatabaseManager 各方法耗时（秒）", ["method"])
+
+QB_REQUEST_SECONDS = REGISTRY.histogram(
+    "hclo_qbittorrent_request_seconds", "qBittorrent API 调用耗时（秒）", ["operation", "outcome"])
+TORRENTS_SUBMITTED = REGISTRY.counter(
+    "hclo_torrents_submitted_total", "提交到 qBittorrent 的种子数", ["result"])
+DOWNLOAD_QUEUE_DEPTH = REGISTRY.gauge(
+    "hclo_download_queue_depth", "下载队列中待提交的剧集数")
+DOWNLOAD_INFLIGHT = REGISTRY.gauge(
+    "hclo_download_inflight", "已交给提交线程、尚未完成的剧集数")
+
+CYCLE_SECONDS = REGISTRY.histogram(
+    "hclo_cycle_seconds", "解析、下载调度每轮耗时（秒）", ["stage"])
+ONBOARDING_SECONDS = REGISTRY.histogram(
+    "hclo_onboarding_seconds", "新订阅从添加到完成各阶段的耗时（秒）", ["stage"])
@@ -0,0 +1,125 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# 同一时间只允许一个采样或 cProfile 捕获
+_capture_lock = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """已有正在进行的性能分析"""
+
+
+def _short_path(filename: str) -> str:
+    """源文件路径只保留包内相对部分，便于阅读火焰图"""
+    for marker in (f"{os.sep}site-packages{os.sep}", f"{os.sep}module{os.sep}"):
+        index = filename.rfind(marker)
+        if index >= 0:
+            return filename[index + 1:]
+    return os.path.basename(filename)
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, thread_prefix: Optional[str] = None) -> Counter:
+    """
+    在 seconds 秒内按 interval 间隔采样本进程其他线程的调用栈（墙钟时间，包括等待中的线程）
+
+    Args:
+        thread_prefix: 只采样名称以此开头的线程，如 parse-scheduler、download-
+
+    Returns:
+        Counter: 折叠栈（线程名;外层函数;...;内层函数） -> 样本数
+    """
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusyError("another profile capture is running")
+    try:
+        own = threading.get_ident()
+        samples: Counter = Counter()
+        labels: Dict = {}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, f"thread-{ident}")
+                if ident == own or (thread_prefix and not name.startswith(thread_prefix)):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(name)
+                samples[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+        return samples
+    finally:
+        _capture_lock.release()
+
+
+def format_collapsed(samples: Counter) -> str:
+    """折叠栈格式（每行 `栈 样本数`），可直接交给 flamegraph.pl / speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+def format_top(samples: Counter, limit: int = 50) -> str:
+    """按函数汇总的自身 / 累计样本数，类似 pstats 的文本报告"""
+    total = sum(samples.values()) or 1
+    own: Counter = Counter()
+    cumulative: Counter = Counter()
+    for stack, count in samples.items():
+        frames = stack.split(";")[1:]
+        if not frames:
+            continue
+        own[frames[-1]] += count
+        for frame in set(frames):
+            cumulative[frame] += count
+    lines = [f"{sum(samples.values())} samples\n\n", f"{'self%':>7} {'cum%':>7} {'self':>7} {'cum':>7}  function\n"]
+    for frame, count in cumulative.most_common(limit):
+        lines.append(f"{own[frame] * 100 / total:7.2f} {count * 100 / total:7.2f} {own[frame]:7d} {count:7d}  {frame}\n")
+    return "".join(lines)
+
+
+def profile_process(seconds: float) -> pstats.Stats:
+    """
+    在 seconds 秒内对整个进程运行 cProfile（确定性分析，开销较大）
+    Python 3.12 起 cProfile 基于 sys.monitoring，可捕获所有线程；更早的版本只能捕获调用线程
+    """
+    if sys.version_info < (3, 12):
+        raise NotImplementedError("cProfile capture of other threads requires Python 3.12+, use sampling instead")
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusyError("another profile capture is running")
+    try:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # 其他分析工具已占用 sys.monitoring
+            raise ProfilerBusyError(str(e))
+        try:
+            time.sleep(seconds)
+        finally:
+            profiler.disable()
+        return pstats.Stats(profiler)
+    finally:
+        _capture_lock.release()
+
+
+def format_pstats(stats: pstats.Stats, sort: str = "cumulative", limit: int = 50) -> str:
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def dump_pstats(stats: pstats.Stats) -> bytes:
+    """与 pstats.Stats.dump_stats 相同的二进制格式，可用 pstats / snakeviz 打开"""
+    return marshal.dumps(stats.stats)
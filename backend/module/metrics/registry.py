@@ -0,0 +1,226 @@
+import bisect
+import functools
+import inspect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 默认耗时分桶（秒），覆盖数据库查询到 LLM 调用的范围
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self._samples())
+
+
+class metricCounter(_metric):
+    """只增不减的计数器"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        # 无标签的计数器从 0 开始导出
+        self._values: Dict[Tuple, float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class metricGauge(_metric):
+    """可增可减的瞬时值，也可在采集时由函数计算"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float]):
+        """采集时调用 function 取值（仅用于无标签的指标）"""
+        self._function = function
+
+    def value(self, **labels) -> Optional[float]:
+        return self._values.get(self._key(labels))
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                yield f"{self.name} {_format_value(self._function())}"
+            except Exception:
+                pass
+            return
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class metricHistogram(_metric):
+    """
+    分桶直方图：observe 只做一次二分查找与两次加法，
+    累积计数在采集时计算，可常驻在热点路径中
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各分桶计数..., +Inf 计数], 总和
+        self._values: Dict[Tuple, Tuple[List[int], List[float]]] = {}
+        if not self.labelnames:
+            self._values[()] = ([0] * (len(self.buckets) + 1), [0.0])
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """记录代码块耗时"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def counts(self) -> Dict[Tuple, int]:
+        """每组标签值的观测次数"""
+        with self._lock:
+            return {key: sum(counts) for key, (counts, _) in self._values.items()}
+
+    def _samples(self):
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class metricsRegistry:
+    """指标注册表，按 Prometheus 文本格式导出"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, _metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicated metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> metricCounter:
+        return self._register(metricCounter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> metricGauge:
+        return self._register(metricGauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> metricHistogram:
+        return self._register(metricHistogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+def instrument_methods(histogram: metricHistogram, label: str = "method", exclude: Iterable[str] = ()):
+    """
+    类装饰器：记录类中每个公开方法的耗时（标签为方法名）
+    不包装属性、类方法与 exclude 中的方法
+    """
+    exclude = set(exclude)
+
+    def wrap(name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start_time, **{label: name})
+        return wrapper
+
+    def decorate(cls):
+        for name, attr in list(vars(cls).items()):
+            if name.startswith("_") or name in exclude or not inspect.isfunction(attr):
+                continue
+            setattr(cls, name, wrap(name, attr))
+        return cls
+    return decorate
@@ -0,0 +1,186 @@
+import functools
+import inspect
+import logging
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 日志格式：在默认格式中加入当前追踪 ID（无追踪时为空）
+LOG_FORMAT = "%(levelname)s:%(name)s:%(trace)s%(message)s"
+
+# 未被采样的根 span，其中的子 span 不再记录
+_UNSAMPLED = object()
+_current: ContextVar = ContextVar("trace_span", default=None)
+
+
+class _activeSpan:
+    __slots__ = ("trace", "record", "started")
+
+    def __init__(self, trace: Dict, record: Dict, started: float):
+        self.trace = trace
+        self.record = record
+        self.started = started
+
+
+def current_trace_id() -> Optional[str]:
+    """当前上下文中被采样追踪的 ID"""
+    active = _current.get()
+    if active is None or active is _UNSAMPLED:
+        return None
+    return active.trace["trace_id"]
+
+
+class tracer:
+    """
+    轻量级追踪
+    - 根 span（如拉取一个订阅、解析一集、提交一批种子）按采样比例决定是否记录，
+      子 span 随根 span 记录，未被采样时几乎没有开销
+    - 追踪 ID 通过 contextvars 传递，并加入该追踪期间输出的所有日志
+    - 保留最近的若干条完整追踪供 API 查询
+    """
+
+    def __init__(self, sample_rate: float = 0.0, history: int = 200, max_spans: int = 500):
+        """
+        Args:
+            sample_rate: 根 span 的采样比例（0~1）
+            history: 保留的最近追踪数量
+            max_spans: 单条追踪最多记录的 span 数，超出部分只计数
+        """
+        self.sample_rate = float(sample_rate)
+        self.max_spans = int(max_spans)
+        self._recent = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def bind_config(self, config):
+        """应用配置中的 tracing.*，并在其变更后自动更新"""
+        self.apply_config(config)
+        config.subscribe(self.apply_config, prefixes=("tracing",))
+
+    def apply_config(self, config, changed=()):
+        """配置订阅回调：更新采样比例与保留数量"""
+        self.sample_rate = float(config.get("tracing.sample_rate", 0) or 0)
+        self.max_spans = int(config.get("tracing.max_spans", 500))
+        history = int(config.get("tracing.history", 200))
+        if history != self._recent.maxlen:
+            with self._lock:
+                self._recent = deque(self._recent, maxlen=history)
+
+    @contextmanager
+    def span(self, name: str, root: bool = True, **attrs):
+        """
+        记录一个 span，可通过返回的字典补充属性（record["attrs"][key] = value）
+
+        Args:
+            root: 没有上层追踪时是否按采样比例开启新追踪；为 False 时只在已采样的追踪中记录
+        """
+        parent = _current.get()
+        if parent is _UNSAMPLED or (parent is None and not root):
+            yield None
+            return
+        if parent is None:
+            if not (self.sample_rate > 0 and random.random() < self.sample_rate):
+                token = _current.set(_UNSAMPLED)
+                try:
+                    yield None
+                finally:
+                    _current.reset(token)
+                return
+            trace = {"trace_id": secrets.token_hex(8), "name": name, "started_at": time.time(),
+                     "duration_ms": None, "spans": [], "dropped_spans": 0, "error": None}
+            trace_started = time.perf_counter()
+        else:
+            trace = parent.trace
+            trace_started = parent.started
+
+        started = time.perf_counter()
+        record = {"span_id": secrets.token_hex(4), "parent_id": parent.record["span_id"] if parent else None,
+                  "name": name, "start_ms": (started - trace_started) * 1000, "duration_ms": None,
+                  "attrs": attrs, "error": None}
+        token = _current.set(_activeSpan(trace, record, trace_started))
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["duration_ms"] = (time.perf_counter() - started) * 1000
+            if len(trace["spans"]) < self.max_spans:
+                trace["spans"].append(record)
+            else:
+                trace["dropped_spans"] += 1
+            logger.debug(f"span {name} took {record['duration_ms']:.1f} ms")
+            if parent is None:
+                trace["duration_ms"] = record["duration_ms"]
+                trace["error"] = record["error"]
+                # 根 span 最后结束，按开始时间排列
+                trace["spans"].sort(key=lambda span: span["start_ms"])
+                with self._lock:
+                    self._recent.append(trace)
+                logger.info(f"trace {name} took {trace['duration_ms']:.1f} ms with {len(trace['spans'])} spans")
+            _current.reset(token)
+
+    def recent(self, limit: int = 50, name: Optional[str] = None) -> List[Dict]:
+        """最近完成的追踪（不含 span 明细），最新的在前"""
+        with self._lock:
+            traces = list(self._recent)
+        traces = [t for t in reversed(traces) if name is None or t["name"] == name][:limit]
+        return [{k: v for k, v in t.items() if k != "spans"} | {"span_count": len(t["spans"])} for t in traces]
+
+    def get(self, trace_id: str) -> Optional[Dict]:
+        """完整的追踪（含 span 明细）"""
+        with self._lock:
+            return next((t for t in self._recent if t["trace_id"] == trace_id), None)
+
+
+def trace_methods(target: "tracer", prefix: str, exclude: Iterable[str] = ()):
+    """
+    类装饰器：公开方法在已采样的追踪中记录为子 span（名称为 prefix.方法名），不会开启新追踪
+    """
+    exclude = set(exclude)
+
+    def wrap(name, func):
+        span_name = f"{prefix}.{name}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            active = _current.get()
+            if active is None or active is _UNSAMPLED:
+                return func(*args, **kwargs)
+            with target.span(span_name, root=False):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def decorate(cls):
+        for name, member in list(vars(cls).items()):
+            if name.startswith("_") or name in exclude or not inspect.isfunction(member):
+                continue
+            setattr(cls, name, wrap(name, member))
+        return cls
+    return decorate
+
+
+def install_log_context():
+    """为所有日志记录加入 trace 字段（`[trace <ID>] ` 或空），配合 LOG_FORMAT 使用"""
+    factory = logging.getLogRecordFactory()
+    if getattr(factory, "_with_trace", False):
+        return
+
+    def record_factory(*args, **kwargs):
+        record = factory(*args, **kwargs)
+        trace_id = current_trace_id()
+        record.trace = f"[trace {trace_id}] " if trace_id else ""
+        return record
+
+    record_factory._with_trace = True
+    logging.setLogRecordFactory(record_factory)
+
+
+# 本进程的追踪器
+TRACER = tracer()
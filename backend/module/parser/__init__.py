@@ -1 +1,2 @@
-from .openai import openaiParser
\ No newline at end of file
+from .openai import openaiParser
+from .nameIndex import nameIndex, normalize_name, trigram_similarity
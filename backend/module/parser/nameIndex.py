@@ -0,0 +1,164 @@
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# 常见繁体字 / 日文新字体到简体字的折叠表（仅用于生成比较用的键，不用于显示）
+_FOLD_PAIRS = (
+    "與与 專专 業业 東东 絲丝 兩两 嚴严 個个 豐丰 臨临 為为 麗丽 舉举 義义 烏乌 樂乐 楽乐 喬乔 "
+    "習习 鄉乡 書书 買买 亂乱 爭争 於于 雲云 亞亚 產产 親亲 億亿 僅仅 從从 儀仪 們们 價价 眾众 "
+    "優优 會会 偉伟 傳传 伝传 傷伤 倫伦 體体 餘余 來来 俠侠 係系 債债 傾倾 僕仆 兒儿 黨党 蘭兰 "
+    "關关 関关 興兴 養养 獸兽 獣兽 內内 岡冈 冊册 寫写 軍军 農农 決决 況况 凍冻 淨净 準准 幾几 "
+    "鳳凤 憑凭 凱凯 擊击 劃划 劉刘 則则 剛刚 創创 別别 劍剑 剣剑 劇剧 勸劝 辦办 務务 動动 勵励 "
+    "勞劳 勢势 勳勋 區区 醫医 華华 協协 單单 賣卖 衛卫 卻却 廠厂 廳厅 歷历 厲厉 壓压 縣县 參参 "
+    "雙双 發发 発发 髮发 變变 変变 敘叙 葉叶 號号 後后 嗎吗 啟启 吳吴 員员 聽听 鳴鸣 響响 問问 "
+    "團团 園园 圍围 圖图 図图 圓圆 聖圣 場场 壞坏 塊块 堅坚 壇坛 牆墙 壯壮 聲声 處处 備备 復复 "
+    "夠够 頭头 奪夺 獎奖 奮奋 婦妇 媽妈 嬌娇 孫孙 學学 寧宁 寶宝 實实 寵宠 審审 宮宫 將将 爾尔 "
+    "塵尘 屍尸 層层 屬属 歲岁 歳岁 島岛 嶺岭 帥帅 師师 帶带 帯带 幫帮 幹干 廣广 広广 莊庄 慶庆 "
+    "應应 廟庙 開开 異异 張张 彈弹 強强 歸归 帰归 當当 録录 錄录 徹彻 徑径 憶忆 懷怀 態态 戀恋 "
+    "惡恶 悪恶 驚惊 慘惨 願愿 戰战 戦战 戲戏 戯戏 戶户 執执 擴扩 拡扩 掃扫 揚扬 擾扰 搶抢 護护 "
+    "報报 擔担 擁拥 擇择 掛挂 揮挥 損损 換换 據据 數数 斷断 時时 顯显 晉晋 曉晓 暫暂 術术 機机 "
+    "殺杀 権权 權权 條条 楊杨 極极 構构 槍枪 樣样 様样 檢检 歡欢 歐欧 殘残 氣气 気气 漢汉 湯汤 "
+    "沒没 澤泽 沢泽 潔洁 灑洒 淚泪 測测 濟济 渾浑 濃浓 濤涛 塗涂 湧涌 漲涨 淵渊 漸渐 溫温 灣湾 "
+    "滅灭 燈灯 靈灵 霊灵 災灾 爐炉 點点 煉炼 爛烂 熱热 燒烧 焼烧 愛爱 爺爷 牽牵 狀状 猶犹 獨独 "
+    "獄狱 獵猎 貓猫 獻献 環环 現现 瑪玛 電电 畫画 暢畅 療疗 瘋疯 盡尽 監监 盤盘 確确 禮礼 禍祸 "
+    "離离 種种 積积 稱称 窮穷 競竞 筆笔 築筑 簡简 糧粮 緊紧 紅红 約约 級级 紀纪 純纯 紙纸 納纳 "
+    "線线 練练 組组 細细 織织 終终 結结 絕绝 絶绝 給给 統统 經经 経经 綠绿 緑绿 維维 網网 緣缘 "
+    "縁缘 編编 總总 総总 績绩 繩绳 繪绘 絵绘 續续 続续 罰罚 羅罗 聯联 聰聪 腦脑 脳脑 腳脚 膽胆 "
+    "臉脸 艦舰 藝艺 芸艺 節节 蘇苏 薦荐 萬万 藥药 薬药 蓋盖 蟲虫 蝦虾 補补 裝装 裡里 裏里 見见 "
+    "規规 視视 覺觉 覚觉 覽览 觀观 観观 計计 記记 訊讯 討讨 訓训 議议 許许 論论 設设 訪访 證证 "
+    "証证 評评 詞词 試试 詩诗 話话 誕诞 認认 語语 說说 説说 誰谁 課课 調调 談谈 請请 諾诺 謀谋 "
+    "謎谜 講讲 謝谢 識识 譯译 訳译 讀读 読读 讓让 譲让 豬猪 貝贝 負负 財财 貨货 質质 貴贵 費费 "
+    "賀贺 資资 賊贼 賓宾 賞赏 賭赌 賴赖 贈赠 贏赢 趕赶 趙赵 躍跃 車车 軌轨 輕轻 軽轻 載载 輝辉 "
+    "輪轮 輸输 轉转 転转 邊边 辺边 達达 遷迁 過过 運运 還还 這这 進进 遠远 連连 遲迟 適适 選选 "
+    "遺遗 郵邮 鄰邻 隣邻 醜丑 釋释 釈释 針针 釣钓 鈴铃 鐵铁 鉄铁 銀银 銃铳 鋼钢 錢钱 錯错 鍊炼 "
+    "鍵键 鏡镜 鐘钟 長长 門门 閃闪 閉闭 間间 閱阅 隊队 陽阳 陰阴 陣阵 際际 陸陆 險险 険险 隨随 "
+    "隱隐 難难 雞鸡 霧雾 靜静 韓韩 頁页 頂顶 項项 順顺 須须 預预 領领 題题 顏颜 類类 顧顾 風风 "
+    "飛飞 飯饭 飲饮 館馆 馬马 駕驾 騎骑 驗验 験验 鬥斗 闘斗 鬧闹 魚鱼 鮮鲜 鳥鸟 鶴鹤 麥麦 黃黄 "
+    "黒黑 齊齐 齒齿 龍龙 竜龙 龜龟 亀龟 櫻樱 桜樱 姫姬 騒骚 騷骚 圧压 拝拜 拠据 挿插 渋涩 畳叠 "
+    "穏稳 縄绳 蔵藏 覧览 譽誉 鎮镇 黙默 齢龄 蓮莲 無无 職职 諜谍 傑杰 偵侦 貞贞 魯鲁 導导 讚赞 "
+    "頑顽 碩硕 騰腾 蘿萝 韻韵 鐮镰 鎌镰 倉仓 殲歼 滿满 満满 紳绅 絆绊 縛缚 緋绯 綾绫 巔巅 鋒锋 "
+    "銳锐 鋭锐 錦锦 鍋锅 閣阁 閻阎 隕陨 雖虽 雜杂 雑杂 韋韦 頌颂 頓顿 頰颊 頬颊 顛颠 颯飒 餅饼 "
+    "騙骗 驅驱 駆驱 鬆松 鯨鲸 鷹鹰 麼么 麵面 麺面 齋斋 斎斋 龐庞 侶侣 傭佣 儲储 兇凶 剎刹 勝胜 "
+    "匯汇 囑嘱 夢梦 奧奥 妝妆 娛娱 嬰婴 尋寻 屆届 巖岩 幣币 廢废 廃废 彌弥 憂忧 懸悬 懼惧 拋抛 "
+    "掙挣 擺摆 攜携 敵敌 斬斩 曆历 暦历 朧胧 棄弃 樓楼 歎叹 殤殇 毀毁 沖冲 淺浅 漁渔 潛潜 煙烟 "
+    "猙狰 獰狞 畢毕 疊叠 盜盗 禪禅 禦御 穎颖 簽签 籃篮 籠笼 糾纠 紋纹 紛纷 絡络 綱纲 綺绮 綻绽 "
+    "緒绪 締缔 縫缝 縮缩 繞绕 纖纤 繊纤 罵骂 聞闻 脅胁 脇胁 脫脱 膚肤 萊莱 蒼苍 蔥葱 蕭萧 薩萨 "
+    "藍蓝 蘆芦 虛虚 蠍蝎 衝冲 複复 襲袭 覓觅 詠咏 詢询 誘诱 諸诸 謊谎 謠谣 謡谣 譜谱 豔艳 貪贪 "
+    "販贩 賢贤 購购 贖赎 跡迹 蹟迹 蹤踪 軀躯 轟轰 辭辞 違违 遙遥 邏逻 鄭郑 醬酱 醤酱 釀酿 鍛锻 "
+    "鎖锁 鎧铠 鏈链 鑰钥 闖闯 陳陈 頹颓 顫颤 飄飘 餓饿 飼饲 駐驻 驕骄 髒脏 鬍胡 鬱郁 魘魇 鯊鲨 "
+    "鴉鸦 鵬鹏 鷲鹫 黴霉 訂订 誌志 獅狮 憐怜 慾欲 撃击 斉齐 殻壳 浄净 渉涉 滝泷 猟猎 獲获 瓊琼 "
+    "窓窗 粋粹 絹绢 聴听 臓脏 舗铺 薫熏 衆众 訣诀 誇夸 諦谛 豊丰 賛赞 輩辈 轄辖 遅迟 郷乡 醸酿 "
+    "釘钉 鈍钝 鉱矿 銭钱 錬炼 鍾钟 陥陷 隠隐 顔颜 顕显 餌饵 駒驹 髄髓 鬪斗 鶏鸡 剰剩 勧劝 単单 "
+    "厳严 収收 呉吴 営营 囲围 圏圈 塁垒 塩盐 壊坏 壌壤 奨奖 嬢娘 実实 寛宽 対对 専专 巣巢 庁厅 "
+    "弐贰 弾弹 従从 徳德 恵惠 悩恼 懐怀 戻戾 払拂 抜拔 択择 挙举 捜搜 掲揭 摂摄 擬拟 晩晚 暁晓 "
+    "栄荣 検检 歩步 歴历 毎每 涙泪 渇渴 渓溪 焔焰 犠牺 痩瘦 砕碎 稲稻 穂穗 粛肃 継继 縦纵 繋系 "
+    "聡聪 虜虏 蛍萤 覇霸 賎贱 逓递 酔醉 鋳铸 隷隶 靭韧 頼赖 鯉鲤 鶯莺 鷗鸥 鸎莺 乗乘 仏佛 仮假 "
+    "価价 倹俭 偽伪 傘伞 剤剂 労劳 効效 勅敕 巻卷 勲勋 壱壹 弁辩 弍贰 捨舍 撲扑 曽曾 疎疏 県县 "
+    "荘庄 蝋蜡 謹谨 鉛铅 銘铭 頻频 髪发"
+)
+_FOLD_TABLE = str.maketrans({pair[0]: pair[1] for pair in _FOLD_PAIRS.split() if pair[0] != pair[1]})
+_NON_WORD_PATTERN = re.compile(r'[\W_]+')
+# 季数、部数等标识：数字不同的名称即使很相似也不合并（如第一季与第二季）
+_NUMBER_PATTERN = re.compile(r'\d+|[一二三四五六七八九十]+(?=[季期部章篇])')
+_CHINESE_NUMBERS = {c: str(i) for i, c in enumerate("一二三四五六七八九十", start=1)}
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """
+    番剧名称的比较键：全半角与大小写折叠、繁简折叠，去除标点与空白
+
+    例如 `SPY×FAMILY`、`Spy Family` -> `spyfamily`；`葬送的芙莉蓮` -> `葬送的芙莉莲`
+    """
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKC", name).casefold().translate(_FOLD_TABLE)
+    return _NON_WORD_PATTERN.sub("", text)
+
+
+def name_numbers(key: str) -> Tuple[str, ...]:
+    """比较键中的季数、部数等数字（中文数字转换为阿拉伯数字）"""
+    numbers = []
+    for number in _NUMBER_PATTERN.findall(key):
+        if number.isdigit():
+            numbers.append(str(int(number)))
+        else:
+            numbers.append(_CHINESE_NUMBERS.get(number, number))
+    return tuple(numbers)
+
+
+def name_trigrams(key: str) -> Set[str]:
+    """比较键的三元组集合（与 pg_trgm 相同，首尾补空格）"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    """两个比较键的三元组相似度（Jaccard，0~1）"""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    left, right = name_trigrams(a), name_trigrams(b)
+    return len(left & right) / len(left | right)
+
+
+class nameIndex:
+    """
+    番剧名称规范化索引：名称 -> 已有的 bangumi_id
+    先按比较键精确匹配（含别名），再按三元组相似度查找最接近的已有名称；
+    季数等数字不同、或一方包含另一方（如 `进击的巨人` 与 `进击的巨人 最终季`）的名称不会被合并
+    """
+
+    def __init__(self, aliases: Dict[str, str], threshold: float = 0.6):
+        """
+        Args:
+            aliases: 比较键 -> bangumi_id
+            threshold: 相似度匹配的最低阈值，大于等于 1 时只做精确匹配
+        """
+        self.threshold = threshold
+        self.aliases: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        for key, bangumi_id in aliases.items():
+            self.add(key, bangumi_id)
+
+    def add(self, key: str, bangumi_id: str):
+        """记录比较键（已有的不覆盖）"""
+        if not key or key in self.aliases:
+            return
+        self.aliases[key] = bangumi_id
+        for trigram in name_trigrams(key):
+            self._postings[trigram].add(key)
+
+    def lookup(self, name: str) -> Optional[Tuple[str, str, float]]:
+        """
+        查找名称对应的已有番剧
+
+        Returns:
+            tuple: (bangumi_id, 匹配到的比较键, 相似度)，未找到时返回 None
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self.aliases:
+            return self.aliases[key], key, 1.0
+        if self.threshold >= 1:
+            return None
+        # 只与至少共享一个三元组的键比较
+        candidates = set()
+        for trigram in name_trigrams(key):
+            candidates |= self._postings.get(trigram, set())
+        numbers = name_numbers(key)
+        best = None
+        for candidate in candidates:
+            if name_numbers(candidate) != numbers or key in candidate or candidate in key:
+                continue
+            score = trigram_similarity(key, candidate)
+            if score >= self.threshold and (best is None or (score, candidate) > (best[2], best[1])):
+                best = (self.aliases[candidate], candidate, score)
+        return best
+
+    def keys_of(self, bangumi_ids: Iterable[str]) -> Dict[str, str]:
+        """指定番剧的全部比较键 -> bangumi_id"""
+        bangumi_ids = set(bangumi_ids)
+        return {key: bangumi_id for key, bangumi_id in self.aliases.items() if bangumi_id in bangumi_ids}
@@ -1,5 +1,6 @@
 from openai import OpenAI
-import json, logging
+import json, logging, time
+from module.metrics import LLM_REQUEST_SECONDS, LLM_INVALID_RESPONSES, TRACER
 
 parseInfoSystemPrompt = """
 你是一位元数据提取专家，仅根据文件名提取结构化信息，输出标准 JSON, **禁止推测、补全或使用外部知识**。
@@ -56,28 +57,52 @@ class openaiParser():
         self.logger = logging.getLogger(__name__)
         self.logger.debug(f"using openai api with url:{url}, api key:{api_key}")
         
-    def _getResponse(self, prompt: str, systemPrompt: str=""):
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": systemPrompt},
-                    {"role": "user", "content": prompt},
-                ],
-                stream=False
-            )
-            return response.choices[0].message.content
-        except:
-            self.logger.error(f"cannot use AI parser, check your AI parser settings")
-            return None
+    @classmethod
+    def from_config(cls, config):
+        """根据配置中的 openai.* 创建解析器（不会发起网络请求），openai.* 变更后自动重建客户端"""
+        parser = cls(config.get("openai.base_url"),
+                     config.get("openai.model_name"),
+                     config.get("openai.api_key"))
+        config.subscribe(parser.apply_config, prefixes=("openai",))
+        return parser
+
+    def apply_config(self, config, changed=()):
+        """配置订阅回调：重建 OpenAI 客户端"""
+        self.client = OpenAI(api_key=config.get("openai.api_key"),
+                             base_url=config.get("openai.base_url"))
+        self.model = config.get("openai.model_name")
+        self.logger.info("OpenAI settings changed, client rebuilt.")
+
+    def _getResponse(self, prompt: str, systemPrompt: str="", call: str="unknown"):
+        with TRACER.span("llm_request", root=False, call=call):
+            start_time = time.perf_counter()
+            outcome = "error"
+            try:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": systemPrompt},
+                        {"role": "user", "content": prompt},
+                    ],
+                    stream=False
+                )
+                content = response.choices[0].message.content
+                outcome = "ok" if content else "empty"
+                return content
+            except:
+                self.logger.error(f"cannot use AI parser, check your AI parser settings")
+                return None
+            finally:
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - start_time, call=call, outcome=outcome)
     
     def parseFile(self, bangumiName: str):
-        response = self._getResponse(bangumiName, parseInfoSystemPrompt)
+        response = self._getResponse(bangumiName, parseInfoSystemPrompt, "parse_file")
         try:
             return json.loads(response) if response else self.logger.error("no responce from openai")
         except:
+            LLM_INVALID_RESPONSES.inc()
             self.logger.error(f"AI parser recieved unstructured data:{response}")
     
     def parseName(self, bangumiName: str):
-        response = self._getResponse(bangumiName, parseNameSystemPrompt)
+        response = self._getResponse(bangumiName, parseNameSystemPrompt, "parse_name")
         return response
@@ -1 +1,5 @@
-from .rssParser import torrentRSSParser
\ No newline at end of file
+from .rssParser import torrentRSSParser, FeedFetchError
+from .feedRouter import feedRouter, entry_route_keys, subscription_route_keys, subscription_link, is_aggregate_only, \
+    mikan_ids
+
+from .opml import parse_opml, normalize_feed_link, is_aggregate_feed
@@ -0,0 +1,155 @@
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, urlparse
+
+# Mikan 番剧 ID / 字幕组 ID：出现在订阅链接查询参数或番剧页面路径中
+MIKAN_QUERY_PATTERN = re.compile(r'bangumiId=(\d+)(?:&(?:amp;)?subgroupid=(\d+))?', re.IGNORECASE)
+MIKAN_PAGE_PATTERN = re.compile(r'/Home/Bangumi/(\d+)(?:#(\d+))?', re.IGNORECASE)
+BRACKET_PATTERN = re.compile(r'[\[【]([^\]】]*)[\]】]')
+STAR_PATTERN = re.compile(r'★[^★]*★')
+# 集数、季数等标识，之后的内容不属于标题
+EPISODE_PATTERN = re.compile(r'\s[-–—]\s*\d|\s/\s|第\s*[\d一二三四五六七八九十]+\s*[话話集季期]|\s\d{1,3}(?:v\d)?(?:\s|$)|\sS\d{1,2}E?\d*\b|\sEP?\d', re.IGNORECASE)
+# 括号内常见的非标题标签
+TAG_PATTERN = re.compile(
+    r'^(?:\d{1,4}(?:v\d)?|\d{3,4}[pP]|[0-9xX×]{7,9}|.*新番.*|.*(?:简|繁|日|中|双语|字幕|内封|内嵌|外挂).*|'
+    r'web[-_ ]?(?:dl|rip)?|bd(?:rip)?|tv|hevc|avc|x26[45]|aac|flac|mp4|mkv|chs|cht|gb|big5|baha|b-global|cr|'
+    r'ani-one|\d+[-~]\d+.*|.*(?:合集|完结|全集).*)$',
+    re.IGNORECASE
+)
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]+')
+
+
+def mikan_ids(text: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """从链接或文本中提取 Mikan 的 (bangumiId, subgroupid)"""
+    if not text:
+        return None, None
+    match = MIKAN_QUERY_PATTERN.search(text) or MIKAN_PAGE_PATTERN.search(text)
+    if not match:
+        return None, None
+    return match.group(1), match.group(2)
+
+
+def mikan_route_keys(bangumi_id: Optional[str], subgroup_id: Optional[str]) -> List[str]:
+    """Mikan ID 对应的路由键，越精确越靠前"""
+    if not bangumi_id:
+        return []
+    keys = [f"mikan:{bangumi_id}"]
+    if subgroup_id:
+        keys.insert(0, f"mikan:{bangumi_id}:{subgroup_id}")
+    return keys
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = PUNCTUATION_PATTERN.sub(" ", text).replace("_", " ")
+    return " ".join(text.split())
+
+
+def split_release_title(title: str) -> Tuple[str, str]:
+    """
+    将发布标题拆分为 (字幕组, 番剧标题)，均已归一化
+
+    例如 `[Lilith-Raws] Sousou no Frieren - 05 [1080p]` -> (`lilith raws`, `sousou no frieren`)
+    """
+    title = (title or "").strip()
+    segments = BRACKET_PATTERN.findall(title)
+    group = ""
+    if segments and title[:1] in "[【":
+        group = segments.pop(0)
+
+    # 优先使用括号外的文本
+    rest = STAR_PATTERN.sub(" ", BRACKET_PATTERN.sub(" ", title))
+    match = EPISODE_PATTERN.search(" " + rest)
+    if match:
+        rest = (" " + rest)[:match.start()]
+    name = _normalize(rest)
+    if not re.search(r'[^\W\d_]', name):
+        # 标题位于括号内，例如 `【喵萌奶茶屋】★10月新番★[葬送的芙莉莲 / Sousou no Frieren][05][1080p]`
+        name = next((_normalize(s.split(" / ")[0]) for s in segments
+                     if s.strip() and not TAG_PATTERN.match(s.strip())), "")
+    return _normalize(group), name
+
+
+def title_route_keys(title: str) -> List[str]:
+    """发布标题对应的路由键：字幕组 + 标题，以及仅标题"""
+    group, name = split_release_title(title)
+    if not name:
+        return []
+    return [f"title:{group}|{name}", f"title:|{name}"]
+
+
+def entry_route_keys(torrent: Dict) -> List[str]:
+    """聚合 RSS 条目的路由键，越精确越靠前"""
+    keys = []
+    for text in (torrent.get("page_link"), torrent.get("torrent_link")):
+        keys.extend(mikan_route_keys(*mikan_ids(text)))
+    keys.extend(title_route_keys(torrent.get("filename", "")))
+    return list(dict.fromkeys(keys))
+
+
+def subscription_route_keys(link: str, torrents: Iterable[Dict] = ()) -> List[str]:
+    """从订阅链接与该订阅已拉取的条目中学习路由键"""
+    keys = mikan_route_keys(*mikan_ids(link))
+    for torrent in torrents:
+        keys.extend(title_route_keys(torrent.get("filename", "")))
+    return list(dict.fromkeys(keys))
+
+
+def subscription_link(feed_link: str, torrent: Dict) -> str:
+    """为聚合 RSS 中未匹配的条目生成新订阅的链接"""
+    for text in (torrent.get("page_link"), torrent.get("torrent_link")):
+        bangumi_id, subgroup_id = mikan_ids(text)
+        if bangumi_id:
+            parsed = urlparse(feed_link)
+            link = f"{parsed.scheme}://{parsed.netloc}/RSS/Bangumi?bangumiId={bangumi_id}"
+            return f"{link}&subgroupid={subgroup_id}" if subgroup_id else link
+    keys = title_route_keys(torrent.get("filename", ""))
+    return f"{feed_link}#{quote(keys[0] if keys else torrent.get('filename', ''))}"
+
+
+def is_aggregate_only(link: str) -> bool:
+    """是否为按标题从聚合 RSS 创建、无法单独拉取的订阅"""
+    return urlparse(link).fragment.startswith(quote("title:"))
+
+
+class feedRouter:
+    """
+    将聚合 RSS（如 Mikan MyBangumi）中的条目路由到对应订阅
+    依次按 Mikan bangumiId/字幕组、字幕组 + 标题、仅标题匹配已知路由键
+    """
+
+    def __init__(self, routes: Dict[str, str]):
+        self.routes = dict(routes)
+
+    def route(self, torrent: Dict) -> Optional[str]:
+        """返回条目所属订阅的链接，未匹配时返回 None"""
+        for key in entry_route_keys(torrent):
+            link = self.routes.get(key)
+            if link:
+                return link
+        return None
+
+    def learn(self, keys: Iterable[str], link: str) -> Dict[str, str]:
+        """记录新的路由键（已有的不覆盖），返回实际新增的部分"""
+        learned = {}
+        for key in keys:
+            if key not in self.routes:
+                self.routes[key] = learned[key] = link
+        return learned
+
+    def split(self, torrents: Iterable[Dict]) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+        """
+        将条目按订阅分组
+
+        Returns:
+            tuple: (订阅链接 -> 条目列表, 未匹配的条目)
+        """
+        routed, unmatched = {}, []
+        for torrent in torrents:
+            link = self.route(torrent)
+            if link:
+                routed.setdefault(link, []).append(torrent)
+            else:
+                unmatched.append(torrent)
+        return routed, unmatched
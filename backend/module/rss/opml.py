@@ -0,0 +1,37 @@
+import html
+import xml.etree.ElementTree as ET
+from typing import Dict, List
+from urllib.parse import urlparse, urlunparse
+
+
+def parse_opml(text: str) -> List[Dict[str, str]]:
+    """
+    从 OPML 中提取 RSS 订阅（所有带 xmlUrl 的 outline，包括分组内的）
+
+    Returns:
+        list: [{"link": 订阅链接, "title": 标题}]
+    """
+    try:
+        root = ET.fromstring(text.strip())
+    except ET.ParseError as e:
+        raise ValueError(f"无效的 OPML: {e}")
+    feeds = []
+    for outline in root.iter("outline"):
+        link = outline.get("xmlUrl") or outline.get("xmlurl")
+        if link:
+            feeds.append({"link": link, "title": outline.get("title") or outline.get("text") or ""})
+    return feeds
+
+
+def normalize_feed_link(link: str) -> str:
+    """归一化订阅链接用于去重：去掉首尾空白与 HTML 转义，协议与域名小写"""
+    link = html.unescape((link or "").strip())
+    parsed = urlparse(link)
+    if not parsed.scheme or not parsed.netloc:
+        return link
+    return urlunparse(parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower()))
+
+
+def is_aggregate_feed(link: str) -> bool:
+    """是否为聚合 RSS（如 Mikan MyBangumi），需作为聚合源添加"""
+    return urlparse(link).path.rstrip("/").lower().endswith("/rss/mybangumi")
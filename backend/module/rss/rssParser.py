@@ -5,7 +5,19 @@ import requests
 from typing import List, Dict, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
+import calendar
+from datetime import datetime, timezone
 from urllib.parse import urljoin, urlparse
+from module.metrics import FEED_FETCH_SECONDS, FEED_FETCH_BYTES, FEED_ENTRIES, TRACER
+
+
+class FeedFetchError(Exception):
+    """请求或解析 RSS 失败，stats 为本次拉取的统计（耗时、字节数、HTTP 状态码）"""
+
+    def __init__(self, message: str, stats: Dict):
+        super().__init__(message)
+        self.stats = stats
+
 
 class torrentRSSParser:
     """
@@ -35,33 +47,59 @@ class torrentRSSParser:
             max_entries: 最大解析条目数，用于限制解析范围
             
         Returns:
-            dict: 包含RSS名称和种子列表的字典
+            dict: 包含RSS名称、种子列表与拉取统计的字典
+        """
+        try:
+            return self.fetch_rss(rss_url, max_entries)
+        except FeedFetchError as e:
+            self.logger.error(f"解析RSS时发生错误: {e}", exc_info=True)
+            return {"RSSName": None, "torrents": [], "fetch": e.stats}
+
+    def fetch_rss(self, rss_url: str, max_entries: Optional[int] = None) -> Dict:
+        """
+        与 parse_rss_link 相同，但请求或解析失败时抛出异常（用于需要报告失败原因的场景）
+        
+        Args:
+            rss_url (str): RSS订阅链接
+            max_entries: 最大解析条目数
+            
+        Returns:
+            dict: 包含RSS名称、种子列表与拉取统计（fetch: seconds / bytes / status / ok）的字典
+
+        Raises:
+            FeedFetchError: 请求或解析失败
         """
         start_time = time.time()
+        stats = {"seconds": None, "bytes": 0, "status": None, "ok": False}
         try:
             self.logger.info(f"开始解析RSS链接: {rss_url}")
             
-            feed = self._parse_feed(rss_url)
+            with TRACER.span("feed_fetch", root=False, url=rss_url):
+                feed = self._parse_feed(rss_url, stats)
             rss_title = self._get_rss_title(feed)
             
             # 限制解析条目数量以提高性能
             entries = feed.entries[:max_entries] if max_entries else feed.entries
             torrent_list = self._extract_torrent_info(entries)
-            
-            elapsed_time = time.time() - start_time
-            self.logger.info(f"成功解析RSS，找到 {len(torrent_list)} 个条目，耗时 {elapsed_time:.2f} 秒")
-            return {"RSSName": rss_title, "torrents": torrent_list}
-            
         except Exception as e:
-            self.logger.error(f"解析RSS时发生错误: {e}", exc_info=True)
-            return {"RSSName": None, "torrents": []}
+            stats["seconds"] = time.time() - start_time
+            FEED_FETCH_SECONDS.observe(stats["seconds"], outcome="error")
+            raise FeedFetchError(str(e), stats) from e
+            
+        elapsed_time = time.time() - start_time
+        stats.update(seconds=elapsed_time, ok=True)
+        self.logger.info(f"成功解析RSS，找到 {len(torrent_list)} 个条目，耗时 {elapsed_time:.2f} 秒")
+        FEED_FETCH_SECONDS.observe(elapsed_time, outcome="ok")
+        FEED_ENTRIES.inc(len(torrent_list))
+        return {"RSSName": rss_title, "torrents": torrent_list, "fetch": stats}
     
-    def _parse_feed(self, rss_url: str) -> feedparser.FeedParserDict:
+    def _parse_feed(self, rss_url: str, stats: Optional[Dict] = None) -> feedparser.FeedParserDict:
         """
         解析RSS源，使用requests获取内容后再解析
         
         Args:
             rss_url: RSS链接
+            stats: 用于记录响应字节数与 HTTP 状态码
             
         Returns:
             feedparser.FeedParserDict: 解析后的RSS数据
@@ -71,7 +109,10 @@ class torrentRSSParser:
         try:
             # 使用requests获取RSS内容，设置超时
             response = requests.get(rss_url, timeout=self.timeout)
+            if stats is not None:
+                stats.update(status=response.status_code, bytes=len(response.content))
             response.raise_for_status()
+            FEED_FETCH_BYTES.observe(len(response.content))
             
             # 使用feedparser解析获取到的内容
             feed = feedparser.parse(response.content)
@@ -133,10 +174,14 @@ class torrentRSSParser:
         """
         filename = self._extract_filename(entry)
         torrent_link = self._extract_torrent_link(entry)
+        pubdate = self._extract_pubdate(entry)
         
         torrent_info = {
             'filename': filename,
-            'torrent_link': torrent_link
+            'torrent_link': torrent_link,
+            'pubdate': pubdate,
+            # 条目页面链接，聚合 RSS 路由时用于识别所属番剧
+            'page_link': entry.get('link')
         }
         
         self.logger.debug(f"提取到条目信息: 文件名={filename}, 链接={torrent_link}")
@@ -160,6 +205,22 @@ class torrentRSSParser:
         self.logger.debug("条目中未找到有效的标题，使用默认文件名")
         return 'Unknown'
     
+    def _extract_pubdate(self, entry) -> Optional[datetime]:
+        """
+        从RSS条目中提取发布时间
+        
+        Args:
+            entry: RSS条目
+            
+        Returns:
+            datetime: 发布时间（UTC），如果未找到则返回None
+        """
+        for field in ('published_parsed', 'updated_parsed'):
+            parsed = entry.get(field)
+            if parsed:
+                return datetime.fromtimestamp(calendar.timegm(parsed), tz=timezone.utc)
+        return None
+    
     def _extract_torrent_link(self, entry) -> str:
         """
         从RSS条目中提取种子链接
@@ -1 +1 @@
-from .config import configManager
\ No newline at end of file
+from .config import configManager, configSnapshot, ConfigConflictError
\ No newline at end of file
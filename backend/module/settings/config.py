@@ -5,28 +5,82 @@ This module provides a ConfigManager class that can read, write, and manage
 YAML configuration files with automatic creation of default files.
 """
 
+import copy
 import os
+import tempfile
+import threading
+import weakref
 import yaml
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 import logging
 
-from .utils import create_default_config
+from .utils import create_default_config, diff_configs, get_nested_value, merge_configs, set_nested_value
 
 logger = logging.getLogger(__name__)
 
 
+class ConfigConflictError(RuntimeError):
+    """The configuration was changed by someone else since the expected version."""
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively turn dicts into read-only mappings and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class configSnapshot:
+    """
+    An immutable view of the configuration at one version.
+    
+    The data is frozen once when the snapshot is built (dicts become read-only
+    mappings, lists become tuples), so get() returns values without copying
+    and callers can never modify the snapshot that other components are reading.
+    """
+    
+    __slots__ = ("_data", "_frozen", "version")
+    
+    def __init__(self, data: Dict[str, Any], version: int):
+        # _data is a private plain copy used for diffing, merging and saving
+        self._data = copy.deepcopy(data)
+        self._frozen = _freeze(self._data)
+        self.version = version
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a configuration value using dot notation."""
+        return get_nested_value(self._frozen, key, default)
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """Get a mutable copy of the whole configuration."""
+        return copy.deepcopy(self._data)
+    
+    def __getitem__(self, key: str) -> Any:
+        return self.get(key)
+
+
 class configManager:
     """
     A class to manage YAML configuration files.
     
     Features:
     - Load configuration from YAML file
-    - Save configuration to YAML file
+    - Save configuration to YAML file atomically (temp file + rename)
     - Create default configuration if file doesn't exist
     - Get and set configuration values using dot notation
+    - Immutable, versioned snapshots replaced copy-on-write
+    - One shared instance per file and process (configManager.shared)
+    - Reload when the file is changed by another process (mtime watcher)
+    - Subscriber callbacks filtered by key prefix, so components rebuild only what changed
     """
     
+    _shared: Dict[Path, "configManager"] = {}
+    _shared_lock = threading.Lock()
+    
     def __init__(self, config_path: Union[str, Path], default_config: Optional[Dict] = None):
         """
         Initialize the ConfigManager.
@@ -37,9 +91,36 @@ class configManager:
         """
         self.config_path = Path(config_path)
         self.default_config = default_config or {}
+        self._lock = threading.RLock()
+        self._subscribers: List[Tuple[Callable[[], Optional[Callable]], Tuple[str, ...]]] = []
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
         
         # Load or create the configuration
-        self._config = self._load_config()
+        self._snapshot = configSnapshot(self._load_config(), 0)
+        self._mtime = self._stat()
+    
+    @classmethod
+    def shared(cls, config_path: Union[str, Path] = "config/config.yaml") -> "configManager":
+        """
+        Get the process-wide instance for a configuration file.
+        
+        All managers in a process read the same snapshot, so a change made
+        through the API is seen by every component.
+        """
+        path = Path(config_path).resolve()
+        with cls._shared_lock:
+            instance = cls._shared.get(path)
+            if instance is None:
+                instance = cls._shared[path] = cls(config_path)
+            return instance
+    
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.config_path.stat()
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
     
     def _load_config(self) -> Dict[str, Any]:
         """
@@ -79,19 +160,146 @@ class configManager:
     
     def _save_config(self, config: Dict[str, Any]) -> None:
         """
-        Save configuration to file.
+        Save configuration to file atomically.
+        
+        The configuration is written to a temporary file in the same directory
+        and renamed over the old file, so readers never see a partial file.
         
         Args:
             config (dict): Configuration dictionary to save
         """
         try:
-            with open(self.config_path, 'w', encoding='utf-8') as file:
-                yaml.dump(config, file, default_flow_style=False, allow_unicode=True, indent=2)
+            fd, temp_path = tempfile.mkstemp(dir=self.config_path.parent, prefix=f".{self.config_path.name}.",
+                                             suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                    yaml.dump(config, file, default_flow_style=False, allow_unicode=True, indent=2)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temp_path, self.config_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            self._mtime = self._stat()
             logger.info(f"Configuration saved to: {self.config_path}")
         except Exception as e:
             logger.error(f"Error saving configuration file: {e}")
             raise
     
+    # ---------- Snapshots ----------
+    
+    @property
+    def version(self) -> int:
+        """Configuration version, increased on every change."""
+        return self._snapshot.version
+    
+    def snapshot(self) -> configSnapshot:
+        """Get the current immutable snapshot."""
+        return self._snapshot
+    
+    def _replace(self, config: Dict[str, Any]) -> Tuple[configSnapshot, List[str]]:
+        """
+        Replace the snapshot with a new configuration. The caller must hold
+        the lock, and must call _notify after releasing it.
+        
+        Returns:
+            tuple: (current snapshot, changed keys); no new version is
+                published when nothing changed
+        """
+        old = self._snapshot
+        changed = diff_configs(old._data, config)
+        if changed:
+            self._snapshot = configSnapshot(config, old.version + 1)
+        return self._snapshot, changed
+    
+    def _notify_changed(self, snapshot: configSnapshot, changed: List[str]) -> List[str]:
+        """Notify subscribers (outside the lock) when anything changed."""
+        if changed:
+            self._notify(snapshot, changed)
+        return changed
+    
+    # ---------- Subscribers ----------
+    
+    def subscribe(self, callback: Callable[[configSnapshot, List[str]], None],
+                  prefixes: Optional[Sequence[str]] = None) -> None:
+        """
+        Call callback(snapshot, changed_keys) after the configuration changes.
+        
+        Bound methods are held weakly, so subscribing does not keep the
+        component alive.
+        
+        Args:
+            callback: Callback function
+            prefixes: Only call back when a key under one of these prefixes
+                changed (e.g., ['database']); None means any change
+        """
+        if hasattr(callback, "__self__") and hasattr(callback, "__func__"):
+            ref = weakref.WeakMethod(callback)
+        else:
+            ref = lambda: callback
+        with self._lock:
+            self._subscribers.append((ref, tuple(prefixes or ())))
+    
+    def unsubscribe(self, callback: Callable) -> None:
+        """Remove a subscriber."""
+        with self._lock:
+            self._subscribers = [(ref, prefixes) for ref, prefixes in self._subscribers
+                                 if ref() is not None and ref() != callback]
+    
+    def _notify(self, snapshot: configSnapshot, changed: List[str]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for ref, prefixes in subscribers:
+            callback = ref()
+            if callback is None:
+                continue
+            if prefixes and not any(key == prefix or key.startswith(prefix + ".")
+                                    for key in changed for prefix in prefixes):
+                continue
+            try:
+                callback(snapshot, changed)
+            except Exception as e:
+                logger.error(f"Configuration subscriber failed: {e}", exc_info=True)
+        with self._lock:
+            self._subscribers = [(ref, prefixes) for ref, prefixes in self._subscribers if ref() is not None]
+    
+    # ---------- File watching ----------
+    
+    def check_for_changes(self) -> bool:
+        """
+        Reload the configuration if the file was modified by another process.
+        
+        Returns:
+            bool: Whether the file changed
+        """
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return False
+        logger.info(f"Configuration file changed: {self.config_path}")
+        self.reload()
+        return True
+    
+    def start_watching(self, interval: float = 2.0) -> None:
+        """Check the file for changes in a background thread (idempotent)."""
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+        self._watch_stop.clear()
+        
+        def watch():
+            while not self._watch_stop.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    logger.error(f"Failed to reload configuration: {e}")
+        
+        self._watch_thread = threading.Thread(target=watch, name="config-watcher", daemon=True)
+        self._watch_thread.start()
+    
+    def stop_watching(self) -> None:
+        self._watch_stop.set()
+    
+    # ---------- Access ----------
+    
     def get(self, key: str, default: Any = None) -> Any:
         """
         Get a configuration value using dot notation.
@@ -103,15 +311,17 @@ class configManager:
         Returns:
             Any: Configuration value
         """
-        keys = key.split('.')
-        value = self._config
+        return self._snapshot.get(key, default)
+    
+    def get_many(self, keys: Iterable[str]) -> Tuple[Dict[str, Any], int]:
+        """
+        Get several values from the same snapshot.
         
-        try:
-            for k in keys:
-                value = value[k]
-            return value
-        except (KeyError, TypeError):
-            return default
+        Returns:
+            tuple: (key -> value, version of the snapshot)
+        """
+        snapshot = self._snapshot
+        return {key: snapshot.get(key) for key in keys}, snapshot.version
     
     def set(self, key: str, value: Any) -> None:
         """
@@ -121,17 +331,30 @@ class configManager:
             key (str): Configuration key (e.g., 'database.host')
             value (Any): Value to set
         """
-        keys = key.split('.')
-        config = self._config
-        
-        # Navigate to the parent of the target key
-        for k in keys[:-1]:
-            if k not in config or not isinstance(config[k], dict):
-                config[k] = {}
-            config = config[k]
+        self.set_many({key: value})
+    
+    def set_many(self, values: Dict[str, Any], expected_version: Optional[int] = None) -> List[str]:
+        """
+        Set several values as one change (one new version, one notification).
         
-        # Set the final value
-        config[keys[-1]] = value
+        Args:
+            values (dict): Dot-notation key -> value
+            expected_version (int, optional): Fail with ConfigConflictError if
+                the configuration is no longer at this version
+            
+        Returns:
+            list: Changed keys
+        """
+        with self._lock:
+            if expected_version is not None and expected_version != self._snapshot.version:
+                raise ConfigConflictError(
+                    f"Configuration changed (version {self._snapshot.version}, expected {expected_version})")
+            config = self._snapshot.as_dict()
+            for key, value in values.items():
+                set_nested_value(config, key, value)
+            snapshot, changed = self._replace(config)
+        # Subscribers run outside the lock so they may read or change the configuration
+        return self._notify_changed(snapshot, changed)
     
     def update(self, new_config: Dict[str, Any]) -> None:
         """
@@ -140,37 +363,34 @@ class configManager:
         Args:
             new_config (dict): New configuration values to merge
         """
-        def deep_merge(base: Dict, update: Dict) -> Dict:
-            """Deep merge two dictionaries."""
-            for key, value in update.items():
-                if key in base and isinstance(base[key], dict) and isinstance(value, dict):
-                    deep_merge(base[key], value)
-                else:
-                    base[key] = value
-            return base
-        
-        deep_merge(self._config, new_config)
+        with self._lock:
+            snapshot, changed = self._replace(merge_configs(self._snapshot._data, new_config))
+        self._notify_changed(snapshot, changed)
     
     def save(self) -> None:
         """Save the current configuration to file."""
-        self._save_config(self._config)
+        with self._lock:
+            self._save_config(self._snapshot._data)
     
     def reload(self) -> None:
         """Reload the configuration from file."""
-        self._config = self._load_config()
+        with self._lock:
+            self._mtime = self._stat()
+            snapshot, changed = self._replace(self._load_config())
+        self._notify_changed(snapshot, changed)
     
     def reset_to_default(self) -> None:
         """Reset configuration to default values."""
-        if self.default_config:
-            self._config = self.default_config.copy()
-        else:
-            self._config = create_default_config()
-        self.save()
+        with self._lock:
+            snapshot, changed = self._replace(copy.deepcopy(self.default_config) if self.default_config
+                                              else create_default_config())
+            self.save()
+        self._notify_changed(snapshot, changed)
     
     @property
     def config(self) -> Dict[str, Any]:
         """Get the current configuration dictionary."""
-        return self._config.copy()
+        return self._snapshot.as_dict()
     
     def __getitem__(self, key: str) -> Any:
         """Allow dictionary-style access."""
@@ -188,8 +408,6 @@ class configManager:
 # Example usage and testing
 if __name__ == "__main__":
     # Example usage
-    import tempfile
-    
     # Create a temporary config file for testing
     with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
         temp_config_path = f.name
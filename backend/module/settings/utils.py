@@ -4,7 +4,7 @@ Utility functions for the Config Manager module.
 
 import yaml
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 
 def create_default_config() -> Dict[str, Any]:
@@ -108,4 +108,27 @@ def set_nested_value(config: Dict[str, Any], key_path: str, value: Any) -> None:
         current = current[key]
     
     # Set the final value
-    current[keys[-1]] = value
\ No newline at end of file
+    current[keys[-1]] = value
+
+
+def diff_configs(old: Dict[str, Any], new: Dict[str, Any], prefix: str = "") -> List[str]:
+    """
+    List the dot-notation keys whose values differ between two configurations.
+    
+    Args:
+        old (dict): Previous configuration
+        new (dict): New configuration
+        prefix (str): Key prefix used for recursion
+        
+    Returns:
+        list: Changed leaf keys (e.g., ['database.host'])
+    """
+    changed = []
+    for key in set(old) | set(new):
+        path = f"{prefix}.{key}" if prefix else str(key)
+        old_value, new_value = old.get(key), new.get(key)
+        if isinstance(old_value, dict) and isinstance(new_value, dict):
+            changed.extend(diff_configs(old_value, new_value, path))
+        elif key not in old or key not in new or old_value != new_value:
+            changed.append(path)
+    return sorted(changed)
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+# 从 backend 目录导入 module.*
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def pg_conn():
+    """需要 PostgreSQL 的测试通过环境变量 TEST_DATABASE_URL 指定数据库，未设置或无法连接时跳过"""
+    dsn = os.environ.get("TEST_DATABASE_URL")
+    if not dsn:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    import psycopg2
+    try:
+        conn = psycopg2.connect(dsn)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Cannot connect to test database: {e}")
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+@pytest.fixture
+def db_manager(pg_conn):
+    """在 TEST_DATABASE_URL 所在的服务器上创建一个临时数据库，返回连接到它的 RSSDatabaseManager"""
+    import uuid
+    from psycopg2.extensions import parse_dsn
+    from module.databse import RSSDatabaseManager
+
+    dbname = f"hclo_test_{uuid.uuid4().hex[:12]}"
+    pg_conn.autocommit = True
+    with pg_conn.cursor() as cur:
+        cur.execute(f"CREATE DATABASE {dbname};")
+    params = parse_dsn(os.environ["TEST_DATABASE_URL"])
+    db = RSSDatabaseManager(host=params.get("host"), port=params.get("port", 5432), dbname=dbname,
+                            user=params.get("user"), password=params.get("password", ""))
+    try:
+        yield db
+    finally:
+        db.close()
+        with pg_conn.cursor() as cur:
+            cur.execute(f"DROP DATABASE IF EXISTS {dbname} WITH (FORCE);")
@@ -0,0 +1,52 @@
+from module.api.rss import _etag_matches
+
+
+ETAG = 'W/"42-abc"'
+
+
+def test_etag_matches_exact_tags_only():
+    assert _etag_matches('W/"42-abc"', ETAG)
+    assert _etag_matches('"42-abc"', ETAG)
+    assert _etag_matches('"1-x", W/"42-abc" ,"2-y"', ETAG)
+    assert _etag_matches("*", ETAG)
+    # 子串或前缀相同的标签不匹配
+    assert not _etag_matches('W/"42-abcd"', ETAG)
+    assert not _etag_matches('W/"2-abc"', ETAG)
+    assert not _etag_matches("", ETAG)
+
+
+def _stats(db, bangumi_id):
+    return next(row for row in db.list_bangumi_page(limit=100) if row["bangumi_id"] == bangumi_id)
+
+
+def test_episode_stats_follow_episode_changes(db_manager):
+    # bangumi_id 为 64 位十六进制，子表名超过 PostgreSQL 标识符长度上限会被截断
+    bangumi_id = db_manager.update_bangumi_info("https://example.com/rss/1", "测试番剧")
+    assert len(f"rss_{bangumi_id}") > 63
+    links = [f"https://example.com/{i}.torrent" for i in range(4)]
+    for link in links:
+        db_manager.add_episode(bangumi_id, link, link)
+    stats = _stats(db_manager, bangumi_id)
+    assert (stats["total"], stats["parsed"], stats["downloaded"], stats["pending"]) == (4, 0, 0, 4)
+
+    version = db_manager.get_catalogue_version()
+    db_manager.mark_as_parsed(bangumi_id, links[0])
+    db_manager.mark_as_parsed(bangumi_id, links[1])
+    db_manager.mark_as_downloaded(bangumi_id, links[0])
+    db_manager.mark_as_skipped(bangumi_id, [links[2]])
+    stats = _stats(db_manager, bangumi_id)
+    assert (stats["total"], stats["parsed"], stats["downloaded"], stats["pending"]) == (4, 2, 1, 2)
+    assert db_manager.get_catalogue_version() > version
+
+
+def test_page_filters_pending(db_manager):
+    done = db_manager.update_bangumi_info("https://example.com/rss/1", "已完成番剧")
+    db_manager.add_episode(done, "https://example.com/done.torrent", "done")
+    db_manager.mark_as_downloaded(done, "https://example.com/done.torrent")
+    waiting = db_manager.update_bangumi_info("https://example.com/rss/2", "待下载番剧")
+    db_manager.add_episode(waiting, "https://example.com/waiting.torrent", "waiting")
+
+    page = db_manager.list_bangumi_page(limit=1)
+    assert [row["bangumi_id"] for row in page] == [done]
+    assert [row["bangumi_id"] for row in db_manager.list_bangumi_page(after_id=page[-1]["id"])] == [waiting]
+    assert [row["bangumi_id"] for row in db_manager.list_bangumi_page(pending_only=True)] == [waiting]
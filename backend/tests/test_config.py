@@ -0,0 +1,34 @@
+from types import MappingProxyType
+
+import pytest
+
+from module.settings import configManager
+
+
+@pytest.fixture
+def config(tmp_path):
+    return configManager(tmp_path / "config.yaml",
+                         default_config={"filter": {"subtype": ["SFT", "HRD"], "hasCHS": True}})
+
+
+def test_snapshot_values_are_frozen_and_shared(config):
+    subtype = config.get("filter.subtype")
+    assert subtype == ("SFT", "HRD")
+    # 同一快照多次读取返回同一对象，无需复制
+    assert config.get("filter.subtype") is subtype
+    section = config.get("filter")
+    assert isinstance(section, MappingProxyType)
+    with pytest.raises(TypeError):
+        section["hasCHS"] = False
+
+
+def test_changes_create_a_new_snapshot(config):
+    before = config.snapshot()
+    changed = config.set_many({"filter.subtype": ["SFT"], "filter.hasCHS": True})
+    assert changed == ["filter.subtype"]
+    assert config.get("filter.subtype") == ("SFT",)
+    assert before.get("filter.subtype") == ("SFT", "HRD")
+    # as_dict 返回可修改的普通字典，修改不影响快照
+    data = config.snapshot().as_dict()
+    data["filter"]["subtype"].append("EXT")
+    assert config.get("filter.subtype") == ("SFT",)
@@ -0,0 +1,85 @@
+import pytest
+
+from module.manager.downloadFilter import downloadFilter, extract_group, extract_resolution
+
+EPISODES = [
+    {"filename": "[喵萌奶茶屋] Show - 01 [1080p][简日双语].mkv", "subtitle_type": "SFT",
+     "haschs": True, "hascht": False, "parsed": True},
+    {"filename": "【LoliHouse】 Show - 01 [WebRip 1920x1080 HEVC].mkv", "subtitle_type": "SFT",
+     "haschs": True, "hascht": True, "parsed": True},
+    {"filename": "[Sakurato] Show [01][720p][繁體].mp4", "subtitle_type": "HRD",
+     "haschs": False, "hascht": True, "parsed": True},
+    {"filename": "Show 01 4K.mkv", "subtitle_type": "EXT", "haschs": True, "hascht": True, "parsed": True},
+    {"filename": "[喵萌奶茶屋] Show - 02 [1080p][简日双语][先行版].mkv", "subtitle_type": "SFT",
+     "haschs": True, "hascht": False, "parsed": True},
+    {"filename": "[喵萌奶茶屋] Show - 03 [1080p].mkv", "subtitle_type": "SFT",
+     "haschs": True, "hascht": False, "parsed": False},
+]
+
+FILTERS = {
+    "subtype": dict(subtype=["SFT", "HRD", "EXT"]),
+    "chs": dict(hasCHS=True, subtype=["SFT", "HRD", "EXT"]),
+    "cht_hrd": dict(hasCHT=True, subtype=["HRD"]),
+    "resolution": dict(subtype=["SFT", "HRD", "EXT"], resolution=["1080p", "2160p"]),
+    "group_allow": dict(subtype=["SFT", "HRD", "EXT"], group_allow=["lolihouse", " Sakurato "]),
+    "group_deny": dict(subtype=["SFT", "HRD", "EXT"], group_deny=["喵萌奶茶屋"]),
+    "include_exclude": dict(subtype=["SFT", "HRD", "EXT"], include="Show", exclude="先行"),
+}
+
+
+def _matches(download_filter):
+    return [episode["filename"] for episode in EPISODES if download_filter(episode)]
+
+
+def test_extract_group_and_resolution():
+    assert extract_group("[喵萌奶茶屋] Show - 01") == "喵萌奶茶屋"
+    assert extract_group("【LoliHouse】 Show") == "LoliHouse"
+    assert extract_group("Show 01") is None
+    assert extract_resolution("Show [WebRip 1920x1080]") == "1080p"
+    assert extract_resolution("Show 4K") == "2160p"
+    assert extract_resolution("Show") is None
+
+
+def test_filter_rules():
+    assert len(_matches(downloadFilter(**FILTERS["subtype"]))) == 5
+    assert _matches(downloadFilter(**FILTERS["cht_hrd"])) == ["[Sakurato] Show [01][720p][繁體].mp4"]
+    assert "[Sakurato] Show [01][720p][繁體].mp4" not in _matches(downloadFilter(**FILTERS["resolution"]))
+    assert "Show 01 4K.mkv" in _matches(downloadFilter(**FILTERS["resolution"]))
+    # 白名单下无法识别字幕组的文件不下载，黑名单下可以
+    assert "Show 01 4K.mkv" not in _matches(downloadFilter(**FILTERS["group_allow"]))
+    assert "Show 01 4K.mkv" in _matches(downloadFilter(**FILTERS["group_deny"]))
+    assert not any("先行" in name for name in _matches(downloadFilter(**FILTERS["include_exclude"])))
+
+
+def test_unparsed_never_matches():
+    assert not downloadFilter(subtype=["SFT"])({"filename": "Show", "subtitle_type": "SFT", "parsed": False})
+
+
+def test_accepts_filename_ignores_parsed_fields():
+    # 预取种子前只能按文件名判断，字幕类型与简繁要求留待解析后
+    download_filter = downloadFilter(hasCHS=True, subtype=["HRD"], resolution=["1080p"], group_deny=["Sakurato"])
+    assert download_filter.accepts_filename("[喵萌奶茶屋] Show - 03 [1080p].mkv")
+    assert not download_filter.accepts_filename("[Sakurato] Show [01][1080p].mp4")
+    assert not download_filter.accepts_filename("[喵萌奶茶屋] Show - 03 [720p].mkv")
+
+
+def test_unknown_resolution_ignored():
+    assert downloadFilter(resolution=["8K"]).resolution == ()
+
+
+@pytest.mark.parametrize("name", sorted(FILTERS))
+def test_sql_matches_python(pg_conn, name):
+    """to_sql 生成的条件与 __call__ 对同一批剧集的判断结果一致"""
+    download_filter = downloadFilter(**FILTERS[name])
+    where, params = download_filter.to_sql()
+    with pg_conn.cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE episodes (filename TEXT, subtitle_type TEXT, haschs BOOLEAN,
+                                        hascht BOOLEAN, parsed BOOLEAN) ON COMMIT DROP;
+        """)
+        cur.executemany("INSERT INTO episodes VALUES (%(filename)s, %(subtitle_type)s, %(haschs)s, "
+                        "%(hascht)s, %(parsed)s);", EPISODES)
+        query = "SELECT filename FROM episodes WHERE " + where.as_string(cur) + ";"
+        cur.execute(query, params)
+        matched = {row[0] for row in cur.fetchall()}
+    assert matched == set(_matches(download_filter))
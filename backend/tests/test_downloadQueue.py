@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from module.databse import RSSDatabaseManager
+
+
+def _job(bangumi_id, link, priority=0):
+    return {"bangumi_id": bangumi_id, "link": link, "infohash": None, "save_path": "/downloads",
+            "category": "anime", "display_name": link, "priority": priority}
+
+
+@pytest.fixture
+def other_worker(db_manager):
+    """连接同一数据库的另一个工作进程"""
+    other = RSSDatabaseManager(**db_manager.conn_params)
+    other.worker_id = "other-host:1"
+    try:
+        yield other
+    finally:
+        other.close()
+
+
+def test_claim_rotates_between_bangumi(db_manager):
+    db_manager.enqueue_downloads([_job("a", "a1"), _job("a", "a2"), _job("a", "a3", priority=1),
+                                  _job("b", "b1")])
+    # 已在队列中的任务忽略
+    assert db_manager.enqueue_downloads([_job("a", "a1")]) == 0
+    claimed = db_manager.claim_downloads(3)
+    assert [job["link"] for job in claimed] == ["a3", "b1", "a1"]
+    assert db_manager.get_download_queue_depth() == {"a": 3, "b": 1}
+
+
+def test_leased_jobs_are_not_claimed_twice(db_manager, other_worker):
+    db_manager.enqueue_downloads([_job("a", "a1"), _job("a", "a2")])
+    assert [job["link"] for job in db_manager.claim_downloads(1)] == ["a1"]
+    assert [job["link"] for job in other_worker.claim_downloads(5)] == ["a2"]
+    assert other_worker.claim_downloads(5) == []
+
+    # 只能释放本进程认领的任务
+    other_worker.release_download_leases(["a1"])
+    assert other_worker.claim_downloads(5) == []
+    db_manager.release_download_leases(["a1"])
+    assert [job["link"] for job in other_worker.claim_downloads(5)] == ["a1"]
+
+
+def test_expired_lease_can_be_reclaimed(db_manager, other_worker):
+    db_manager.enqueue_downloads([_job("a", "a1")])
+    assert len(db_manager.claim_downloads(1, lease_seconds=0.2)) == 1
+    assert other_worker.claim_downloads(1) == []
+    time.sleep(0.3)
+    assert [job["link"] for job in other_worker.claim_downloads(1)] == ["a1"]
+
+
+def test_claim_skips_excluded_links(db_manager):
+    db_manager.enqueue_downloads([_job("a", "a1"), _job("a", "a2")])
+    assert [job["link"] for job in db_manager.claim_downloads(5, exclude=["a1"])] == ["a2"]
+
+
+def test_unparsed_episodes_are_claimed_once(db_manager, other_worker):
+    bangumi_id = db_manager.update_bangumi_info("https://example.com/rss/1", "测试番剧")
+    for i in range(4):
+        db_manager.add_episode(bangumi_id, f"https://example.com/{i}.torrent", f"[Group] Show - {i:02d}",
+                               f"2026-01-0{i + 1}")
+    first = db_manager.claim_unparsed_episodes(bangumi_id, 3)
+    second = other_worker.claim_unparsed_episodes(bangumi_id, 3)
+    # 最近发布的优先，两个进程认领的剧集不重叠
+    assert {e["link"] for e in first} == {f"https://example.com/{i}.torrent" for i in (1, 2, 3)}
+    assert [e["link"] for e in second] == ["https://example.com/0.torrent"]
+
+
+def test_singleton_job_is_exclusive_across_threads_and_processes(db_manager, other_worker):
+    entered = threading.Event()
+    release = threading.Event()
+    results = {}
+
+    def hold():
+        with db_manager.singleton_job("poll_feeds") as acquired:
+            results["holder"] = acquired
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    assert entered.wait(5)
+    try:
+        # 同一进程的其他线程与其他进程都不能同时执行
+        with db_manager.singleton_job("poll_feeds") as acquired:
+            assert not acquired
+        with other_worker.singleton_job("poll_feeds") as acquired:
+            assert not acquired
+        with other_worker.singleton_job("download_reconcile") as acquired:
+            assert acquired
+    finally:
+        release.set()
+        thread.join()
+    assert results["holder"]
+    with other_worker.singleton_job("poll_feeds") as acquired:
+        assert acquired
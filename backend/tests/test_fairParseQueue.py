@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+
+from module.manager.fairParseQueue import fairParseQueue
+
+
+def _at(month):
+    return datetime(2024, month, 1, tzinfo=timezone.utc)
+
+
+def _drain(queue, available=None):
+    """模拟 parseManager 的认领循环，available 为各番剧实际可认领的数量（默认全部可认领）"""
+    available = dict(available or {})
+    turns = []
+    for bangumi_id, count in queue:
+        claimed = min(count, available.get(bangumi_id, count))
+        if bangumi_id in available:
+            available[bangumi_id] -= claimed
+        turns.append((bangumi_id, count))
+        queue.report(bangumi_id, count, claimed)
+    return turns
+
+
+def test_round_robin_newest_first():
+    queue = fairParseQueue({
+        "old": {"claimable": 5, "newest_pubdate": None},
+        "new": {"claimable": 12, "newest_pubdate": _at(2)},
+        "mid": {"claimable": 3, "newest_pubdate": _at(1)},
+    }, quantum=5)
+    assert _drain(queue) == [("new", 5), ("mid", 3), ("old", 5), ("new", 5), ("new", 2)]
+    assert queue.rounds == 3
+    assert queue.deferred == {}
+
+
+def test_same_pubdate_smaller_backlog_first():
+    queue = fairParseQueue({
+        "small": {"claimable": 1, "newest_pubdate": _at(1)},
+        "large": {"claimable": 4, "newest_pubdate": _at(1)},
+    }, quantum=10)
+    assert [bangumi_id for bangumi_id, _ in _drain(queue)] == ["small", "large"]
+
+
+def test_max_per_bangumi_defers_rest():
+    queue = fairParseQueue({"a": {"claimable": 10, "newest_pubdate": _at(1)},
+                            "b": {"claimable": 2, "newest_pubdate": _at(1)}},
+                           quantum=3, max_per_bangumi=4)
+    turns = _drain(queue)
+    assert sum(count for bangumi_id, count in turns if bangumi_id == "a") == 4
+    assert queue.deferred == {"a": 6}
+
+
+def test_short_claim_leaves_rotation():
+    # 其他进程已认领了部分剧集：认领不足的番剧退出轮转，也不再计入延后的数量
+    queue = fairParseQueue({"a": {"claimable": 10, "newest_pubdate": _at(1)}}, quantum=4, max_per_bangumi=8)
+    assert _drain(queue, available={"a": 1}) == [("a", 4)]
+    assert queue.deferred == {}
+
+
+def test_empty_and_exhausted_backlog():
+    queue = fairParseQueue({"a": {"claimable": 0}, "b": {"unparsed": 3, "claimable": 0}})
+    assert list(queue) == []
+    assert queue.rounds == 0
+    assert fairParseQueue({}, quantum=0).quantum == 1
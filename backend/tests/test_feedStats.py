@@ -0,0 +1,44 @@
+FEED = "https://example.com/rss/1"
+
+
+def _insert_hourly(db, link, hours_ago_sql, **values):
+    columns = ", ".join(values)
+    placeholders = ", ".join(["%s"] * len(values))
+    with db.conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO feed_stats (link, resolution, bucket, {columns})
+            VALUES (%s, 3600, {hours_ago_sql}, {placeholders});
+        """, (link, *values.values()))
+
+
+def _rows(db):
+    with db.conn.cursor() as cur:
+        cur.execute("SELECT link, resolution, fetches, bytes, max_fetch_seconds, last_status "
+                    "FROM feed_stats ORDER BY resolution, bucket;")
+        return cur.fetchall()
+
+
+def test_record_merges_into_current_hour(db_manager):
+    db_manager.record_feed_stats({FEED: {"fetches": 1, "bytes": 100, "fetch_seconds": 0.5,
+                                         "max_fetch_seconds": 0.5, "last_status": 200}})
+    db_manager.record_feed_stats({FEED: {"fetches": 1, "bytes": 50, "fetch_seconds": 2,
+                                         "max_fetch_seconds": 2, "new_entries": 3}})
+    assert _rows(db_manager) == [(FEED, 3600, 2, 150, 2, 200)]
+    stats = db_manager.get_feed_stats(hours=1)
+    assert [(row["link"], row["fetches"], row["new_entries"], row["last_status"]) for row in stats] == \
+        [(FEED, 2, 3, 200)]
+
+
+def test_compact_rolls_hours_into_days_and_drops_expired(db_manager):
+    day = "date_trunc('day', now()) - interval '3 days'"
+    _insert_hourly(db_manager, FEED, f"{day} + interval '1 hour'",
+                   fetches=1, bytes=10, max_fetch_seconds=3, last_status=200)
+    _insert_hourly(db_manager, FEED, f"{day} + interval '5 hours'",
+                   fetches=2, bytes=20, max_fetch_seconds=1, last_status=304)
+    _insert_hourly(db_manager, FEED, "now() - interval '40 days'", fetches=9, bytes=90)
+    db_manager.record_feed_stats({FEED: {"fetches": 1, "bytes": 1}})
+
+    assert db_manager.compact_feed_stats(hourly_days=2, retention_days=30) > 0
+    # 旧的小时桶合并为一个天桶（累加、取最大值、取最新状态），过期统计被删除，当前小时不变
+    assert _rows(db_manager) == [(FEED, 3600, 1, 1, 0, None), (FEED, 86400, 3, 30, 3, 304)]
+    assert db_manager.compact_feed_stats(hourly_days=2, retention_days=30) == 0
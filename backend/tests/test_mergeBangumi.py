@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+
+
+def _table_exists(db, bangumi_id):
+    with db.conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(quote_ident(%s)) IS NOT NULL;", (f"rss_{bangumi_id}",))
+        return cur.fetchone()[0]
+
+
+def test_merge_moves_episodes_and_references(db_manager):
+    target = db_manager.update_bangumi_info("https://example.com/rss/1", "魔法少女小圆")
+    source = db_manager.update_bangumi_info("https://example.com/rss/2", "Puella Magi Madoka Magica")
+    assert source != target
+    db_manager.add_episode(target, "https://example.com/shared.torrent", "target copy")
+    db_manager.add_episode(source, "https://example.com/shared.torrent", "source copy")
+    db_manager.add_episode(source, "https://example.com/02.torrent", "02")
+    db_manager.add_episode(source, "https://example.com/03.torrent", "03")
+    db_manager.add_release_keys(source, [(1, 2)])
+    db_manager.set_release_pick(source, 1, 2, "https://example.com/02.torrent", 10)
+    db_manager.enqueue_downloads([{"bangumi_id": source, "link": "https://example.com/03.torrent",
+                                   "save_path": "/downloads"}])
+    db_manager.add_bangumi_alias("小圆", source)
+
+    assert db_manager.merge_bangumi(source, target) == 2
+    assert not _table_exists(db_manager, source)
+    # 已存在的链接保留目标中的记录
+    episodes = {e["link"]: e["filename"] for e in db_manager.get_undownloaded_episodes(target)}
+    assert episodes == {"https://example.com/shared.torrent": "target copy",
+                        "https://example.com/02.torrent": "02", "https://example.com/03.torrent": "03"}
+    assert {b["link"]: b["bangumi_id"] for b in db_manager.get_all_bangumi()} == \
+        {"https://example.com/rss/1": target, "https://example.com/rss/2": target}
+    assert db_manager.get_download_queue_depth() == {target: 1}
+    pick = db_manager.get_release_picks(target)[(1, 2)]
+    assert pick["link"] == "https://example.com/02.torrent" and pick["first_seen"] <= datetime.now(timezone.utc)
+    assert db_manager.get_release_picks(source) == {}
+    aliases = {a["alias"]: a["bangumi_id"] for a in db_manager.list_bangumi_aliases()}
+    assert aliases["小圆"] == target and aliases["Puella Magi Madoka Magica"] == target
+    stats = {row["bangumi_id"]: row["total"] for row in db_manager.list_bangumi_page()}
+    assert stats == {target: 3}
+
+
+def test_merge_rejects_invalid_ids(db_manager):
+    target = db_manager.update_bangumi_info("https://example.com/rss/1", "魔法少女小圆")
+    db_manager.add_episode(target, "https://example.com/01.torrent", "01")
+    assert db_manager.merge_bangumi(target, target) is None
+    assert db_manager.merge_bangumi("0" * 64, target) is None
+    assert db_manager.merge_bangumi(target, "0" * 64) is None
+    assert _table_exists(db_manager, target)
+    assert len(db_manager.get_undownloaded_episodes(target)) == 1
@@ -0,0 +1,19 @@
+def test_failed_prefetch_retries_with_backoff(db_manager):
+    bangumi_id = db_manager.update_bangumi_info("https://example.com/rss/1", "测试番剧")
+    links = [f"https://example.com/{i}.torrent" for i in range(3)]
+    for link in links:
+        db_manager.add_episode(bangumi_id, link, f"[Group] Show - {link[-9]} [1080p]")
+    # 新条目在写入时直接预取，从未失败的条目不会出现在重试列表中
+    assert db_manager.get_episodes_without_metadata(bangumi_id) == []
+
+    db_manager.record_metadata_failures(bangumi_id, links[:2], retry_seconds=0)
+    assert {e["link"] for e in db_manager.get_episodes_without_metadata(bangumi_id)} == set(links[:2])
+
+    # 再次失败后按尝试次数退避，未到重试时间的不返回
+    db_manager.record_metadata_failures(bangumi_id, links[:1], retry_seconds=600)
+    assert [e["link"] for e in db_manager.get_episodes_without_metadata(bangumi_id)] == [links[1]]
+
+    # 达到最多尝试次数后不再重试，已获取元数据的不再重试
+    assert db_manager.get_episodes_without_metadata(bangumi_id, max_attempts=1) == []
+    db_manager.update_torrent_metadata(bangumi_id, {links[1]: {"infohash": "a" * 40, "inner_filename": "01.mkv"}})
+    assert db_manager.get_episodes_without_metadata(bangumi_id) == []
@@ -0,0 +1,58 @@
+from module.parser.nameIndex import nameIndex, name_numbers, normalize_name, trigram_similarity
+
+
+def test_normalize_name():
+    assert normalize_name("SPY×FAMILY") == normalize_name("Spy Family") == "spyfamily"
+    assert normalize_name("ＳＰＹ　ＦＡＭＩＬＹ") == "spyfamily"
+    assert normalize_name("葬送的芙莉蓮") == "葬送的芙莉莲"
+    assert normalize_name("【我推的孩子】") == "我推的孩子"
+    assert normalize_name(None) == normalize_name("") == ""
+
+
+def test_name_numbers():
+    assert name_numbers(normalize_name("进击的巨人 第二季")) == ("2",)
+    assert name_numbers(normalize_name("进击的巨人 Season 02")) == ("2",)
+    assert name_numbers(normalize_name("间谍过家家")) == ()
+
+
+def test_trigram_similarity():
+    assert trigram_similarity("abc", "abc") == 1.0
+    assert trigram_similarity("", "abc") == 0.0
+    assert 0 < trigram_similarity("abcdef", "abcdeg") < 1
+
+
+def _index(threshold=0.6):
+    return nameIndex({normalize_name("葬送的芙莉莲"): "frieren",
+                      normalize_name("机动战士高达 水星的魔女"): "gundam",
+                      normalize_name("进击的巨人 第二季"): "titan2"}, threshold)
+
+
+def test_lookup_exact_after_normalization():
+    assert _index().lookup("葬送的芙莉蓮 ") == ("frieren", "葬送的芙莉莲", 1.0)
+
+
+def test_lookup_similar_name():
+    bangumi_id, key, score = _index().lookup("机动战士敢达 水星的魔女")
+    assert (bangumi_id, key) == ("gundam", "机动战士高达水星的魔女")
+    assert 0.6 <= score < 1
+
+
+def test_lookup_does_not_merge_different_seasons_or_containment():
+    index = _index(threshold=0.1)
+    assert index.lookup("进击的巨人 第三季") is None
+    assert index.lookup("机动战士高达 水星的魔女 第二季") is None
+    assert index.lookup("葬送的芙莉莲 魔法") is None
+
+
+def test_lookup_exact_only_and_empty():
+    assert _index(threshold=1).lookup("机动战士敢达 水星的魔女") is None
+    assert _index().lookup("") is None
+    assert _index().lookup(None) is None
+
+
+def test_add_keeps_existing_and_keys_of():
+    index = _index()
+    index.add("葬送的芙莉莲", "other")
+    index.add("frieren", "frieren")
+    assert index.lookup("葬送的芙莉莲")[0] == "frieren"
+    assert index.keys_of(["frieren"]) == {"葬送的芙莉莲": "frieren", "frieren": "frieren"}
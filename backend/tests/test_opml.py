@@ -0,0 +1,155 @@
+import pytest
+
+from module.manager.bulkImporter import bulkImporter
+from module.rss import is_aggregate_feed, normalize_feed_link, parse_opml
+
+OPML = """
+<?xml version="1.0" encoding="UTF-8"?>
+<opml version="2.0">
+  <head><title>Subscriptions</title></head>
+  <body>
+    <outline text="Anime">
+      <outline type="rss" text="Show A" xmlUrl="https://mikanani.me/RSS/Bangumi?bangumiId=1&amp;subgroupid=2"/>
+      <outline type="rss" title="Show B" text="ignored" xmlurl="https://example.com/b.xml"/>
+    </outline>
+    <outline type="rss" xmlUrl="https://mikanani.me/RSS/MyBangumi?token=abc"/>
+    <outline text="Folder without feed"/>
+  </body>
+</opml>
+"""
+
+
+def test_parse_opml_nested_outlines():
+    assert parse_opml(OPML) == [
+        {"link": "https://mikanani.me/RSS/Bangumi?bangumiId=1&subgroupid=2", "title": "Show A"},
+        {"link": "https://example.com/b.xml", "title": "Show B"},
+        {"link": "https://mikanani.me/RSS/MyBangumi?token=abc", "title": ""},
+    ]
+
+
+def test_parse_opml_invalid():
+    with pytest.raises(ValueError):
+        parse_opml("<opml><body>")
+
+
+def test_normalize_feed_link():
+    assert normalize_feed_link("  HTTPS://Mikanani.ME/RSS/Bangumi?bangumiId=1&amp;subgroupid=2 ") == \
+        "https://mikanani.me/RSS/Bangumi?bangumiId=1&subgroupid=2"
+    assert normalize_feed_link("not a link") == "not a link"
+
+
+def test_is_aggregate_feed():
+    assert is_aggregate_feed("https://mikanani.me/RSS/MyBangumi?token=abc")
+    assert is_aggregate_feed("https://mikanani.me/rss/mybangumi/")
+    assert not is_aggregate_feed("https://mikanani.me/RSS/Bangumi?bangumiId=1")
+
+
+class fakeDatabase:
+    def __init__(self, links=()):
+        self.links = list(links)
+        self.aggregate_feeds = []
+        self.sources = []
+        self.episodes = {}
+        self.routes = {}
+
+    def get_all_bangumi(self):
+        return [{"link": link} for link in self.links]
+
+    def get_aggregate_feeds(self):
+        return [{"link": link} for link in self.aggregate_feeds]
+
+    def add_aggregate_feed(self, link):
+        self.aggregate_feeds.append(link)
+
+    def add_subscriptions_bulk(self, subscriptions):
+        added = {link: f"id-{name}" for link, name in subscriptions if link not in self.links}
+        self.links.extend(added)
+        return added
+
+    def add_rss_source(self, link):
+        self.sources.append(link)
+
+    def add_episodes_bulk(self, bangumi_id, episodes, feed_link=None):
+        self.episodes.setdefault(bangumi_id, []).extend((episode["torrent_link"], feed_link) for episode in episodes)
+        return len(episodes)
+
+    def learn_feed_routes(self, routes):
+        self.routes.update(routes)
+
+
+class fakeRSSParser:
+    def __init__(self, feeds):
+        self.feeds = feeds
+
+    def fetch_rss(self, link):
+        feed = self.feeds[link]
+        if isinstance(feed, Exception):
+            raise feed
+        return feed
+
+
+class fakeNameParser:
+    def __init__(self, names):
+        self.names = names
+        self.calls = []
+
+    def parseName(self, title):
+        self.calls.append(title)
+        return self.names.get(title)
+
+
+def _feed(title, count=1):
+    return {"RSSName": title, "torrents": [{"torrent_link": f"{title}-{i}", "filename": f"[G] {title} - {i:02d}"}
+                                           for i in range(count)]}
+
+
+def test_import_opml():
+    links = [feed["link"] for feed in parse_opml(OPML)] + [
+        "https://example.com/b.xml",        # 重复
+        "https://example.com/old.xml",      # 已订阅
+        "ftp://example.com/c.xml",          # 非 HTTP(S)
+        "https://example.com/empty.xml",    # 不是 RSS
+        "https://example.com/down.xml",     # 拉取失败
+        "https://example.com/unnamed.xml",  # 名称暂时无法解析
+        "https://example.com/b2.xml",       # 与 b.xml 标题相同
+    ]
+    db = fakeDatabase(links=["https://example.com/old.xml"])
+    rss_parser = fakeRSSParser({
+        "https://mikanani.me/RSS/Bangumi?bangumiId=1&subgroupid=2": _feed("Show A", 2),
+        "https://example.com/b.xml": _feed("Show B"),
+        "https://example.com/b2.xml": _feed("Show B"),
+        "https://example.com/empty.xml": {"RSSName": "", "torrents": []},
+        "https://example.com/down.xml": ConnectionError("timed out"),
+        "https://example.com/unnamed.xml": _feed("Unknown"),
+    })
+    name_parser = fakeNameParser({"Show A": "A", "Show B": "B"})
+    result = bulkImporter(db, name_parser, rss_parser, workers=2).run(links)
+
+    statuses = {item["link"]: item["status"] for item in result["results"] if item["status"] != "duplicate"}
+    assert statuses == {
+        "https://mikanani.me/RSS/Bangumi?bangumiId=1&subgroupid=2": "added",
+        "https://example.com/b.xml": "added",
+        "https://mikanani.me/RSS/MyBangumi?token=abc": "aggregate",
+        "https://example.com/old.xml": "exists",
+        "ftp://example.com/c.xml": "invalid",
+        "https://example.com/empty.xml": "invalid",
+        "https://example.com/down.xml": "error",
+        "https://example.com/unnamed.xml": "added",
+        "https://example.com/b2.xml": "added",
+    }
+    assert result["summary"] == {"added": 4, "duplicate": 1, "aggregate": 1, "exists": 1, "invalid": 2, "error": 1}
+    # 相同的 RSS 标题只解析一次名称
+    assert sorted(name_parser.calls) == ["Show A", "Show B", "Unknown"]
+    assert db.aggregate_feeds == ["https://mikanani.me/RSS/MyBangumi?token=abc"]
+    assert db.sources == ["https://example.com/unnamed.xml"]
+    # 首批剧集记录来源订阅
+    assert db.episodes["id-A"] == [("Show A-0", "https://mikanani.me/RSS/Bangumi?bangumiId=1&subgroupid=2"),
+                                   ("Show A-1", "https://mikanani.me/RSS/Bangumi?bangumiId=1&subgroupid=2")]
+    assert set(db.routes.values()) <= {"https://mikanani.me/RSS/Bangumi?bangumiId=1&subgroupid=2",
+                                       "https://example.com/b.xml", "https://example.com/b2.xml"}
+    assert db.routes
+
+
+def test_import_limit():
+    with pytest.raises(ValueError):
+        bulkImporter(fakeDatabase(), fakeNameParser({}), fakeRSSParser({}), max_links=1).run(["a", "b"])
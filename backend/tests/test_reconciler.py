@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+
+from module.downloader.reconciler import qbReconciler
+
+HASH_A, HASH_B, HASH_C, HASH_D = ("a" * 40, "b" * 40, "c" * 40, "d" * 40)
+
+
+class fakeDownloader:
+    """按顺序返回预设的 sync/maindata 结果，并记录请求的 rid 与删除的种子"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.rids = []
+        self.deleted = []
+        self.delete_files = []
+
+    def sync_maindata(self, rid=0):
+        self.rids.append(rid)
+        return self.responses.pop(0)
+
+    def delete_torrents(self, hashes, delete_files=False):
+        self.deleted.extend(hashes)
+        self.delete_files.append(delete_files)
+
+
+class fakeDatabase:
+    def __init__(self, submitted):
+        self.submitted = submitted
+        self.completed = {}
+        self.requeued = {}
+        self.removed = {}
+
+    def get_submitted_episodes(self):
+        return list(self.submitted)
+
+    def mark_as_completed(self, bangumi_id, links):
+        self.completed.setdefault(bangumi_id, []).extend(links)
+
+    def requeue_episodes(self, bangumi_id, links):
+        self.requeued.setdefault(bangumi_id, []).extend(links)
+
+    def mark_as_removed(self, bangumi_id, links):
+        self.removed.setdefault(bangumi_id, []).extend(links)
+
+
+def _submitted(bangumi_id, link, infohash, minutes_ago):
+    return {"bangumi_id": bangumi_id, "link": link, "infohash": infohash,
+            "submitted_at": datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)}
+
+
+def test_sync_merges_incremental_updates():
+    downloader = fakeDownloader([
+        {"rid": 1, "full_update": True, "torrents": {HASH_A: {"state": "downloading", "progress": 0.5},
+                                                     HASH_B: {"state": "stalledDL", "progress": 0}}},
+        {"rid": 2, "torrents": {HASH_A: {"progress": 1}}, "torrents_removed": [HASH_B]},
+        {"rid": 3, "full_update": True, "torrents": {HASH_C: {"state": "downloading"}}},
+    ])
+    reconciler = qbReconciler(downloader, fakeDatabase([]))
+    reconciler.sync()
+    assert reconciler.active_count() == 2
+    reconciler.sync()
+    assert reconciler.get(HASH_A) == {"state": "downloading", "progress": 1}
+    assert not reconciler.has(HASH_B)
+    assert reconciler.active_count() == 0
+    reconciler.sync()
+    assert not reconciler.has(HASH_A) and reconciler.has(HASH_C)
+    assert downloader.rids == [0, 1, 2]
+    assert reconciler.status()["rid"] == 3
+
+
+def test_reconcile_completes_and_requeues():
+    db = fakeDatabase([
+        _submitted("x", "done", HASH_A, 60),
+        _submitted("x", "missing-new", "e" * 40, 1),
+        _submitted("y", "missing-old", "f" * 40, 60),
+        _submitted("y", "failed", HASH_B, 5),
+        _submitted("y", "stalled", HASH_C, 120),
+        _submitted("y", "starting", HASH_D, 5),
+    ])
+    downloader = fakeDownloader([{"rid": 1, "full_update": True, "torrents": {
+        HASH_A: {"state": "stalledUP", "progress": 1},
+        HASH_B: {"state": "error", "progress": 0.2},
+        HASH_C: {"state": "metaDL", "progress": 0},
+        HASH_D: {"state": "metaDL", "progress": 0},
+    }}])
+    reconciler = qbReconciler(downloader, db, add_timeout=300, stall_timeout=1800)
+    assert reconciler.reconcile() == {"completed": 1, "requeued": 2, "removed": 1}
+    assert db.completed == {"x": ["done"]}
+    assert db.requeued == {"y": ["failed", "stalled"]}
+    # 开始观察时早应出现在 qB 中、现已不在的种子无法确认是否被用户删除，不重新提交；刚提交的继续等待
+    assert db.removed == {"y": ["missing-old"]}
+    # 失败与停滞的种子从 qB 与本地镜像中删除（默认保留已下载的文件），刚提交的保留
+    assert downloader.deleted == [HASH_B, HASH_C]
+    assert downloader.delete_files == [False]
+    assert not reconciler.has(HASH_B) and not reconciler.has(HASH_C)
+    assert reconciler.has(HASH_D)
+
+
+def test_removed_torrents_are_not_requeued():
+    db = fakeDatabase([])
+    downloader = fakeDownloader([
+        {"rid": 1, "full_update": True, "torrents": {HASH_A: {"state": "downloading", "progress": 0.3}}},
+        {"rid": 2, "torrents_removed": [HASH_A]},
+    ])
+    reconciler = qbReconciler(downloader, db, add_timeout=0)
+    reconciler.reconcile()
+    db.submitted = [_submitted("x", "removed-by-user", HASH_A, 0), _submitted("x", "never-added", HASH_B, 0)]
+    assert reconciler.reconcile() == {"completed": 0, "requeued": 1, "removed": 1}
+    # 出现过又消失的种子是被用户删除的；从未出现的才视为添加失败
+    assert db.removed == {"x": ["removed-by-user"]}
+    assert db.requeued == {"x": ["never-added"]}
+    assert downloader.deleted == []
+
+
+def test_add_known_prevents_duplicate_submission():
+    reconciler = qbReconciler(fakeDownloader([{"rid": 1, "torrents": {}}]), fakeDatabase([]))
+    reconciler.add_known([HASH_A])
+    assert reconciler.has(HASH_A)
+    reconciler.sync()
+    # 增量同步不会清除尚未出现在 sync 结果中的已知种子
+    assert reconciler.has(HASH_A)
@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta, timezone
+
+from module.manager.releaseSelector import extract_version, releaseSelector
+
+
+class fakeDatabase:
+    """releaseSelector 使用的 release_picks 与剧集状态接口的内存实现"""
+
+    def __init__(self, picks=None, states=None, leased=()):
+        self.picks = dict(picks or {})
+        self.states = dict(states or {})
+        self.leased = set(leased)
+        self.skipped = []
+        self.dequeued = []
+
+    def get_release_picks(self, bangumi_id):
+        return {key: dict(pick) for key, pick in self.picks.items()}
+
+    def add_release_keys(self, bangumi_id, keys):
+        for key in keys:
+            self.picks.setdefault(key, {"link": None, "score": None, "first_seen": datetime.now(timezone.utc)})
+
+    def set_release_pick(self, bangumi_id, season, episode, link, score):
+        self.picks[(season, episode)].update(link=link, score=score)
+
+    def mark_as_skipped(self, bangumi_id, links):
+        self.skipped.extend(links)
+
+    def get_episode_states(self, bangumi_id, links):
+        return {link: self.states[link] for link in links if link in self.states}
+
+    def remove_unleased_from_download_queue(self, links):
+        if self.leased.intersection(links):
+            return False
+        self.dequeued.extend(links)
+        return True
+
+
+class fakeDownloader:
+    def __init__(self):
+        self.deleted = []
+
+    def delete_torrents(self, hashes, delete_files=False):
+        self.deleted.append((list(hashes), delete_files))
+
+
+class fakeReconciler:
+    def __init__(self, torrents):
+        self.torrents = torrents
+
+    def get(self, torrent_hash):
+        return self.torrents.get(torrent_hash)
+
+
+def _episode(filename, episode=1, subtitle_type="SFT", season=1):
+    return {"link": f"link:{filename}", "filename": filename, "subtitle_type": subtitle_type,
+            "season": season, "episode": episode}
+
+
+def _selector(db, **kwargs):
+    kwargs.setdefault("grace_minutes", 0)
+    return releaseSelector(db, prefer_groups=["LoliHouse", "喵萌奶茶屋"], **kwargs)
+
+
+def test_extract_version():
+    assert extract_version("[Group] Show - 01v2 [1080p].mkv") == 2
+    assert extract_version("[Group] Show - 01 [1080p].mkv") == 1
+    assert extract_version("[Group] Show - 01 [HEVC v10].mkv") == 1
+
+
+def test_score_priorities():
+    selector = _selector(fakeDatabase())
+    preferred_720 = selector.score(_episode("[LoliHouse] Show - 01 [720p]"))
+    other_1080 = selector.score(_episode("[Other] Show - 01 [1080p]"))
+    assert preferred_720 > other_1080
+    assert selector.score(_episode("[LoliHouse] Show - 01 [1080p]")) > \
+        selector.score(_episode("[喵萌奶茶屋] Show - 01 [1080p]"))
+    # 偏好分辨率优先于更高的分辨率
+    assert other_1080 > selector.score(_episode("[Other] Show - 01 [2160p]"))
+    assert selector.score(_episode("[Other] Show - 01 [1080p]", subtitle_type="SFT")) > \
+        selector.score(_episode("[Other] Show - 01 [1080p]", subtitle_type="HRD"))
+    assert selector.score(_episode("[Other] Show - 01v2 [1080p]")) > other_1080
+
+
+def test_waits_for_grace_window():
+    db = fakeDatabase()
+    selector = _selector(db, grace_minutes=10)
+    assert selector.select("b", [_episode("[Other] Show - 01 [1080p]")]) == []
+    assert db.picks[(1, 1)]["link"] is None
+    assert db.skipped == []
+
+
+def test_selects_best_and_skips_losers():
+    db = fakeDatabase()
+    best = _episode("[LoliHouse] Show - 01 [1080p]")
+    loser = _episode("[Other] Show - 01 [1080p]")
+    batch = _episode("[Other] Show [01-12][1080p]", episode=None)
+    assert _selector(db).select("b", [loser, best, batch]) == [batch, best]
+    assert db.picks[(1, 1)]["link"] == best["link"]
+    assert db.skipped == [loser["link"]]
+
+
+def test_requeued_pick_is_selected_again():
+    pick = _episode("[LoliHouse] Show - 01 [1080p]")
+    other = _episode("[Other] Show - 01 [1080p]")
+    selector = _selector(fakeDatabase())
+    db = fakeDatabase(picks={(1, 1): {"link": pick["link"], "score": selector.score(pick),
+                                      "first_seen": datetime.now(timezone.utc) - timedelta(hours=1)}})
+    assert _selector(db).select("b", [other, pick]) == [pick]
+    assert db.skipped == [other["link"]]
+
+
+def test_worse_release_after_pick_is_skipped():
+    pick = _episode("[LoliHouse] Show - 01 [1080p]")
+    worse = _episode("[Other] Show - 01 [720p]")
+    db = fakeDatabase(picks={(1, 1): {"link": pick["link"], "score": _selector(fakeDatabase()).score(pick),
+                                      "first_seen": datetime.now(timezone.utc)}})
+    assert _selector(db).select("b", [worse]) == []
+    assert db.skipped == [worse["link"]]
+
+
+def test_better_release_replaces_pick():
+    old = _episode("[Other] Show - 01 [1080p]")
+    better = _episode("[LoliHouse] Show - 01 [1080p]")
+    db = fakeDatabase(picks={(1, 1): {"link": old["link"], "score": _selector(fakeDatabase()).score(old),
+                                      "first_seen": datetime.now(timezone.utc)}},
+                      states={old["link"]: {"completed": False, "downloaded": False, "infohash": None}})
+    assert _selector(db).select("b", [better]) == [better]
+    assert db.dequeued == [old["link"]]
+    assert old["link"] in db.skipped
+    assert db.picks[(1, 1)]["link"] == better["link"]
+
+
+def test_completed_pick_is_kept():
+    old = _episode("[Other] Show - 01 [1080p]")
+    better = _episode("[LoliHouse] Show - 01 [1080p]")
+    db = fakeDatabase(picks={(1, 1): {"link": old["link"], "score": _selector(fakeDatabase()).score(old),
+                                      "first_seen": datetime.now(timezone.utc)}},
+                      states={old["link"]: {"completed": True, "downloaded": True, "infohash": "a" * 40}})
+    assert _selector(db).select("b", [better]) == []
+    assert db.skipped == [better["link"]]
+    assert db.picks[(1, 1)]["link"] == old["link"]
+
+
+def _picked(old, states, leased=()):
+    return fakeDatabase(picks={(1, 1): {"link": old["link"], "score": _selector(fakeDatabase()).score(old),
+                                        "first_seen": datetime.now(timezone.utc)}},
+                        states=states, leased=leased)
+
+
+def test_leased_pick_is_kept():
+    old = _episode("[Other] Show - 01 [1080p]")
+    better = _episode("[LoliHouse] Show - 01 [1080p]")
+    db = _picked(old, {old["link"]: {"completed": False, "downloaded": False, "infohash": None}}, leased=[old["link"]])
+    # 先前的选择正被认领提交，不能撤下
+    assert _selector(db).select("b", [better]) == []
+    assert db.picks[(1, 1)]["link"] == old["link"]
+    assert old["link"] not in db.skipped
+
+
+def test_submitted_pick_replaced_only_before_download_starts():
+    old = _episode("[Other] Show - 01 [1080p]")
+    better = _episode("[LoliHouse] Show - 01 [1080p]")
+    states = {old["link"]: {"completed": False, "downloaded": True, "infohash": "a" * 40}}
+
+    downloader = fakeDownloader()
+    db = _picked(old, states)
+    selector = _selector(db, qb_downloader=downloader, reconciler=fakeReconciler({"a" * 40: {"progress": 0.3}}))
+    assert selector.select("b", [better]) == []
+    assert downloader.deleted == []
+
+    db = _picked(old, states)
+    selector = _selector(db, qb_downloader=downloader, reconciler=fakeReconciler({"a" * 40: {"progress": 0}}))
+    assert selector.select("b", [better]) == [better]
+    # 只从 qB 中移除尚未开始下载的种子，不删除文件
+    assert downloader.deleted == [(["a" * 40], False)]
+    assert old["link"] in db.skipped
@@ -0,0 +1,73 @@
+import base64
+import hashlib
+
+import pytest
+
+from module.downloader.infohash import extract_infohash
+from module.downloader.torrentCache import BencodeError, bdecode, main_video_file, parse_torrent
+
+INFOHASH = "0123456789abcdef0123456789abcdef01234567"
+
+
+def bencode(value) -> bytes:
+    if isinstance(value, int):
+        return b"i%de" % value
+    if isinstance(value, str):
+        value = value.encode()
+    if isinstance(value, bytes):
+        return b"%d:%s" % (len(value), value)
+    if isinstance(value, list):
+        return b"l" + b"".join(bencode(item) for item in value) + b"e"
+    return b"d" + b"".join(bencode(key) + bencode(value[key]) for key in sorted(value)) + b"e"
+
+
+def test_extract_infohash_from_magnet():
+    assert extract_infohash(f"magnet:?xt=urn:btih:{INFOHASH.upper()}&dn=Show") == INFOHASH
+    base32 = base64.b32encode(bytes.fromhex(INFOHASH)).decode()
+    assert extract_infohash(f"magnet:?dn=Show&xt=urn:btih:{base32}") == INFOHASH
+    assert extract_infohash("magnet:?xt=urn:btih:1234") is None
+    assert extract_infohash("magnet:?dn=Show") is None
+
+
+def test_extract_infohash_from_url():
+    assert extract_infohash(f"https://mikanani.me/Download/20240101/{INFOHASH}.torrent") == INFOHASH
+    # 查询参数中的十六进制串不是 infohash
+    assert extract_infohash(f"https://example.com/download?id={INFOHASH}") is None
+    assert extract_infohash("https://example.com/1234.torrent") is None
+    assert extract_infohash("") is None
+    assert extract_infohash(None) is None
+
+
+def test_parse_single_file_torrent():
+    info = {"name": "Show - 01.mkv", "length": 1024, "piece length": 16384, "pieces": b"\x00" * 20}
+    data = bencode({"announce": "http://tracker/announce", "info": info})
+    torrent = parse_torrent(data)
+    assert torrent == {"infohash": hashlib.sha1(bencode(info)).hexdigest(),
+                       "name": "Show - 01.mkv", "files": ["Show - 01.mkv"]}
+
+
+def test_parse_multi_file_torrent():
+    info = {"name": "Show - 01", "piece length": 16384, "pieces": b"\x00" * 20,
+            "files": [{"length": 1, "path": ["Show - 01.mkv"]},
+                      {"length": 1, "path": ["Subs", "Show - 01.chs.ass"]},
+                      {"length": 1, "path": ["x"], "path.utf-8": ["字幕", "说明.txt"]}]}
+    torrent = parse_torrent(bencode({"info": info}))
+    assert torrent["infohash"] == hashlib.sha1(bencode(info)).hexdigest()
+    assert torrent["files"] == ["Show - 01.mkv", "Subs/Show - 01.chs.ass", "字幕/说明.txt"]
+    assert main_video_file(torrent["files"]) == "Show - 01.mkv"
+
+
+@pytest.mark.parametrize("data", [b"", b"d4:infoi1e", b"i12", b"5:abc", b"x", bencode({"announce": "a"})])
+def test_parse_invalid_torrent(data):
+    with pytest.raises(BencodeError):
+        parse_torrent(data)
+
+
+def test_bdecode_values():
+    assert bdecode(bencode({"a": [1, "b"], "c": -2})) == {b"a": [1, b"b"], b"c": -2}
+
+
+def test_main_video_file():
+    assert main_video_file(["a/Show - 01.MKV", "a/Show - 01.ass"]) == "Show - 01.MKV"
+    assert main_video_file(["Show - 01.mkv", "Show - 02.mkv"]) is None
+    assert main_video_file(["readme.txt"]) is None
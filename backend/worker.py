@@ -0,0 +1,29 @@
+"""
+工作进程启动器（不启动 API），可在多台机器上同时运行，共享同一数据库
+
+    python worker.py --workers 4
+    python worker.py --workers 2 --stages parser
+"""
+import argparse
+import logging
+from module.manager.workerPool import DEFAULT_STAGES, workerPool, run_worker
+from module.metrics import LOG_FORMAT, install_log_context
+
+install_log_context()
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="HClO Anime worker launcher")
+    arg_parser.add_argument("--workers", type=int, default=1, help="工作进程数量")
+    arg_parser.add_argument("--stages", nargs="+", default=list(DEFAULT_STAGES), choices=DEFAULT_STAGES,
+                            help="每个工作进程运行的阶段")
+    args = arg_parser.parse_args()
+    if args.workers <= 1:
+        run_worker(args.stages)
+    else:
+        pool = workerPool(args.workers, args.stages)
+        pool.start()
+        pool.join()